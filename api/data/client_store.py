@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from api.schemas.input_schema import FEATURE_ORDER
+
+
+CLIENT_ID = "SK_ID_CURR"
+
+# (Optionnel) Liste de champs "profil" à renvoyer en plus (si présents dans le fichier)
+# Possible  d'adapter plus tard sans casser l'API.
+DEFAULT_PROFILE_COLUMNS = [
+    "SK_ID_CURR",
+    "CODE_GENDER",
+    "NAME_FAMILY_STATUS",
+    "NAME_INCOME_TYPE",
+    "AMT_INCOME_TOTAL",
+    "AMT_CREDIT",
+    "AMT_ANNUITY",
+]
+
+# Seules colonnes utilisées par l'API (projection au chargement)
+CLIENT_COLUMNS = [CLIENT_ID] + FEATURE_ORDER + [c for c in DEFAULT_PROFILE_COLUMNS if c != CLIENT_ID]
+
+
+def json_value(v: Any) -> Any:
+    """
+    Convertit une valeur numpy/pandas en valeur JSON-safe :
+    - NaN / inf / -inf / NA -> None
+    - types numpy -> types Python natifs
+    """
+    if v is None:
+        return None
+
+    # numpy scalar -> python scalar
+    if isinstance(v, np.generic):
+        v = v.item()
+
+    if isinstance(v, float):
+        return v if math.isfinite(v) else None
+
+    try:
+        if pd.isna(v):
+            return None
+    except (TypeError, ValueError):
+        pass
+
+    return v
+
+
+class IdIndex:
+    """
+    Index trié SK_ID_CURR -> position (ids triés + positions précalculées).
+    Recherche en O(log n) par np.searchsorted, empreinte mémoire = 2 tableaux.
+    """
+
+    def __init__(self, ids: np.ndarray):
+        ids = np.asarray(ids)
+        # Tri stable pour garder la 1ère occurrence en cas de doublon
+        self._order = np.argsort(ids, kind="stable")
+        self._sorted_ids = ids[self._order]
+
+    def __len__(self) -> int:
+        return len(self._sorted_ids)
+
+    def position(self, sk_id: int) -> Optional[int]:
+        """Position (ligne) de l'identifiant, None si absent."""
+        i = int(np.searchsorted(self._sorted_ids, sk_id, side="left"))
+        if i < len(self._sorted_ids) and self._sorted_ids[i] == sk_id:
+            return int(self._order[i])
+        return None
+
+
+class ClientStore:
+    """
+    Accès O(log n) à un client par SK_ID_CURR, sans scan du DataFrame.
+
+    - index trié (IdIndex), construit une seule fois
+    - features stockées dans une matrice float64 (n, n_features) compacte
+    - colonnes profil stockées en tableaux numpy (une par colonne)
+
+    Un lookup ne fait que quelques conversions scalaires (pas de to_dict
+    sur une Series pandas).
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        features: np.ndarray,
+        feature_names: List[str],
+        feature_is_int: List[bool],
+        profile: Dict[str, np.ndarray],
+    ):
+        self.ids = np.asarray(ids)
+        self.features = features
+        self.feature_names = list(feature_names)
+        self.feature_is_int = list(feature_is_int)
+        self.profile = profile
+        self.index = IdIndex(self.ids)
+
+    @staticmethod
+    def feature_matrix(df: pd.DataFrame, feature_names: List[str]) -> np.ndarray:
+        """Matrice float64 (n, n_features) dans l'ordre feature_names (NaN = manquant ou colonne absente)."""
+        features = np.full((len(df), len(feature_names)), np.nan, dtype=np.float64)
+        for j, name in enumerate(feature_names):
+            if name in df.columns:
+                features[:, j] = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        return features
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        feature_names: List[str],
+        profile_names: List[str],
+        features: Optional[np.ndarray] = None,
+    ) -> "ClientStore":
+        """
+        Construit le store à partir du DataFrame clients (colonne SK_ID_CURR obligatoire).
+        features : matrice déjà construite (ex: memory-map partagé entre workers), sinon feature_matrix(df).
+        """
+        if features is None:
+            features = cls.feature_matrix(df, feature_names)
+        feature_is_int = [name in df.columns and pd.api.types.is_integer_dtype(df[name].dtype) for name in feature_names]
+
+        profile = {name: df[name].to_numpy() for name in profile_names if name in df.columns}
+
+        return cls(
+            ids=df[CLIENT_ID].to_numpy(),
+            features=features,
+            feature_names=feature_names,
+            feature_is_int=feature_is_int,
+            profile=profile,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def position(self, sk_id: int) -> Optional[int]:
+        """Position (ligne) du client dans le store, None si absent."""
+        return self.index.position(sk_id)
+
+    def features_at(self, pos: int) -> Dict[str, Any]:
+        """Features JSON-ready (dans l'ordre des features) pour la ligne pos."""
+        out = {}
+        for name, is_int, v in zip(self.feature_names, self.feature_is_int, self.features[pos].tolist()):
+            if not math.isfinite(v):
+                out[name] = None
+            else:
+                out[name] = int(v) if is_int else v
+        return out
+
+    def profile_at(self, pos: int) -> Dict[str, Any]:
+        """Champs profil JSON-ready (seulement les colonnes présentes) pour la ligne pos."""
+        return {name: json_value(values[pos]) for name, values in self.profile.items()}
+
+    def get(self, sk_id: int) -> Optional[Dict[str, Any]]:
+        """Renvoie {"features": ..., "profile": ...} ou None si le client est inconnu."""
+        pos = self.position(sk_id)
+        if pos is None:
+            return None
+        return {"features": self.features_at(pos), "profile": self.profile_at(pos)}
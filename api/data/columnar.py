@@ -0,0 +1,144 @@
+"""
+Stockage colonnaire du dataset clients (un fichier .npy par colonne).
+
+- build_columnar_store : conversion one-shot CSV/Parquet -> dossier .npy
+  (projection des colonnes utiles + downcast des types)
+- load_columnar_store : chargement en memory-map (np.load mmap_mode="r"),
+  seules les pages réellement lues sont chargées en mémoire.
+
+Usage :
+    python -m api.data.columnar data/application_test.csv data/client_store
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def is_columnar_store(path: str) -> bool:
+    """True si path est un dossier contenant un manifest de store colonnaire."""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_NAME))
+
+
+def source_fingerprint(path: str) -> Dict[str, int]:
+    """Empreinte légère d'un fichier source (taille + mtime)."""
+    st = os.stat(path)
+    return {"size": int(st.st_size), "mtime_ns": int(st.st_mtime_ns)}
+
+
+def read_projected(source: str, columns: List[str]) -> pd.DataFrame:
+    """Lit uniquement les colonnes demandées (celles absentes du fichier sont ignorées)."""
+    wanted = set(columns)
+    if source.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        available = set(pq.read_schema(source).names)
+        return pd.read_parquet(source, columns=[c for c in columns if c in available])
+    return pd.read_csv(source, usecols=lambda c: c in wanted)
+
+
+def _downcast(col: pd.Series):
+    """
+    Renvoie (array, meta) pour une colonne :
+    - entiers -> plus petit type entier
+    - flottants -> float32 si la conversion est sans perte, sinon float64
+    - texte -> codes catégoriels (int8/int16) + liste des catégories
+    """
+    if pd.api.types.is_bool_dtype(col.dtype):
+        return col.to_numpy(dtype=np.int8), {"kind": "numeric"}
+
+    if pd.api.types.is_integer_dtype(col.dtype):
+        return pd.to_numeric(col, downcast="integer").to_numpy(), {"kind": "numeric"}
+
+    if pd.api.types.is_float_dtype(col.dtype):
+        values = col.to_numpy(dtype=np.float64)
+        as32 = values.astype(np.float32)
+        if np.array_equal(as32.astype(np.float64), values, equal_nan=True):
+            return as32, {"kind": "numeric"}
+        return values, {"kind": "numeric"}
+
+    cat = pd.Categorical(col.astype("string").astype(object))
+    return cat.codes, {"kind": "category", "categories": [str(c) for c in cat.categories]}
+
+
+def build_columnar_store(source: str, out_dir: str, columns: List[str]) -> Dict:
+    """
+    Construit le store colonnaire à partir de source (CSV/Parquet).
+    Renvoie le manifest écrit dans out_dir.
+    """
+    df = read_projected(source, columns)
+    os.makedirs(out_dir, exist_ok=True)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "n_rows": int(len(df)),
+        "source": os.path.abspath(source),
+        "source_fingerprint": source_fingerprint(source),
+        "columns": {},
+    }
+
+    for name in [c for c in columns if c in df.columns]:
+        values, meta = _downcast(df[name])
+        filename = f"{name}.npy"
+        np.save(os.path.join(out_dir, filename), np.ascontiguousarray(values))
+        meta.update({"file": filename, "dtype": str(values.dtype)})
+        manifest["columns"][name] = meta
+
+    # Manifest écrit en dernier : un store sans manifest n'est jamais lu
+    tmp = os.path.join(out_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST_NAME))
+
+    return manifest
+
+
+def read_manifest(path: str) -> Dict:
+    with open(os.path.join(path, MANIFEST_NAME), "r") as f:
+        return json.load(f)
+
+
+def load_columnar_store(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Charge le store colonnaire en memory-map.
+    Les colonnes numériques restent adossées aux fichiers .npy (pas de copie),
+    les colonnes texte sont reconstruites en Categorical.
+    """
+    manifest = read_manifest(path)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Format de store non supporté : {manifest.get('format')} (attendu {FORMAT_VERSION}).")
+
+    names = list(manifest["columns"]) if columns is None else [c for c in columns if c in manifest["columns"]]
+
+    data = {}
+    for name in names:
+        meta = manifest["columns"][name]
+        values = np.load(os.path.join(path, meta["file"]), mmap_mode="r")
+        if meta["kind"] == "category":
+            data[name] = pd.Categorical.from_codes(np.asarray(values), categories=meta["categories"])
+        else:
+            data[name] = values
+
+    return pd.DataFrame(data, copy=False)
+
+
+if __name__ == "__main__":
+    from api.data.client_store import CLIENT_COLUMNS
+
+    parser = argparse.ArgumentParser(description="Construit le store colonnaire clients (.npy memory-mappés).")
+    parser.add_argument("source", help="CSV ou Parquet source (ex: data/application_test.csv)")
+    parser.add_argument("out_dir", help="Dossier de sortie (ex: data/client_store)")
+    args = parser.parse_args()
+
+    manifest = build_columnar_store(args.source, args.out_dir, CLIENT_COLUMNS)
+    print(f"✅ Store colonnaire écrit dans {args.out_dir} : {manifest['n_rows']} lignes, "
+          f"{len(manifest['columns'])} colonnes.")
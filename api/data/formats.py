@@ -0,0 +1,121 @@
+"""
+Formats de réponse tabulaires (négociation de contenu).
+
+- "records" : {"columns": [...], "rows": [{col: val}, ...]} (format historique)
+- "columns" : {"columns": [...], "data": {col: [val, ...]}} (orienté colonnes, noms non répétés)
+- "arrow"   : flux Arrow IPC (application/vnd.apache.arrow.stream)
+- "parquet" : fichier Parquet (application/vnd.apache.parquet)
+
+Les métadonnées (n, seuil...) sont des clés JSON de premier niveau ; pour Arrow / Parquet
+elles sont stockées dans les métadonnées du schéma (clé b"meta", JSON).
+pyarrow reste optionnel : sans lui, les formats binaires lèvent FormatUnavailable (-> 406).
+Décodage côté client : dashboard.api_client.frame_from_response.
+"""
+from __future__ import annotations
+
+import io
+import json
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from api.data.client_store import json_value
+
+
+FORMAT_RECORDS = "records"
+FORMAT_COLUMNS = "columns"
+FORMAT_ARROW = "arrow"
+FORMAT_PARQUET = "parquet"
+
+FORMATS = (FORMAT_RECORDS, FORMAT_COLUMNS, FORMAT_ARROW, FORMAT_PARQUET)
+BINARY_FORMATS = (FORMAT_ARROW, FORMAT_PARQUET)
+
+MEDIA_TYPES = {
+    FORMAT_RECORDS: "application/json",
+    FORMAT_COLUMNS: "application/json",
+    FORMAT_ARROW: "application/vnd.apache.arrow.stream",
+    FORMAT_PARQUET: "application/vnd.apache.parquet",
+}
+
+# Accept -> format (le paramètre "format" explicite est prioritaire)
+ACCEPT_FORMATS = {
+    "application/vnd.apache.arrow.stream": FORMAT_ARROW,
+    "application/vnd.apache.parquet": FORMAT_PARQUET,
+    "application/x-parquet": FORMAT_PARQUET,
+}
+
+ARROW_META_KEY = b"meta"
+
+
+class FormatUnavailable(Exception):
+    """Format binaire demandé mais pyarrow absent."""
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def negotiate_format(fmt: Optional[str], accept: Optional[str]) -> str:
+    """
+    Format de réponse : paramètre explicite, sinon premier type binaire reconnu dans Accept,
+    sinon "records". ValueError si le paramètre est inconnu.
+    """
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"Format inconnu : {fmt} (attendu : {', '.join(FORMATS)})")
+        return fmt
+
+    for part in (accept or "").split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in ACCEPT_FORMATS:
+            return ACCEPT_FORMATS[media_type]
+    return FORMAT_RECORDS
+
+
+def _json_column(series: pd.Series) -> list:
+    return [json_value(v) for v in series.tolist()]
+
+
+def encode_frame(df: pd.DataFrame, fmt: str, meta: Dict[str, Any] = None) -> bytes:
+    """Sérialise df (+ métadonnées) dans le format demandé."""
+    meta = dict(meta or {})
+    columns = [str(c) for c in df.columns]
+
+    if fmt == FORMAT_RECORDS:
+        rows = [{k: json_value(v) for k, v in r.items()} for r in df.to_dict(orient="records")]
+        payload = {**meta, "columns": columns, "rows": rows}
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    if fmt == FORMAT_COLUMNS:
+        data = {str(c): _json_column(df[c]) for c in df.columns}
+        payload = {**meta, "columns": columns, "data": data}
+        return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    if fmt in BINARY_FORMATS:
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise FormatUnavailable(f"Format {fmt} indisponible : pyarrow n'est pas installé côté API.")
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            ARROW_META_KEY: json.dumps(meta).encode("utf-8"),
+        })
+        sink = io.BytesIO()
+        if fmt == FORMAT_ARROW:
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, sink)
+        return sink.getvalue()
+
+    raise ValueError(f"Format inconnu : {fmt}")
+
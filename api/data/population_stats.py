@@ -0,0 +1,197 @@
+"""
+Statistiques population calculées sur toute la base clients (pas sur un échantillon).
+
+Une fois au chargement : pour chaque feature numérique, tableau trié des valeurs présentes.
+Ensuite chaque requête ne fait que des np.searchsorted / accès indexés :
+- quantiles exacts (interpolation linéaire, même définition que np.nanpercentile)
+- rang percentile exact d'une valeur
+- histogramme (bornes régulières min..max) en O(bins * log n)
+- densité 2-D (grille de comptage) pour un couple de features
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+DEFAULT_BINS = 30
+MAX_BINS = 200
+
+
+class FeatureDistribution:
+    """Valeurs présentes triées (float64) + nombre de manquants pour une feature."""
+
+    def __init__(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        present = np.isfinite(values)
+        self.sorted = np.sort(values[present])
+        self.n_missing = int(len(values) - self.sorted.size)
+        self.mean = float(self.sorted.mean()) if self.sorted.size else None
+
+    @classmethod
+    def from_sorted(cls, sorted_values: np.ndarray, n_missing: int) -> "FeatureDistribution":
+        """Distribution à partir de valeurs déjà triées (ex: vue sur un tableau partagé), sans copie."""
+        dist = cls.__new__(cls)
+        dist.sorted = sorted_values
+        dist.n_missing = int(n_missing)
+        dist.mean = float(sorted_values.mean()) if sorted_values.size else None
+        return dist
+
+    @property
+    def n(self) -> int:
+        return int(self.sorted.size)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile exact (interpolation linéaire entre rangs, comme np.quantile)."""
+        if self.n == 0:
+            return None
+        pos = q * (self.n - 1)
+        lo = int(math.floor(pos))
+        hi = min(lo + 1, self.n - 1)
+        frac = pos - lo
+        return float(self.sorted[lo] + frac * (self.sorted[hi] - self.sorted[lo]))
+
+    def percentile_rank(self, value: float) -> Dict[str, Any]:
+        """
+        Position exacte de value dans la population :
+        - percentile : % de clients strictement en dessous
+        - percentile_inclusive : % de clients inférieurs ou égaux
+        """
+        below = int(np.searchsorted(self.sorted, value, side="left"))
+        below_or_equal = int(np.searchsorted(self.sorted, value, side="right"))
+        n = self.n
+        return {
+            "value": float(value),
+            "n": n,
+            "n_below": below,
+            "n_equal": below_or_equal - below,
+            "percentile": 100.0 * below / n if n else None,
+            "percentile_inclusive": 100.0 * below_or_equal / n if n else None,
+        }
+
+    def histogram(self, bins: int = DEFAULT_BINS) -> Dict[str, List]:
+        """Histogramme à bornes régulières (dernier bin fermé à droite, comme np.histogram)."""
+        if self.n == 0:
+            return {"edges": [], "counts": []}
+        lo, hi = float(self.sorted[0]), float(self.sorted[-1])
+        if lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        edges = np.linspace(lo, hi, bins + 1)
+        cum = np.searchsorted(self.sorted, edges, side="left")
+        cum[-1] = self.n
+        return {"edges": edges.tolist(), "counts": np.diff(cum).tolist()}
+
+
+class PopulationStats:
+    """Distributions triées par feature, construites une seule fois à partir du DataFrame clients."""
+
+    def __init__(self, distributions: Dict[str, FeatureDistribution], n_rows: int):
+        self.distributions = distributions
+        self.n_rows = int(n_rows)
+
+    @staticmethod
+    def numeric_columns(df: pd.DataFrame, columns: List[str]) -> List[str]:
+        return [c for c in columns if c in df.columns and pd.api.types.is_numeric_dtype(df[c].dtype)]
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: List[str]) -> "PopulationStats":
+        distributions = {}
+        for name in cls.numeric_columns(df, columns):
+            values = df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+            distributions[name] = FeatureDistribution(values)
+        return cls(distributions, len(df))
+
+    def packed(self) -> np.ndarray:
+        """Valeurs triées de toutes les features, concaténées (ordre de self.features)."""
+        parts = [d.sorted for d in self.distributions.values()]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.float64)
+
+    @classmethod
+    def from_packed(cls, packed: np.ndarray, counts: Dict[str, Tuple[int, int]], n_rows: int) -> "PopulationStats":
+        """
+        Inverse de packed() : counts = {feature: (n présents, n manquants)} dans l'ordre du tableau.
+        Les distributions sont des vues sur packed (aucune copie).
+        """
+        distributions = {}
+        offset = 0
+        for name, (n, n_missing) in counts.items():
+            distributions[name] = FeatureDistribution.from_sorted(packed[offset:offset + n], n_missing)
+            offset += n
+        return cls(distributions, n_rows)
+
+    @property
+    def features(self) -> List[str]:
+        return list(self.distributions)
+
+    def get(self, feature: str) -> Optional[FeatureDistribution]:
+        return self.distributions.get(feature)
+
+    def summary(
+        self,
+        feature: str,
+        bins: int = DEFAULT_BINS,
+        quantiles: List[float] = None,
+        value: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Histogramme + quantiles (+ rang percentile de value) ; None si feature inconnue."""
+        dist = self.get(feature)
+        if dist is None:
+            return None
+
+        quantiles = DEFAULT_QUANTILES if quantiles is None else quantiles
+        out = {
+            "feature": feature,
+            "n": dist.n,
+            "n_missing": dist.n_missing,
+            "min": float(dist.sorted[0]) if dist.n else None,
+            "max": float(dist.sorted[-1]) if dist.n else None,
+            "mean": dist.mean,
+            "quantiles": {str(q): dist.quantile(q) for q in quantiles},
+            "histogram": dist.histogram(bins),
+        }
+        if value is not None:
+            out["client"] = dist.percentile_rank(value)
+        return out
+
+
+def density_grid(
+    x: np.ndarray,
+    y: np.ndarray,
+    x_range: Tuple[float, float],
+    y_range: Tuple[float, float],
+    bins: Tuple[int, int],
+) -> Dict[str, Any]:
+    """
+    Comptage 2-D sur une grille rectangulaire régulière (équivalent np.histogram2d, bords droits inclus) :
+    indices de bin calculés en vectoriel puis un seul np.bincount sur l'indice aplati.
+    Les lignes avec une valeur manquante ou hors plage sont comptées à part.
+    """
+    bx, by = bins
+    (x0, x1), (y0, y1) = _widen(*x_range), _widen(*y_range)
+
+    present = np.isfinite(x) & np.isfinite(y)
+    inside = present & (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+    xs, ys = x[inside], y[inside]
+
+    ix = np.minimum(((xs - x0) * (bx / (x1 - x0))).astype(np.int64), bx - 1)
+    iy = np.minimum(((ys - y0) * (by / (y1 - y0))).astype(np.int64), by - 1)
+    counts = np.bincount(ix * by + iy, minlength=bx * by).reshape(bx, by)
+
+    return {
+        "x_edges": np.linspace(x0, x1, bx + 1).tolist(),
+        "y_edges": np.linspace(y0, y1, by + 1).tolist(),
+        # counts[i][j] : bin i sur X, bin j sur Y
+        "counts": counts.tolist(),
+        "n": int(inside.sum()),
+        "n_missing": int((~present).sum()),
+        "n_outside": int((present & ~inside).sum()),
+    }
+
+
+def _widen(lo: float, hi: float) -> Tuple[float, float]:
+    """Plage non dégénérée (feature constante)."""
+    return (lo - 0.5, hi + 0.5) if lo == hi else (lo, hi)
@@ -0,0 +1,118 @@
+"""
+Tableaux en lecture seule partagés entre les workers de l'API (uvicorn --workers, gunicorn).
+
+Sans partage, chaque worker reconstruit ses propres gros tableaux dérivés des données
+(matrice features du ClientStore, valeurs triées des stats population, background SHAP).
+Avec SHARED_ARRAYS_DIR défini, le premier process qui a besoin d'un tableau le construit
+et l'écrit en .npy (verrou fichier), les autres l'ouvrent en memory-map (np.load mmap_mode="r") :
+les pages viennent du page cache du noyau, une seule copie physique pour tous les workers.
+Sous Linux, un dossier de /dev/shm (tmpfs) évite toute écriture disque.
+
+Chaque tableau est publié sous une clé (empreinte de la source + paramètres) : le nom du
+fichier contient le hash de la clé, une source modifiée produit donc un nouveau fichier.
+Clé None (source inconnue, ex: DataFrame construit en mémoire) : pas de partage.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-process (construction éventuellement dupliquée)
+    fcntl = None
+
+
+# Dossier partagé par les workers (ex: /dev/shm/credit-scoring-api) ; vide = partage désactivé
+SHARED_ARRAYS_DIR = os.getenv("SHARED_ARRAYS_DIR", "")
+
+_arrays: Dict[str, Dict[str, Any]] = {}
+_arrays_lock = threading.Lock()
+
+
+def shared_dir() -> Optional[str]:
+    return SHARED_ARRAYS_DIR or None
+
+
+def _digest(key: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+@contextmanager
+def _file_lock(path: str):
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _record(name: str, array: np.ndarray, origin: str) -> np.ndarray:
+    with _arrays_lock:
+        _arrays[name] = {"origin": origin, "shape": list(array.shape), "bytes": int(array.nbytes)}
+    return array
+
+
+def _publish(directory: str, name: str, path: str, array: np.ndarray) -> None:
+    """Écrit le tableau (tmp + rename atomique) puis supprime les versions obsolètes."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+    os.replace(tmp, path)
+
+    # Les workers qui ont encore une ancienne version ouverte gardent leur mapping
+    for entry in os.listdir(directory):
+        if entry.startswith(f"{name}-") and entry.endswith(".npy") and os.path.join(directory, entry) != path:
+            try:
+                os.remove(os.path.join(directory, entry))
+            except OSError:
+                pass
+
+
+def shared_array(name: str, key: Optional[Dict[str, Any]], build: Callable[[], np.ndarray]) -> np.ndarray:
+    """
+    Tableau name pour la clé key :
+    - partage désactivé ou key None -> build() (copie privée du process)
+    - déjà publié -> memory-map en lecture seule (aucune copie)
+    - sinon build() sous verrou, publication, puis memory-map
+    Les tableaux object (non sérialisables en .npy sans pickle) restent privés.
+    """
+    directory = shared_dir()
+    if directory is None or key is None:
+        return _record(name, build(), "local")
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}-{_digest(key)}.npy")
+
+    if not os.path.exists(path):
+        with _file_lock(os.path.join(directory, f"{name}.lock")):
+            if not os.path.exists(path):
+                array = np.asarray(build())
+                if array.dtype == object:
+                    return _record(name, array, "local")
+                _publish(directory, name, path, array)
+                print(f"📤 Tableau partagé publié : {path} ({array.nbytes / 1e6:.1f} Mo)")
+                return _record(name, np.load(path, mmap_mode="r"), "published")
+
+    return _record(name, np.load(path, mmap_mode="r"), "attached")
+
+
+def stats() -> Dict[str, Any]:
+    """Tableaux partagés de ce process : origine (local / published / attached) et taille."""
+    with _arrays_lock:
+        arrays = {name: dict(info) for name, info in _arrays.items()}
+    return {
+        "dir": shared_dir(),
+        "arrays": arrays,
+        "shared_bytes": sum(a["bytes"] for a in arrays.values() if a["origin"] != "local"),
+        "private_bytes": sum(a["bytes"] for a in arrays.values() if a["origin"] == "local"),
+    }
@@ -0,0 +1,124 @@
+"""
+Importance globale SHAP (mean |SHAP| par feature), calculée une fois au packaging
+du modèle et sauvegardée à côté de model.pkl avec l'identité du modèle.
+
+L'API charge le vecteur complet une seule fois et en extrait n'importe quel top_n.
+Le recalcul est réservé à l'endpoint admin (ou à ce script).
+
+Usage (packaging) :
+    python -m api.explain.global_importance
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import api.data.shared_arrays as shared_arrays
+from api.model.loader import LOCAL_MODEL_PATH, get_model_version
+from api.schemas.input_schema import FEATURE_ORDER
+import api.explain.shap_explainer as shap_explainer
+
+
+GLOBAL_IMPORTANCE_PATH = os.getenv(
+    "GLOBAL_IMPORTANCE_PATH",
+    os.path.join(os.path.dirname(LOCAL_MODEL_PATH), "global_importance.json"),
+)
+
+_rows: Optional[List[Dict[str, Any]]] = None
+_rows_lock = threading.Lock()
+
+
+def compute_global_importance_vector() -> np.ndarray:
+    """mean(|shap|) par feature (ordre FEATURE_ORDER) sur le background."""
+    background = shap_explainer.get_background()
+    values, _ = shap_explainer.shap_matrix(background)
+    return np.mean(np.abs(values), axis=0)
+
+
+def save_global_importance(vector: np.ndarray, path: str = None) -> Dict[str, Any]:
+    """Écrit l'artefact JSON (vecteur complet + identité du modèle)."""
+    path = path or GLOBAL_IMPORTANCE_PATH
+    artifact = {
+        "model_version": get_model_version(),
+        "feature_names": FEATURE_ORDER,
+        "mean_abs_shap": [float(v) for v in vector],
+        "n_background": int(shap_explainer.N_BACKGROUND),
+        "created_at": datetime.datetime.utcnow().isoformat(),
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(artifact, f, indent=2)
+    os.replace(tmp, path)
+    return artifact
+
+
+def load_global_importance(path: str = None) -> Optional[np.ndarray]:
+    """Vecteur de l'artefact, None s'il est absent ou produit par un autre modèle."""
+    path = path or GLOBAL_IMPORTANCE_PATH
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r") as f:
+        artifact = json.load(f)
+
+    if artifact.get("model_version") != get_model_version() or artifact.get("feature_names") != FEATURE_ORDER:
+        print(f"⚠️ Importance globale {path} produite pour un autre modèle ({artifact.get('model_version')}).")
+        return None
+
+    return np.array(artifact["mean_abs_shap"], dtype=float)
+
+
+def _sorted_rows(vector: np.ndarray) -> List[Dict[str, Any]]:
+    rows = [{"feature": f, "importance": float(imp)} for f, imp in zip(FEATURE_ORDER, vector.tolist())]
+    rows.sort(key=lambda r: r["importance"], reverse=True)
+    return rows
+
+
+def _get_rows() -> List[Dict[str, Any]]:
+    """Importance triée (cache process) : artefact si valide, sinon calcul unique en mémoire."""
+    global _rows
+
+    if _rows is None:
+        with _rows_lock:
+            if _rows is None:
+                vector = load_global_importance()
+                if vector is None:
+                    print("⚠️ Artefact d'importance globale absent : calcul en mémoire (une fois par process).")
+                    # Avec SHARED_ARRAYS_DIR : calculé par le premier worker, relu par les autres
+                    # (import local : api.main importe ce module)
+                    import api.main
+
+                    key = api.main.shared_key(
+                        model_version=get_model_version(), n_background=shap_explainer.N_BACKGROUND
+                    )
+                    vector = np.asarray(
+                        shared_arrays.shared_array("global_importance", key, compute_global_importance_vector)
+                    )
+                _rows = _sorted_rows(vector)
+    return _rows
+
+
+def get_global_importance(top_n: int = 20) -> List[Dict[str, Any]]:
+    """Top N des features par importance globale (mean |SHAP|)."""
+    return [dict(r) for r in _get_rows()[:top_n]]
+
+
+def recompute_global_importance() -> Dict[str, Any]:
+    """Recalcule, sauvegarde l'artefact et remplace le cache process."""
+    global _rows
+
+    vector = compute_global_importance_vector()
+    artifact = save_global_importance(vector)
+    with _rows_lock:
+        _rows = _sorted_rows(vector)
+    return artifact
+
+
+if __name__ == "__main__":
+    artifact = recompute_global_importance()
+    print(f"✅ Importance globale sauvegardée dans {GLOBAL_IMPORTANCE_PATH} (modèle {artifact['model_version']}).")
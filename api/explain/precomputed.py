@@ -0,0 +1,211 @@
+"""
+SHAP values précalculées pour toute la population de référence.
+
+- job offline (par chunks, multi-process) : calcule les SHAP values de chaque
+  SK_ID_CURR et les stocke à côté du store clients, par version de modèle et
+  empreinte des données (nombre de lignes + hash des SK_ID_CURR)
+- PrecomputedShap : lecture memory-mappée + index trié -> lookup O(log n)
+
+Usage :
+    python -m api.explain.precomputed --chunk-size 1000 --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from api.data.client_store import IdIndex
+from api.model.loader import get_model_version
+from api.schemas.input_schema import FEATURE_ORDER
+import api.explain.shap_explainer as shap_explainer
+
+
+MANIFEST_NAME = "manifest.json"
+
+# Dossier racine des SHAP précalculées (défaut : <CLIENT_STORE_DIR>/shap)
+SHAP_STORE_DIR = os.getenv("SHAP_STORE_DIR", "")
+
+
+def data_fingerprint(ids: np.ndarray) -> Dict[str, Any]:
+    """Empreinte de la population : nombre de lignes + hash des SK_ID_CURR (dans l'ordre)."""
+    ids = np.ascontiguousarray(ids, dtype=np.int64)
+    return {"n_rows": int(len(ids)), "ids_sha1": hashlib.sha1(ids.tobytes()).hexdigest()[:16]}
+
+
+def shap_store_dir(model_version: str, fingerprint: Dict[str, Any]) -> str:
+    """
+    Dossier des SHAP précalculées pour une version de modèle et une population :
+    un autre CSV clients sous le même modèle ne relit jamais des SHAP d'autres lignes.
+    """
+    # Import local : api.main importe ce module (pas d'import circulaire au chargement)
+    import api.main as main
+
+    root = SHAP_STORE_DIR or os.path.join(main.CLIENT_STORE_DIR, "shap")
+    data_key = f"{fingerprint['n_rows']}-{fingerprint['ids_sha1']}"
+    return os.path.join(root, model_version.replace(":", "_"), data_key)
+
+
+class PrecomputedShap:
+    """SHAP values précalculées (n, p) + base values, indexées par SK_ID_CURR."""
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        values: np.ndarray,
+        base_values: np.ndarray,
+        model_version: str,
+        data_fingerprint: Optional[Dict[str, Any]] = None,
+    ):
+        self.values = values
+        self.base_values = base_values
+        self.model_version = model_version
+        self.data_fingerprint = data_fingerprint
+        self.index = IdIndex(ids)
+
+    @classmethod
+    def load(cls, path: str) -> "PrecomputedShap":
+        with open(os.path.join(path, MANIFEST_NAME), "r") as f:
+            manifest = json.load(f)
+
+        if manifest["feature_names"] != FEATURE_ORDER:
+            raise ValueError(f"SHAP précalculées incompatibles avec FEATURE_ORDER : {path}")
+
+        return cls(
+            ids=np.load(os.path.join(path, "ids.npy")),
+            values=np.load(os.path.join(path, "values.npy"), mmap_mode="r"),
+            base_values=np.load(os.path.join(path, "base_values.npy"), mmap_mode="r"),
+            model_version=manifest["model_version"],
+            data_fingerprint=manifest.get("data_fingerprint"),
+        )
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get(self, sk_id: int) -> Optional[Dict[str, Any]]:
+        """Payload au format explain_one, None si le client n'a pas été précalculé."""
+        pos = self.index.position(sk_id)
+        if pos is None:
+            return None
+        return {
+            "base_value": float(self.base_values[pos]),
+            "shap_values": self.values[pos].astype(float).tolist(),
+            "feature_names": FEATURE_ORDER,
+        }
+
+
+def save_precomputed_shap(
+    path: str,
+    model_version: str,
+    ids: np.ndarray,
+    values: np.ndarray,
+    base_values: np.ndarray,
+) -> Dict[str, Any]:
+    """
+    Écrit les SHAP values (float32) + manifest dans path.
+    Chaque fichier est écrit sous un nom temporaire puis renommé (os.replace, atomique) :
+    un lecteur concurrent voit l'ancienne ou la nouvelle version, jamais un fichier tronqué.
+    """
+    os.makedirs(path, exist_ok=True)
+    arrays = {
+        "ids.npy": np.asarray(ids),
+        "values.npy": np.asarray(values, dtype=np.float32),
+        "base_values.npy": np.asarray(base_values, dtype=np.float32),
+    }
+    for name, array in arrays.items():
+        tmp = os.path.join(path, name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, os.path.join(path, name))
+
+    manifest = {
+        "model_version": model_version,
+        "n_rows": int(len(ids)),
+        "data_fingerprint": data_fingerprint(ids),
+        "feature_names": FEATURE_ORDER,
+        "created_at": datetime.datetime.utcnow().isoformat(),
+    }
+    # Manifest écrit en dernier : un dossier sans manifest n'est jamais lu
+    tmp = os.path.join(path, MANIFEST_NAME + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(path, MANIFEST_NAME))
+    return manifest
+
+
+@lru_cache(maxsize=1)
+def get_precomputed_shap() -> Optional[PrecomputedShap]:
+    """SHAP précalculées pour le modèle et la population clients courants (cache process), None si absentes."""
+    import api.main as main
+
+    fingerprint = data_fingerprint(main.get_clients_df()["SK_ID_CURR"].to_numpy())
+    path = shap_store_dir(get_model_version(), fingerprint)
+    if not os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        return None
+
+    precomputed = PrecomputedShap.load(path)
+    if precomputed.data_fingerprint != fingerprint:
+        raise ValueError(f"SHAP précalculées calculées sur une autre population : {path}")
+    return precomputed
+
+
+# ----------------------------
+# Job offline
+# ----------------------------
+def _init_worker():
+    # Chaque process construit son explainer une seule fois
+    shap_explainer.get_explainer()
+
+
+def _explain_chunk(X_chunk: np.ndarray):
+    return shap_explainer.shap_matrix(X_chunk)
+
+
+def compute_population_shap(chunk_size: int = 1000, workers: int = 1) -> Dict[str, Any]:
+    """
+    Calcule les SHAP values de tous les clients de get_clients_df(),
+    par chunks répartis sur `workers` process, puis les sauvegarde.
+    """
+    import api.main as main
+
+    df = main.get_clients_df()
+    ids = df["SK_ID_CURR"].to_numpy()
+    X = df[FEATURE_ORDER].to_numpy(dtype=np.float64, na_value=np.nan)
+    model_version = get_model_version()
+
+    # Construit model + explainer avant le fork : les workers en héritent
+    shap_explainer.get_explainer()
+
+    chunks = [X[i:i + chunk_size] for i in range(0, len(X), chunk_size)]
+    start = time.perf_counter()
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = list(pool.map(_explain_chunk, chunks))
+    else:
+        results = [_explain_chunk(c) for c in chunks]
+
+    values = np.vstack([r[0] for r in results]) if results else np.empty((0, len(FEATURE_ORDER)))
+    base_values = np.concatenate([r[1] for r in results]) if results else np.empty(0)
+
+    path = shap_store_dir(model_version, data_fingerprint(ids))
+    manifest = save_precomputed_shap(path, model_version, ids, values, base_values)
+    print(f"✅ SHAP précalculées : {len(ids)} clients en {time.perf_counter() - start:.1f}s -> {path}")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Précalcule les SHAP values de toute la population clients.")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    compute_population_shap(chunk_size=args.chunk_size, workers=args.workers)
@@ -1,24 +1,115 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
 from functools import lru_cache
-from typing import Any, Dict, List
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 import numpy as np
 import pandas as pd
 import shap
 
+import api.data.shared_arrays as shared_arrays
 from api.schemas.input_schema import FEATURE_ORDER
-from api.model.preprocess import preprocess_X
-
-# IMPORTANT:
-# - on importe get_model et get_clients_df depuis api.main
-# - ça évite de recharger le modèle/dataset
-import api.main as main
+from api.model.loader import get_model_version
+from api.model.compiled import split_pipeline
 
 
 N_BACKGROUND = 500
 RANDOM_STATE = 42
 
+# TreeSHAP : "interventional" (background, défaut) ou "tree_path_dependent" (sans background, plus rapide)
+SHAP_TREE_MODE = os.getenv("SHAP_TREE_MODE", "interventional")
+# Taille du background pour TreeSHAP interventional (coût linéaire en nombre de lignes)
+N_TREE_BACKGROUND = int(os.getenv("SHAP_TREE_BACKGROUND", "100"))
+
+# Cache des explications locales (clé = vecteur de features + version du modèle)
+SHAP_CACHE_SIZE = int(os.getenv("SHAP_CACHE_SIZE", "1024"))
+SHAP_CACHE_TTL = float(os.getenv("SHAP_CACHE_TTL", "3600"))  # secondes, 0 = pas d'expiration
+
+
+class ExplanationCache:
+    """
+    Cache LRU borné + TTL pour les payloads SHAP (thread-safe).
+    Stocke le vecteur SHAP complet : n'importe quel top_n est servi depuis le cache.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = item
+            if self.ttl > 0 and self._clock() - stored_at > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self._clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+explanation_cache = ExplanationCache(maxsize=SHAP_CACHE_SIZE, ttl=SHAP_CACHE_TTL)
+
+
+def feature_key(X_one: np.ndarray, model_version: str) -> str:
+    """
+    Hash canonique d'un vecteur de features (+ version du modèle) :
+    None/NaN et -0.0/0.0 sont normalisés pour que deux vecteurs égaux aient la même clé.
+    """
+    x = np.asarray(X_one).reshape(-1).astype(np.float64)
+    x = np.where(np.isnan(x), np.nan, x) + 0.0
+
+    h = hashlib.sha1(model_version.encode("utf-8"))
+    h.update(x.tobytes())
+    return h.hexdigest()
+
 
 def _build_background_matrix(df: pd.DataFrame) -> np.ndarray:
     """
@@ -51,82 +142,196 @@ def get_background() -> np.ndarray:
     """
     Charge et met en cache le background (numpy array).
     """
+    # Import local : api.main importe ce module (pas d'import circulaire au chargement)
+    import api.main as main
+
     df = main.get_clients_df()
     # Vérif rapide (si jamais)
     missing = [c for c in FEATURE_ORDER if c not in df.columns]
     if missing:
         raise ValueError(f"Dataset de référence incomplet, colonnes manquantes: {missing}")
 
-    return _build_background_matrix(df)
+    # Une seule copie pour tous les workers si SHARED_ARRAYS_DIR est défini
+    return shared_arrays.shared_array(
+        "shap_background",
+        main.shared_key(n=N_BACKGROUND, seed=RANDOM_STATE, features=FEATURE_ORDER),
+        lambda: _build_background_matrix(df),
+    )
 
 
-@lru_cache(maxsize=1)
-def get_explainer():
+def apply_transformers(transformers, X: np.ndarray) -> np.ndarray:
+    """Applique les étapes de preprocessing du Pipeline (même chemin que predict_proba)."""
+    for step in transformers:
+        X = step.transform(X)
+    if hasattr(X, "toarray"):
+        X = X.toarray()
+    return np.asarray(X, dtype=float)
+
+
+class TreeModelExplainer:
     """
-    Crée et met en cache l'explainer SHAP.
-    Supporte Pipeline sklearn (on explique l'estimator final).
+    TreeSHAP exact sur l'estimator final (forêts, gradient boosting sklearn / XGBoost / LightGBM...),
+    entrées passées par le preprocessing du Pipeline. S'appelle comme shap.Explainer : explainer(X).
     """
-    model = main.get_model()
-    background = get_background()
 
-    # Si c'est un Pipeline sklearn, on prend l'estimator final
-    estimator = model
-    if hasattr(model, "steps") and len(model.steps) > 0:
-        estimator = model.steps[-1][1]
+    def __init__(self, transformers, tree_explainer):
+        self.transformers = transformers
+        self.tree_explainer = tree_explainer
+
+    def __call__(self, X: np.ndarray):
+        X_t = apply_transformers(self.transformers, np.asarray(X, dtype=float))
+        return self.tree_explainer(X_t, check_additivity=False)
+
+
+# Choix de l'explainer (exposé dans /stats) : kind, reason, estimator...
+explainer_info: Optional[Dict[str, Any]] = None
 
-    name = type(estimator).__name__.lower()
 
-    # XGBoost / LightGBM: TreeExplainer est le plus adapté
+def _interventional_tree_explainer(estimator, background: np.ndarray):
+    """
+    TreeSHAP interventional exprimé en probabilité (mêmes unités que l'explainer générique
+    sur predict_proba) : les boostings (GradientBoosting, HistGradientBoosting, LightGBM...)
+    produisent sinon des log-odds. Sortie brute si shap ne sait pas convertir le modèle.
+    """
     try:
-        if "xgb" in name or "xgboost" in name or "lgbm" in name or "lightgbm" in name:
-            return shap.TreeExplainer(estimator, data=background, feature_perturbation="interventional")
+        return shap.TreeExplainer(
+            estimator, data=background, feature_perturbation="interventional", model_output="probability"
+        )
     except Exception:
-        pass
+        return shap.TreeExplainer(estimator, data=background, feature_perturbation="interventional")
+
+
+def tree_output_space(tree) -> str:
+    """Unités des SHAP values TreeSHAP : "probability" ou sortie brute des arbres (ex: "log_odds")."""
+    if tree.model_output == "probability":
+        return "probability"
+    return str(getattr(tree.model, "tree_output", tree.model_output))
+
+
+def select_explainer(model, background: np.ndarray):
+    """
+    Choisit l'explainer selon les capacités du modèle :
+    - TreeSHAP (TreeExplainer) si shap sait lire l'estimator final comme un ensemble d'arbres
+      et que le preprocessing conserve les features une à une
+    - sinon explainer générique (permutation) sur predict_proba du modèle complet
+    Renvoie (explainer, info) ; info["output_space"] : unités des SHAP values (probabilité,
+    sauf TreeSHAP tree_path_dependent sur un boosting : log-odds).
+    """
+    transformers, estimator = split_pipeline(model)
+    info = {"estimator": type(estimator).__name__, "preprocessing_steps": [type(t).__name__ for t in transformers]}
+
+    try:
+        bg = apply_transformers(transformers, background)
+        if bg.shape[1] != len(FEATURE_ORDER):
+            raise ValueError(f"le preprocessing produit {bg.shape[1]} colonnes au lieu de {len(FEATURE_ORDER)}")
+
+        if SHAP_TREE_MODE == "tree_path_dependent":
+            tree = shap.TreeExplainer(estimator, feature_perturbation="tree_path_dependent")
+        else:
+            tree = _interventional_tree_explainer(estimator, bg[:N_TREE_BACKGROUND])
+        info.update({
+            "kind": "tree",
+            "feature_perturbation": SHAP_TREE_MODE,
+            "model_output": str(tree.model_output),
+            "output_space": tree_output_space(tree),
+            "reason": "estimator final supporté par shap.TreeExplainer (TreeSHAP exact)",
+        })
+        return TreeModelExplainer(transformers, tree), info
+    except Exception as e:
+        tree_error = f"{type(e).__name__}: {e}"
 
     # Fallback générique : expliquer via une fonction predict_proba si dispo
     if hasattr(model, "predict_proba"):
         def f(X):
             return model.predict_proba(X)[:, 1]
-        return shap.Explainer(f, background)
+        explainer = shap.Explainer(f, background)
+        info["model_output"] = "predict_proba[:, 1]"
+    else:
+        explainer = shap.Explainer(estimator, background)
+        info["model_output"] = "estimator"
+
+    info.update({
+        "kind": type(explainer).__name__.lower(),
+        "output_space": "probability" if hasattr(model, "predict_proba") else "raw",
+        "reason": f"TreeSHAP indisponible ({tree_error})",
+    })
+    return explainer, info
+
+
+@lru_cache(maxsize=1)
+def get_explainer():
+    """
+    Crée et met en cache l'explainer SHAP (choix : select_explainer).
+    Supporte Pipeline sklearn / imblearn (preprocessing appliqué, estimator final expliqué).
+    """
+    global explainer_info
+    import api.main as main
+
+    explainer, info = select_explainer(main.get_model(), get_background())
+    explainer_info = info
+    print(f"🧠 Explainer SHAP : {info['kind']} sur {info['estimator']} — {info['reason']}")
+    return explainer
 
-    return shap.Explainer(estimator, background)
 
+def _cached_explanations(X: np.ndarray):
+    """Clés de cache, payloads déjà en cache (None sinon) et indices des lignes à calculer."""
+    version = get_model_version()
+    keys = [feature_key(row, version) for row in X]
+    payloads: List[Optional[Dict[str, Any]]] = [explanation_cache.get(k) for k in keys]
+    todo = [i for i, p in enumerate(payloads) if p is None]
+    return keys, payloads, todo
 
 
-def explain_one(X_one: np.ndarray) -> Dict[str, Any]:
+def _store_explanations(keys, payloads, todo, values, base_values) -> List[Dict[str, Any]]:
+    for j, i in enumerate(todo):
+        payload = {
+            "base_value": float(base_values[j]),
+            "shap_values": values[j].tolist(),
+            "feature_names": FEATURE_ORDER,
+        }
+        explanation_cache.put(keys[i], payload)
+        payloads[i] = payload
+    return [dict(p) for p in payloads]
+
+
+def explain_many(X: np.ndarray, compute: Callable[[np.ndarray], tuple] = None) -> List[Dict[str, Any]]:
     """
-    Calcule les SHAP values pour un seul client.
-    Entrée: X_one shape (1, n_features) déjà preprocessé.
-    Retour: dict contenant base_value + shap_values (liste) + feature_names.
+    SHAP values d'un lot de clients : les lignes déjà en cache sont servies directement,
+    les autres sont calculées en un seul appel vectorisé à l'explainer.
+    Entrée: X shape (n, n_features). Retour: un payload explain_one par ligne.
+    compute : calcul des lignes manquantes (défaut shap_matrix).
     """
-    X_one = np.array(X_one).reshape(1, -1)
-    explainer = get_explainer()
+    X = np.array(X).reshape(-1, len(FEATURE_ORDER))
+    keys, payloads, todo = _cached_explanations(X)
+    values, base_values = (compute or shap_matrix)(X[todo]) if todo else (None, None)
+    return _store_explanations(keys, payloads, todo, values, base_values)
 
-    sv = explainer(X_one)
 
-    # shap.Explanation : values shape (1, n_features) ou (n_features,)
-    values = sv.values
-    base_values = sv.base_values
+async def explain_many_async(X: np.ndarray, compute: Callable[[np.ndarray], Awaitable[tuple]]) -> List[Dict[str, Any]]:
+    """
+    explain_many depuis un handler async : cache consulté dans la boucle (hash du vecteur),
+    lignes manquantes calculées par la coroutine compute (ex: executor explain de l'API)
+    sans bloquer de thread en attente du résultat.
+    """
+    X = np.array(X).reshape(-1, len(FEATURE_ORDER))
+    keys, payloads, todo = _cached_explanations(X)
+    values, base_values = await compute(X[todo]) if todo else (None, None)
+    return _store_explanations(keys, payloads, todo, values, base_values)
 
-    # Normalisation en listes JSON-serializable
-    if isinstance(values, np.ndarray):
-        if values.ndim == 2:
-            values_1d = values[0].tolist()
-        else:
-            values_1d = values.tolist()
-    else:
-        values_1d = list(values)
 
-    if isinstance(base_values, np.ndarray):
-        base_value = float(base_values[0]) if base_values.ndim > 0 else float(base_values)
-    else:
-        base_value = float(base_values)
+def explain_one(X_one: np.ndarray, compute: Callable[[np.ndarray], tuple] = None) -> Dict[str, Any]:
+    """
+    Calcule les SHAP values pour un seul client.
+    Entrée: X_one shape (1, n_features) déjà preprocessé.
+    Retour: dict contenant base_value + shap_values (liste) + feature_names.
+    Résultat mis en cache (explanation_cache) par vecteur de features + version du modèle.
+    """
+    return explain_many(np.array(X_one).reshape(1, -1), compute=compute)[0]
+
 
-    return {
-        "base_value": base_value,
-        "shap_values": values_1d,
-        "feature_names": FEATURE_ORDER,
-    }
+async def explain_one_async(X_one: np.ndarray, compute: Callable[[np.ndarray], Awaitable[tuple]]) -> Dict[str, Any]:
+    """explain_one depuis un handler async (cf. explain_many_async)."""
+    return (await explain_many_async(np.array(X_one).reshape(1, -1), compute))[0]
 
 
 def top_contributions(
@@ -160,21 +365,13 @@ def top_contributions(
 
     return rows[:top_n]
 
-@lru_cache(maxsize=1)
-def get_global_importance(top_n: int = 20):
+def positive_class_matrix(values, n: int) -> np.ndarray:
     """
-    Importance globale SHAP = mean(|shap|) sur le background.
+    Normalise les SHAP values en matrice (n, p) pour la classe positive.
     Robuste aux différents formats de sv.values (list, (n,p), (n,p,2), (2,n,p), etc.).
     """
-    background = get_background()
-    explainer = get_explainer()
-
-    sv = explainer(background)
-
     p = len(FEATURE_ORDER)
 
-    values = sv.values
-
     # 1) Si shap renvoie une liste (souvent une par classe), on prend la classe 1 si possible
     if isinstance(values, list):
         # list of arrays: [class0_matrix, class1_matrix]
@@ -188,30 +385,41 @@ def get_global_importance(top_n: int = 20):
     # 2) Normaliser en matrice (n, p) correspondant à la classe positive
     if values.ndim == 2:
         # (n, p) OK
-        M = values
+        return values
 
-    elif values.ndim == 3:
+    if values.ndim == 3:
         # Cas (n, p, 2) : dernière dim = classes
-        if values.shape[0] == background.shape[0] and values.shape[1] == p and values.shape[2] >= 2:
-            M = values[:, :, 1]
+        if values.shape[0] == n and values.shape[1] == p and values.shape[2] >= 2:
+            return values[:, :, 1]
 
         # Cas (2, n, p) : première dim = classes
-        elif values.shape[0] >= 2 and values.shape[1] == background.shape[0] and values.shape[2] == p:
-            M = values[1, :, :]
+        if values.shape[0] >= 2 and values.shape[1] == n and values.shape[2] == p:
+            return values[1, :, :]
 
         # Cas rare : (n, 2, p)
-        elif values.shape[0] == background.shape[0] and values.shape[1] >= 2 and values.shape[2] == p:
-            M = values[:, 1, :]
+        if values.shape[0] == n and values.shape[1] >= 2 and values.shape[2] == p:
+            return values[:, 1, :]
 
-        else:
-            raise ValueError(f"Format SHAP inattendu pour global_importance: values.shape={values.shape}, attendu p={p}")
+        raise ValueError(f"Format SHAP inattendu: values.shape={values.shape}, attendu p={p}")
 
-    else:
-        raise ValueError(f"Format SHAP inattendu pour global_importance: values.ndim={values.ndim}, shape={values.shape}")
+    raise ValueError(f"Format SHAP inattendu: values.ndim={values.ndim}, shape={values.shape}")
 
-    mean_abs = np.mean(np.abs(M), axis=0)
 
-    rows = [{"feature": f, "importance": float(imp)} for f, imp in zip(FEATURE_ORDER, mean_abs.tolist())]
-    rows.sort(key=lambda r: r["importance"], reverse=True)
-    return rows[:top_n]
+def shap_matrix(X: np.ndarray):
+    """
+    SHAP values d'un lot de clients en un seul appel à l'explainer.
+    Entrée: X shape (n, n_features). Retour: (values (n, p), base_values (n,)).
+    """
+    X = np.array(X).reshape(-1, len(FEATURE_ORDER))
+    sv = get_explainer()(X)
+
+    values = positive_class_matrix(sv.values, n=X.shape[0])
+
+    base_values = np.array(sv.base_values, dtype=float)
+    if base_values.ndim == 2:
+        # (n, n_classes) -> classe positive
+        base_values = base_values[:, -1]
+    if base_values.size == 1:
+        base_values = np.full(X.shape[0], float(base_values.reshape(-1)[0]))
 
+    return values, base_values
@@ -1,24 +1,86 @@
+import asyncio
+import gc
+import hashlib
+import json
 import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from functools import lru_cache
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from fastapi import FastAPI, HTTPException
-
-from api.schemas.input_schema import CustomerFeatures, FEATURE_ORDER
-from api.model.loader import load_model
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from api.schemas.input_schema import BatchFeatures, CustomerFeatures, FEATURE_ORDER
+from api.model.loader import TESTING, load_model
+from api.model.batching import MicroBatcher
+from api.model.compiled import NotCompilable, compile_model, validate_compiled
+from api.data.client_store import CLIENT_COLUMNS, DEFAULT_PROFILE_COLUMNS, ClientStore
+from api.data.population_stats import DEFAULT_BINS, MAX_BINS, PopulationStats, density_grid
+import api.data.shared_arrays as shared_arrays
+from api.data.formats import (
+    BINARY_FORMATS,
+    FORMAT_RECORDS,
+    MEDIA_TYPES,
+    arrow_available,
+    encode_frame,
+    negotiate_format,
+)
+from api.data.columnar import (
+    is_columnar_store,
+    load_columnar_store,
+    read_manifest,
+    read_projected,
+    source_fingerprint,
+)
 from api.utils.business_cost import COST_FN, COST_FP
-from api.utils.logging import log_prediction
-from api.model.preprocess import preprocess_X
-from api.explain.shap_explainer import explain_one, top_contributions, get_global_importance
+from api.utils.concurrency import (
+    executors_stats,
+    limiter_from_env,
+    run_explain,
+    run_model,
+    shutdown_executors,
+    start_explain_processes,
+)
+from api.utils.logging import log_prediction, log_predictions, prediction_logger
+from api.utils.drift import (
+    DRIFT_REFERENCE_PATH,
+    DriftTracker,
+    build_reference_profile,
+    load_reference_profile,
+    sketches_from_profile,
+)
+import api.explain.shap_explainer as shap_explainer
+from api.explain.shap_explainer import explain_one_async, explanation_cache, top_contributions
+from api.explain.precomputed import get_precomputed_shap
+from api.explain.global_importance import get_global_importance, recompute_global_importance
+
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up au démarrage du process (cf. section Warm-up plus bas)
+    start_warmup(WARMUP_MODE)
+    start_explain_processes()
+    yield
+    # Arrêt : termine les prédictions en file puis écrit les logs encore en attente
+    if _predict_batcher is not None:
+        _predict_batcher.close()
+    shutdown_executors()
+    prediction_logger.close()
 
 
 app = FastAPI(
     title="Credit Scoring API",
     description="API pour prédire le risque client",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -29,17 +91,36 @@ THRESHOLD = 0.42
 # Possible de le surcharger en prod avec une variable d'env CLIENT_DATA_PATH
 CLIENT_DATA_PATH = os.getenv("CLIENT_DATA_PATH", "data/application_test.csv")
 
-# (Optionnel) Liste de champs "profil" à renvoyer en plus (si présents dans le fichier)
-# Possible  d'adapter plus tard sans casser l'API.
-DEFAULT_PROFILE_COLUMNS = [
-    "SK_ID_CURR",
-    "CODE_GENDER",
-    "NAME_FAMILY_STATUS",
-    "NAME_INCOME_TYPE",
-    "AMT_INCOME_TOTAL",
-    "AMT_CREDIT",
-    "AMT_ANNUITY",
-]
+# Store colonnaire (.npy memory-mappés, cf. api.data.columnar) : utilisé en priorité s'il existe
+CLIENT_STORE_DIR = os.getenv("CLIENT_STORE_DIR", "data/client_store")
+
+# Taille max d'un lot /predict/batch (au-delà : 413, découper côté client)
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "100000"))
+
+# Micro-batching de /predict (opt-in) : requêtes concurrentes regroupées en un seul predict_proba,
+# lot envoyé dès PREDICT_BATCH_MAX_SIZE lignes ou PREDICT_BATCH_MAX_WAIT_MS après la première
+PREDICT_BATCHING = os.getenv("PREDICT_BATCHING", "0") == "1"
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "32"))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "2"))
+
+# Inférence compilée (opt-in) : Pipeline réduit à du NumPy, activé seulement s'il reproduit
+# les probabilités du Pipeline sur la population de référence (cf. api/model/compiled.py)
+COMPILED_INFERENCE = os.getenv("COMPILED_INFERENCE", "0") == "1"
+COMPILED_TOLERANCE = float(os.getenv("COMPILED_TOLERANCE", "1e-6"))
+COMPILED_VALIDATION_ROWS = int(os.getenv("COMPILED_VALIDATION_ROWS", "5000"))
+
+# Limites de concurrence par endpoint (cf. api.utils.concurrency) : <PREFIX>_MAX_CONCURRENCY,
+# <PREFIX>_MAX_QUEUE, <PREFIX>_QUEUE_TIMEOUT ; file pleine -> 429, attente trop longue -> 503
+PREDICT_LIMITER = limiter_from_env("predict", "PREDICT", limit=64, max_queue=256)
+BATCH_LIMITER = limiter_from_env("predict/batch", "BATCH", limit=2, max_queue=4, queue_timeout=30)
+EXPLAIN_LIMITER = limiter_from_env("explain", "EXPLAIN", limit=4, max_queue=8, queue_timeout=10)
+
+# Jeton des endpoints /admin (header X-Admin-Token) ; non défini = endpoints admin désactivés
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Warm-up au boot : "background" (thread, /ready passe à 200 une fois fini),
+# "sync" (le serveur n'accepte le trafic qu'après le warm-up) ou "off" (chargement paresseux)
+WARMUP_MODE = os.getenv("WARMUP_MODE", "off" if TESTING else "background").lower()
 
 
 # ----------------------------
@@ -51,13 +132,70 @@ def get_model():
     return load_model()
 
 
+# Mode d'inférence retenu (exposé dans /stats)
+inference_info: Dict[str, Any] = {"mode": "pipeline", "enabled": COMPILED_INFERENCE}
+
+
+def compiled_reference_rows() -> np.ndarray:
+    """Lignes brutes (FEATURE_ORDER, NaN inclus) de la population clients pour valider le modèle compilé."""
+    features = np.asarray(get_client_store().features, dtype=np.float64)
+    if len(features) > COMPILED_VALIDATION_ROWS:
+        idx = np.random.default_rng(POPULATION_SEED).choice(len(features), COMPILED_VALIDATION_ROWS, replace=False)
+        features = features[np.sort(idx)]
+    return features
+
+
+@lru_cache(maxsize=1)
+def get_inference_model():
+    """
+    Modèle utilisé pour le scoring (/predict, /predict/batch, proba de /explain).
+    COMPILED_INFERENCE=1 : version compilée si elle est supportée et validée contre le Pipeline
+    (écart max <= COMPILED_TOLERANCE) ; sinon, ou sans données de référence, le Pipeline.
+    SHAP utilise toujours le Pipeline (get_model).
+    """
+    model = get_model()
+    if not COMPILED_INFERENCE:
+        return model
+
+    try:
+        X_ref = compiled_reference_rows()
+        compiled = compile_model(model, len(FEATURE_ORDER), X_fit=X_ref)
+        report = validate_compiled(compiled, model, X_ref, COMPILED_TOLERANCE)
+    except NotCompilable as e:
+        inference_info.update({"mode": "pipeline", "reason": f"non supporté : {e}"})
+        print(f"⚠️ Inférence compilée désactivée ({e})")
+        return model
+    except Exception as e:
+        inference_info.update({"mode": "pipeline", "reason": f"validation impossible : {e}"})
+        print(f"⚠️ Inférence compilée désactivée, validation impossible ({e})")
+        return model
+
+    inference_info.update({"estimator": compiled.estimator_name, "validation": report})
+    if not report["ok"]:
+        inference_info.update({"mode": "pipeline", "reason": "écart au Pipeline supérieur à la tolérance"})
+        print(f"⚠️ Inférence compilée désactivée (écart max {report['max_abs_diff']:.2e} > {COMPILED_TOLERANCE:.0e})")
+        return model
+
+    inference_info.update({"mode": "compiled", "reason": None})
+    print(f"✅ Inférence compilée ({compiled.estimator_name}, écart max {report['max_abs_diff']:.2e} sur {report['n_rows']} lignes)")
+    return compiled
+
+
 @lru_cache(maxsize=1)
 def get_clients_df() -> pd.DataFrame:
     """
     Charge le dataset clients (cache process).
     Attendu : colonne SK_ID_CURR + colonnes features.
+    Seules les colonnes CLIENT_COLUMNS sont chargées :
+    - store colonnaire memory-mappé si disponible (CLIENT_DATA_PATH ou CLIENT_STORE_DIR)
+    - sinon lecture CSV/Parquet avec projection des colonnes
     """
-    if not os.path.exists(CLIENT_DATA_PATH):
+    store_dir = CLIENT_DATA_PATH if is_columnar_store(CLIENT_DATA_PATH) else CLIENT_STORE_DIR
+    if is_columnar_store(store_dir):
+        _warn_if_store_stale(store_dir)
+        df = load_columnar_store(store_dir, CLIENT_COLUMNS)
+
+    elif not os.path.exists(CLIENT_DATA_PATH):
         # On ne bloque pas l'API predict si le fichier n'existe pas,
         # mais /client/{id} renverra une erreur explicite.
         raise FileNotFoundError(
@@ -65,41 +203,421 @@ def get_clients_df() -> pd.DataFrame:
             "Définis CLIENT_DATA_PATH (env var) ou ajoute le fichier dans data/."
         )
 
-    if CLIENT_DATA_PATH.lower().endswith(".parquet"):
-        df = pd.read_parquet(CLIENT_DATA_PATH)
     else:
-        df = pd.read_csv(CLIENT_DATA_PATH)
+        df = read_projected(CLIENT_DATA_PATH, CLIENT_COLUMNS)
 
     if "SK_ID_CURR" not in df.columns:
         raise ValueError("Le dataset clients doit contenir la colonne 'SK_ID_CURR'.")
 
     return df
 
-def json_safe_dict(d: dict) -> dict:
+
+def _warn_if_store_stale(store_dir: str) -> None:
+    """Prévient si le fichier source a changé depuis la construction du store."""
+    source = read_manifest(store_dir).get("source_fingerprint")
+    if os.path.isfile(CLIENT_DATA_PATH) and source is not None and source != source_fingerprint(CLIENT_DATA_PATH):
+        print(f"⚠️ Store colonnaire {store_dir} plus ancien que {CLIENT_DATA_PATH} : relancer api.data.columnar.")
+
+_client_store = None
+_client_store_lock = threading.Lock()
+
+
+def get_client_store() -> ClientStore:
     """
-    Convertit un dict issu de pandas/numpy en dict JSON-safe :
-    - NaN / inf / -inf -> None
-    - types numpy -> types Python natifs
+    Index clients (SK_ID_CURR -> features/profil) construit une seule fois
+    à partir de get_clients_df(). Reconstruit si le DataFrame source change.
     """
-    out = {}
-    for k, v in d.items():
-        # None reste None
-        if v is None:
-            out[k] = None
-            continue
+    global _client_store
 
-        # numpy scalar -> python scalar
-        if isinstance(v, (np.generic,)):
-            v = v.item()
+    df = get_clients_df()
+    cached = _client_store
+    if cached is not None and cached[0] is df:
+        return cached[1]
 
-        # float NaN/inf -> None
-        if isinstance(v, float):
-            if np.isnan(v) or np.isinf(v):
-                out[k] = None
-                continue
+    with _client_store_lock:
+        cached = _client_store
+        if cached is None or cached[0] is not df:
+            # Matrice features : une seule copie physique pour tous les workers (SHARED_ARRAYS_DIR)
+            features = shared_arrays.shared_array(
+                "client_features",
+                shared_key(features=FEATURE_ORDER),
+                lambda: ClientStore.feature_matrix(df, FEATURE_ORDER),
+            )
+            store = ClientStore.from_frame(df, FEATURE_ORDER, DEFAULT_PROFILE_COLUMNS, features=features)
+            cached = (df, store)
+            _client_store = cached
+    return cached[1]
 
-        out[k] = v
-    return out
+
+_population_stats = None
+_population_stats_lock = threading.Lock()
+
+
+def get_population_stats() -> PopulationStats:
+    """
+    Distributions triées par feature (toute la population), construites une seule fois
+    à partir de get_clients_df(). Reconstruites si le DataFrame source change.
+    """
+    global _population_stats
+
+    df = get_clients_df()
+    cached = _population_stats
+    if cached is not None and cached[0] is df:
+        return cached[1]
+
+    with _population_stats_lock:
+        cached = _population_stats
+        if cached is None or cached[0] is not df:
+            columns = FEATURE_ORDER + [c for c in DEFAULT_PROFILE_COLUMNS if c != "SK_ID_CURR"]
+            cached = (df, _build_population_stats(df, columns))
+            _population_stats = cached
+    return cached[1]
+
+
+def _build_population_stats(df: pd.DataFrame, columns: List[str]) -> PopulationStats:
+    """PopulationStats dont les valeurs triées sont partagées entre workers (SHARED_ARRAYS_DIR)."""
+    key = shared_key(columns=columns)
+    if key is None or shared_arrays.shared_dir() is None:
+        return PopulationStats.from_frame(df, columns)
+
+    counts = {}
+    for name in PopulationStats.numeric_columns(df, columns):
+        n_present = int(np.isfinite(df[name].to_numpy(dtype=np.float64, na_value=np.nan)).sum())
+        counts[name] = (n_present, len(df) - n_present)
+    packed = shared_arrays.shared_array(
+        "population_sorted", key, lambda: PopulationStats.from_frame(df, columns).packed()
+    )
+    return PopulationStats.from_packed(packed, counts, len(df))
+
+
+# Grilles de densité 2-D (toute la population) : cache par (x, y, bins, clip)
+DENSITY_MAX_BINS = 100
+DENSITY_CACHE_SIZE = 64
+
+_density_grids: "OrderedDict[Tuple[str, str, int, int, float], Dict[str, Any]]" = OrderedDict()
+_density_store = None
+_density_lock = threading.Lock()
+
+
+def get_density_grid(x: str, y: str, bins_x: int, bins_y: int, clip: float = 0.0) -> Dict[str, Any]:
+    """
+    Grille de comptage 2-D d'un couple de features sur toute la population (matrice du ClientStore).
+    Plage de chaque axe = quantiles [clip, 1 - clip] (exclut les valeurs aberrantes des bords).
+    """
+    global _density_store
+
+    store = get_client_store()
+    key = (x, y, bins_x, bins_y, clip)
+    with _density_lock:
+        if _density_store is not store:
+            _density_grids.clear()
+            _density_store = store
+        cached = _density_grids.get(key)
+        if cached is not None:
+            _density_grids.move_to_end(key)
+            return cached
+
+    stats = get_population_stats()
+    dx, dy = stats.get(x), stats.get(y)
+    if dx is None or dy is None or dx.n == 0 or dy.n == 0:
+        grid = {"x_edges": [], "y_edges": [], "counts": [], "n": 0, "n_missing": len(store), "n_outside": 0}
+    else:
+        grid = density_grid(
+            store.features[:, store.feature_names.index(x)],
+            store.features[:, store.feature_names.index(y)],
+            x_range=(dx.quantile(clip), dx.quantile(1.0 - clip)),
+            y_range=(dy.quantile(clip), dy.quantile(1.0 - clip)),
+            bins=(bins_x, bins_y),
+        )
+    grid = {"x": x, "y": y, "bins": [bins_x, bins_y], "clip": clip, **grid}
+
+    with _density_lock:
+        if _density_store is store:
+            _density_grids[key] = grid
+            while len(_density_grids) > DENSITY_CACHE_SIZE:
+                _density_grids.popitem(last=False)
+    return grid
+
+
+def _parse_quantiles(quantiles: Optional[str]) -> Optional[List[float]]:
+    """ "0.25,0.5,0.75" -> [0.25, 0.5, 0.75] ; 422 si une valeur est hors [0, 1]."""
+    if not quantiles:
+        return None
+    try:
+        values = [float(q) for q in quantiles.split(",") if q.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Quantiles invalides : {quantiles}")
+    if any(not 0.0 <= q <= 1.0 for q in values):
+        raise HTTPException(status_code=422, detail="Les quantiles doivent être compris entre 0 et 1.")
+    return values
+
+
+def _check_finite_value(value: Optional[float]) -> None:
+    """422 si value vaut nan / inf (rang percentile non défini, non sérialisable en JSON)."""
+    if value is not None and not np.isfinite(value):
+        raise HTTPException(status_code=422, detail=f"value doit être un nombre fini (reçu : {value}).")
+
+
+# Échantillon fixe (seed) -> même réponse à chaque appel : encodé une fois par (n, format)
+POPULATION_SEED = 42
+POPULATION_CACHE_SIZE = 8
+
+_population_snapshots: "OrderedDict[Tuple[int, str], Tuple[str, bytes]]" = OrderedDict()
+_population_df = None
+_population_lock = threading.Lock()
+
+
+def clients_source_fingerprint() -> Optional[Dict[str, Any]]:
+    """Empreinte de la source clients (store colonnaire ou fichier), None si indisponible."""
+    store_dir = CLIENT_DATA_PATH if is_columnar_store(CLIENT_DATA_PATH) else CLIENT_STORE_DIR
+    if is_columnar_store(store_dir):
+        manifest = read_manifest(store_dir)
+        return {"store": manifest.get("source_fingerprint"), "n_rows": manifest.get("n_rows")}
+    if os.path.isfile(CLIENT_DATA_PATH):
+        return source_fingerprint(CLIENT_DATA_PATH)
+    return None
+
+
+def shared_key(**params) -> Optional[Dict[str, Any]]:
+    """Clé d'un tableau partagé dérivé des données clients (None si la source est inconnue : pas de partage)."""
+    fingerprint = clients_source_fingerprint()
+    if fingerprint is None:
+        return None
+    return {"source": fingerprint, "path": os.path.abspath(CLIENT_DATA_PATH), **params}
+
+
+def build_population_snapshot(df: pd.DataFrame, n: int, fmt: str = FORMAT_RECORDS) -> Tuple[str, bytes]:
+    """Échantillonne, sérialise dans le format demandé (bytes) et calcule l'ETag."""
+    cols = ["SK_ID_CURR"]
+    cols += [c for c in FEATURE_ORDER if c in df.columns]
+    cols += [c for c in DEFAULT_PROFILE_COLUMNS if c in df.columns and c not in cols]
+
+    sample = df[cols].sample(n=n, random_state=POPULATION_SEED)
+    body = encode_frame(sample, fmt, meta={"n": n})
+
+    fingerprint = clients_source_fingerprint()
+    if fingerprint is None:
+        # Source inconnue : empreinte du contenu
+        digest = hashlib.sha1(body).hexdigest()
+    else:
+        key = json.dumps(
+            {"source": fingerprint, "seed": POPULATION_SEED, "n": n, "columns": cols, "format": fmt}, sort_keys=True
+        )
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"', body
+
+
+def get_population_snapshot(df: pd.DataFrame, n: int, fmt: str = FORMAT_RECORDS) -> Tuple[str, bytes]:
+    """(ETag, corps) de l'échantillon de taille n ; caché par (n, format) tant que le DataFrame source est le même."""
+    global _population_df
+
+    n = max(min(int(n), len(df)), 0)
+    key = (n, fmt)
+    with _population_lock:
+        if _population_df is not df:
+            _population_snapshots.clear()
+            _population_df = df
+        cached = _population_snapshots.get(key)
+        if cached is not None:
+            _population_snapshots.move_to_end(key)
+            return cached
+
+    snapshot = build_population_snapshot(df, n, fmt)
+
+    with _population_lock:
+        if _population_df is df:
+            _population_snapshots[key] = snapshot
+            while len(_population_snapshots) > POPULATION_CACHE_SIZE:
+                _population_snapshots.popitem(last=False)
+    return snapshot
+
+
+def response_format(fmt: Optional[str], accept: Optional[str]) -> str:
+    """Format de réponse négocié (paramètre format ou en-tête Accept) ; 422 si inconnu, 406 si indisponible."""
+    try:
+        fmt = negotiate_format(fmt, accept)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if fmt in BINARY_FORMATS and not arrow_available():
+        raise HTTPException(status_code=406, detail=f"Format {fmt} indisponible : pyarrow n'est pas installé côté API.")
+    return fmt
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match : liste d'ETags (faibles acceptés) ou "*"."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+_drift_tracker = None
+_drift_tracker_lock = threading.Lock()
+
+
+def get_drift_tracker() -> DriftTracker:
+    """
+    Suivi de drift en continu (créé une fois, branché sur le logger de prédictions).
+    Référence : profil DRIFT_REFERENCE_PATH s'il existe, sinon population clients chargée.
+    Les prédictions loggées avant sa création ne sont pas comptées.
+    """
+    global _drift_tracker
+
+    if _drift_tracker is None:
+        with _drift_tracker_lock:
+            if _drift_tracker is None:
+                if os.path.exists(DRIFT_REFERENCE_PATH):
+                    profile = load_reference_profile(DRIFT_REFERENCE_PATH)
+                    source = DRIFT_REFERENCE_PATH
+                else:
+                    print(f"⚠️ Profil de référence {DRIFT_REFERENCE_PATH} absent : référence = population clients.")
+                    profile = build_reference_profile(get_clients_df(), FEATURE_ORDER)
+                    source = "clients"
+                tracker = DriftTracker(sketches_from_profile(profile, FEATURE_ORDER), source=source)
+                prediction_logger.add_sink(tracker)
+                _drift_tracker = tracker
+    return _drift_tracker
+
+
+def predict_proba_matrix(model, X: np.ndarray) -> np.ndarray:
+    """
+    Probabilités de défaut (classe 1) pour une matrice (n, n_features).
+    Un seul appel au modèle quel que soit n. Supporte le dummy model (predict seul).
+    """
+    if hasattr(model, "predict_proba"):
+        return np.asarray(model.predict_proba(X), dtype=float)[:, 1]
+    return np.asarray(model.predict(X), dtype=float)
+
+
+_predict_batcher = None
+_predict_batcher_lock = threading.Lock()
+
+
+def get_predict_batcher() -> MicroBatcher:
+    """Micro-batcher de /predict (créé à la 1ère requête : thread démarré dans le worker, pas dans le master)."""
+    global _predict_batcher
+
+    if _predict_batcher is None:
+        with _predict_batcher_lock:
+            if _predict_batcher is None:
+                _predict_batcher = MicroBatcher(
+                    lambda X: predict_proba_matrix(get_inference_model(), X),
+                    max_batch_size=PREDICT_BATCH_MAX_SIZE,
+                    max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS,
+                )
+    return _predict_batcher
+
+
+def _batch_records(payload: BatchFeatures) -> List[Any]:
+    """Normalise le payload batch (records ou colonnes) en liste d'enregistrements."""
+    if (payload.records is None) == (payload.columns is None):
+        raise HTTPException(status_code=422, detail="Fournir exactement un des champs 'records' ou 'columns'.")
+
+    if payload.records is not None:
+        return payload.records
+
+    columns = payload.columns
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise HTTPException(status_code=422, detail="Toutes les colonnes doivent avoir la même longueur.")
+    n = lengths.pop() if lengths else 0
+
+    used = [c for c in FEATURE_ORDER if c in columns]
+    return [{c: columns[c][i] for c in used} for i in range(n)]
+
+
+
+# ----------------------------
+# Warm-up (readiness)
+# ----------------------------
+# Étapes obligatoires : si elles échouent, l'instance n'est pas prête
+REQUIRED_WARMUP_STEPS = {"model"}
+
+_readiness: Dict[str, Any] = {"status": "ready", "mode": "off", "steps": {}, "duration_s": None}
+_readiness_lock = threading.Lock()
+
+
+def warmup_steps() -> List[Tuple[str, Callable[[], Any]]]:
+    """Artefacts construits au démarrage (ordre = dépendances)."""
+    return [
+        ("model", lambda: get_model()),
+        ("clients", lambda: get_clients_df()),
+        ("client_store", lambda: get_client_store()),
+        ("inference_model", lambda: get_inference_model()),
+        ("population_stats", lambda: get_population_stats()),
+        ("population_sample", lambda: get_population_snapshot(get_clients_df(), 2000)),
+        ("background", lambda: shap_explainer.get_background()),
+        ("explainer", lambda: shap_explainer.get_explainer()),
+        ("global_importance", lambda: get_global_importance(top_n=20)),
+        ("precomputed_shap", lambda: get_precomputed_shap()),
+        ("drift_tracker", lambda: get_drift_tracker()),
+    ]
+
+
+def run_warmup() -> Dict[str, Any]:
+    """
+    Construit les artefacts en cache (modèle, données, explainer, importance globale).
+    Une étape optionnelle en échec n'empêche pas la readiness (l'endpoint concerné
+    renverra son erreur habituelle) ; une étape obligatoire en échec -> "failed".
+    """
+    start = time.perf_counter()
+    status = "ready"
+
+    for name, step in warmup_steps():
+        t0 = time.perf_counter()
+        try:
+            step()
+            result = {"ok": True}
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+            print(f"⚠️ Warm-up '{name}' en échec : {e}")
+            if name in REQUIRED_WARMUP_STEPS:
+                status = "failed"
+        result["duration_s"] = round(time.perf_counter() - t0, 3)
+
+        with _readiness_lock:
+            _readiness["steps"][name] = result
+
+    with _readiness_lock:
+        _readiness["status"] = status
+        _readiness["duration_s"] = round(time.perf_counter() - start, 3)
+
+    print(f"🔥 Warm-up terminé ({status}) en {_readiness['duration_s']}s")
+    return readiness()
+
+
+def start_warmup(mode: str) -> None:
+    """Lance le warm-up selon le mode (off / sync / background)."""
+    with _readiness_lock:
+        _readiness.update({"mode": mode, "steps": {}, "duration_s": None})
+        _readiness["status"] = "ready" if mode == "off" else "starting"
+
+    if mode == "sync":
+        run_warmup()
+    elif mode == "background":
+        threading.Thread(target=run_warmup, name="warmup", daemon=True).start()
+
+
+def prefork_warmup() -> Dict[str, Any]:
+    """
+    Warm-up dans le master gunicorn (preload_app, cf. gunicorn.conf.py), avant le fork des workers :
+    modèle, données, stats population, explainer... sont construits une seule fois et hérités
+    par les workers (pages partagées en copy-on-write). Le warm-up des workers (lifespan)
+    retrouve ensuite tout en cache.
+    gc.freeze() : le ramasse-miettes des workers ne parcourt plus ces objets (ce qui
+    dupliquerait leurs pages mémoire).
+    """
+    state = run_warmup()
+    gc.freeze()
+    return state
+
+
+def readiness() -> Dict[str, Any]:
+    with _readiness_lock:
+        return {**_readiness, "steps": dict(_readiness["steps"])}
 
 
 
@@ -107,12 +625,46 @@ def json_safe_dict(d: dict) -> dict:
 # Endpoints
 # ----------------------------
 @app.get("/health")
-def health():
+async def health():
+    # Liveness : le process répond (la readiness est sur /ready)
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness : 200 une fois le warm-up terminé, 503 sinon (à utiliser par le load balancer)."""
+    state = readiness()
+    return JSONResponse(status_code=200 if state["status"] == "ready" else 503, content=state)
+
+
+@app.get("/stats")
+async def stats():
+    """Compteurs internes (caches) pour le suivi de performance."""
+    return {
+        "shap_cache": explanation_cache.stats(),
+        # None tant que l'explainer n'a pas été construit (warm-up ou 1er /explain)
+        "shap_explainer": shap_explainer.explainer_info,
+        "prediction_logger": prediction_logger.stats(),
+        "shared_arrays": shared_arrays.stats(),
+        "inference": inference_info,
+        "predict_batching": _predict_batcher.stats() if _predict_batcher is not None else {"enabled": PREDICT_BATCHING},
+        "executors": executors_stats(),
+        "concurrency": {limiter.name: limiter.stats() for limiter in (PREDICT_LIMITER, BATCH_LIMITER, EXPLAIN_LIMITER)},
+    }
+
+
+@app.get("/drift")
+def drift():
+    """Drift courant (trafic loggé vs référence) : PSI / KS / taux de manquants par feature."""
+    try:
+        tracker = get_drift_tracker()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Suivi de drift indisponible : {e}")
+    return tracker.summary()
+
+
 @app.get("/metadata")
-def metadata():
+async def metadata():
     # Pydantic v1 : CustomerFeatures.__fields__
     fields_info = CustomerFeatures.__fields__
 
@@ -152,79 +704,128 @@ def metadata():
 
 @app.get("/client/{sk_id}")
 def get_client(sk_id: int):
-    def _nan_to_none(v):
-        # Convertit NaN (numpy/pandas) -> None pour un JSON propre
-        return None if pd.isna(v) else v
-
     try:
-        df = get_clients_df()
+        store = get_client_store()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    sub = df.loc[df["SK_ID_CURR"] == sk_id]
-    if sub.empty:
+    found = store.get(sk_id)
+    if found is None:
         raise HTTPException(status_code=404, detail=f"Client SK_ID_CURR={sk_id} introuvable.")
 
-    row = json_safe_dict(sub.iloc[0].to_dict())
-
-    features = {f: _nan_to_none(row.get(f, None)) for f in FEATURE_ORDER}
-
-    profile = {}
-    for col in DEFAULT_PROFILE_COLUMNS:
-        if col in row:
-            profile[col] = _nan_to_none(row.get(col))
-
+    profile = found["profile"]
     profile["SK_ID_CURR"] = sk_id
 
     return {
         "SK_ID_CURR": sk_id,
-        "features": features,
+        "features": found["features"],
         "profile": profile,
     }
 
 
 @app.get("/population/sample")
-def population_sample(n: int = 2000):
+def population_sample(
+    n: int = 2000,
+    fmt: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+):
     """
     Renvoie un échantillon (max n) du dataset de référence, limité à :
     - SK_ID_CURR
     - FEATURE_ORDER
     - DEFAULT_PROFILE_COLUMNS (si dispo)
     Objectif: alimenter les graphiques du dashboard sans exposer tout le dataset.
+    Réponse pré-sérialisée (cache par n et format) + ETag : If-None-Match -> 304.
+    Formats (paramètre format ou Accept) : records (défaut), columns, arrow, parquet.
     """
+    fmt = response_format(fmt, accept)
     try:
         df = get_clients_df()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    n = min(int(n), len(df))
+    etag, body = get_population_snapshot(df, n, fmt)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
 
-    cols = ["SK_ID_CURR"]
-    cols += [c for c in FEATURE_ORDER if c in df.columns]
-    cols += [c for c in DEFAULT_PROFILE_COLUMNS if c in df.columns and c not in cols]
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=MEDIA_TYPES[fmt], headers=headers)
 
-    sample = df[cols].sample(n=n, random_state=42).copy()
 
-    rows = [json_safe_dict(r) for r in sample.to_dict(orient="records")]
-    return {"n": n, "columns": cols, "rows": rows}
+@app.get("/population/stats/{feature}")
+def population_stats(
+    feature: str,
+    bins: int = Query(DEFAULT_BINS, ge=1, le=MAX_BINS),
+    quantiles: Optional[str] = None,
+    value: Optional[float] = None,
+):
+    """
+    Statistiques exactes sur toute la population pour une feature :
+    histogramme (bins), quantiles (ex: quantiles=0.25,0.5,0.75) et,
+    si value est fourni, rang percentile exact de cette valeur.
+    """
+    qs = _parse_quantiles(quantiles)
+    _check_finite_value(value)
+    try:
+        stats = get_population_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+    out = stats.summary(feature, bins=bins, quantiles=qs, value=value)
+    if out is None:
+        raise HTTPException(status_code=404, detail=f"Feature inconnue ou non numérique : {feature}")
+    return out
 
-    # NaN -> None pour JSON propre
-    sample = sample.where(pd.notnull(sample), None)
 
-    return {
-        "n": n,
-        "columns": cols,
-        "rows": sample.to_dict(orient="records"),
-    }
+@app.get("/population/percentile/{feature}")
+def population_percentile(feature: str, value: float):
+    """Rang percentile exact d'une valeur sur toute la population (searchsorted sur valeurs triées)."""
+    _check_finite_value(value)
+    try:
+        stats = get_population_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    dist = stats.get(feature)
+    if dist is None:
+        raise HTTPException(status_code=404, detail=f"Feature inconnue ou non numérique : {feature}")
+    return {"feature": feature, **dist.percentile_rank(value)}
 
 
+@app.get("/population/density")
+def population_density(
+    x: str,
+    y: str,
+    bins: int = Query(40, ge=1, le=DENSITY_MAX_BINS),
+    bins_y: Optional[int] = Query(None, ge=1, le=DENSITY_MAX_BINS),
+    clip: float = Query(0.0, ge=0.0, lt=0.5),
+):
+    """
+    Densité 2-D (grille rectangulaire de comptages) d'un couple de features FEATURE_ORDER
+    sur toute la population : quelques centaines de cases au lieu de centaines de milliers de points.
+    counts[i][j] = nombre de clients dans le bin i de X et le bin j de Y.
+    """
+    unknown = [f for f in (x, y) if f not in FEATURE_ORDER]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Feature(s) inconnue(s) : {unknown}")
+
+    try:
+        return get_density_grid(x, y, bins, bins_y or bins, clip)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 @app.post("/predict")
-def predict(features: CustomerFeatures):
+async def predict(features: CustomerFeatures):
+    async with PREDICT_LIMITER:
+        return await _predict_one(features)
+
+
+async def _predict_one(features: CustomerFeatures) -> Dict[str, Any]:
     # Modèle (cache)
     try:
-        model = get_model()
+        model = await run_model(get_inference_model)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -236,12 +837,12 @@ def predict(features: CustomerFeatures):
         # Sécurisation shape
         X = np.array(X).reshape(1, -1)
 
-        # Support dummy model
-        if hasattr(model, "predict_proba"):
-            proba = float(model.predict_proba(X)[0, 1])
+        if PREDICT_BATCHING:
+            # Regroupé avec les requêtes concurrentes (un seul predict_proba par lot)
+            proba = await asyncio.wrap_future(get_predict_batcher().submit(X[0]))
         else:
-            pred_class = int(model.predict(X)[0])
-            proba = float(pred_class)
+            # Support dummy model
+            proba = float((await run_model(predict_proba_matrix, model, X))[0])
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la prédiction : {e}")
@@ -259,39 +860,139 @@ def predict(features: CustomerFeatures):
         "business_cost_FP": COST_FP,
     }
 
-@app.post("/explain")
-def explain(features: CustomerFeatures, top_n: int = 10):
+@app.post("/predict/batch")
+async def predict_batch(
+    payload: BatchFeatures,
+    fmt: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None),
+):
+    """
+    Scoring par lot : une seule matrice (n, n_features) dans FEATURE_ORDER,
+    un seul appel predict_proba, seuil appliqué en vectoriel.
+    Les lignes invalides sont signalées individuellement (champ "error"),
+    les résultats sont renvoyés dans l'ordre d'entrée.
+    Formats (paramètre format ou Accept) : records (défaut), columns, arrow, parquet.
+    """
+    fmt = response_format(fmt, accept)
+    records = _batch_records(payload)
+    if len(records) > BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lot trop volumineux ({len(records)} lignes, max {BATCH_MAX_ROWS}).",
+        )
+
+    # Validation + scoring (CPU) dans l'executor model, hors de la boucle
+    async with BATCH_LIMITER:
+        return await run_model(_score_batch, records, fmt)
+
+
+def _score_batch(records: List[Any], fmt: str):
+    # Modèle (cache)
+    try:
+        model = get_inference_model()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # Validation ligne à ligne (même schéma que /predict)
+    rows = []
+    valid_index = []
+    valid_features = []
+    errors = {}
+    for i, record in enumerate(records):
+        try:
+            d = CustomerFeatures.parse_obj(record).dict()
+        except ValidationError as e:
+            errors[i] = e.errors()
+            continue
+        valid_index.append(i)
+        valid_features.append(d)
+        rows.append([d.get(f) for f in FEATURE_ORDER])
+
+    try:
+        if rows:
+            # None -> NaN : l'imputation du Pipeline s'en charge
+            X = np.array(rows, dtype=float).reshape(len(rows), len(FEATURE_ORDER))
+            proba = predict_proba_matrix(model, X)
+        else:
+            proba = np.empty(0, dtype=float)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la prédiction : {e}")
+
+    preds = (proba >= THRESHOLD).astype(int)
+
+    # Log (une seule écriture pour tout le lot)
+    log_predictions(valid_features, proba, preds)
+
+    summary = {
+        "n": len(records),
+        "n_scored": len(valid_index),
+        "n_errors": len(errors),
+        "threshold_used": THRESHOLD,
+        "business_cost_FN": COST_FN,
+        "business_cost_FP": COST_FP,
+    }
+
+    if fmt != FORMAT_RECORDS:
+        # Une colonne par champ (erreurs sérialisées en JSON) : pas de dict par ligne
+        probability = np.full(len(records), np.nan)
+        probability[valid_index] = proba
+        prediction = pd.array([None] * len(records), dtype="Int8")
+        prediction[valid_index] = preds
+        error = [None] * len(records)
+        for i, err in errors.items():
+            error[i] = json.dumps(err)
+        frame = pd.DataFrame({
+            "index": np.arange(len(records)),
+            "probability_default": probability,
+            "prediction": prediction,
+            "error": error,
+        })
+        return Response(content=encode_frame(frame, fmt, meta=summary), media_type=MEDIA_TYPES[fmt])
+
+    results: List[Dict[str, Any]] = [None] * len(records)
+    for i, p, y in zip(valid_index, proba.tolist(), preds.tolist()):
+        results[i] = {"index": i, "probability_default": p, "prediction": y}
+    for i, err in errors.items():
+        results[i] = {"index": i, "error": err}
+
+    return {**summary, "results": results}
+
+async def _explain_features(d: Dict[str, Any], top_n: int, shap_payload: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Proba + explication locale/globale pour un dict de features.
+    shap_payload : SHAP déjà connues (précalculées) ; sinon calcul en ligne via explain_one_async
+    (cache du process API, calcul SHAP attendu directement sur l'executor explain).
+    """
     # Modèle (cache)
     try:
-        model = get_model()
+        model = await run_model(get_inference_model)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
     try:
         # Même construction que /predict
-        d = features.dict()
         X = np.array([[d.get(f) for f in FEATURE_ORDER]])
 
         # Sécurisation shape (1, n)
         X = np.array(X).reshape(1, -1)
 
         # Proba / prédiction
-        if hasattr(model, "predict_proba"):
-            proba = float(model.predict_proba(X)[0, 1])
-        else:
-            pred_class = int(model.predict(X)[0])
-            proba = float(pred_class)
+        proba = float((await run_model(predict_proba_matrix, model, X))[0])
 
         pred = int(proba >= THRESHOLD)
 
         # SHAP local
-        shap_payload = explain_one(X)  # base_value + shap_values + feature_names
+        if shap_payload is None:
+            # base_value + shap_values + feature_names
+            shap_payload = await explain_one_async(X, compute=run_explain)
         local_top = top_contributions(d, shap_payload["shap_values"], top_n=top_n)
 
         #SHAP gloabl
-        global_imp = get_global_importance(top_n=20)
-
+        global_imp = await run_in_threadpool(get_global_importance, top_n=20)
 
+    except HTTPException:
+        # ex: 503 si le process pool SHAP est indisponible
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'explication : {e}")
 
@@ -306,3 +1007,57 @@ def explain(features: CustomerFeatures, top_n: int = 10):
         "global_importance": global_imp,
 
     }
+
+
+@app.post("/explain")
+async def explain(features: CustomerFeatures, top_n: int = 10):
+    async with EXPLAIN_LIMITER:
+        return await _explain_features(features.dict(), top_n)
+
+
+@app.post("/admin/global-importance/recompute")
+def admin_recompute_global_importance(x_admin_token: str = Header(None)):
+    """Recalcule l'importance globale SHAP, réécrit l'artefact et rafraîchit le cache."""
+    if not ADMIN_TOKEN or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Accès admin refusé.")
+
+    try:
+        artifact = recompute_global_importance()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors du recalcul : {e}")
+
+    return artifact
+
+
+@app.get("/explain/client/{sk_id}")
+async def explain_client(sk_id: int, top_n: int = 10):
+    """
+    Explication d'un client connu : SHAP précalculées (job api.explain.precomputed)
+    si disponibles pour le modèle courant, sinon calcul en ligne.
+    """
+    async with EXPLAIN_LIMITER:
+        return await _explain_client(sk_id, top_n)
+
+
+async def _explain_client(sk_id: int, top_n: int) -> Dict[str, Any]:
+    try:
+        store = await run_in_threadpool(get_client_store)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    found = store.get(sk_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"Client SK_ID_CURR={sk_id} introuvable.")
+
+    try:
+        precomputed = await run_in_threadpool(get_precomputed_shap)
+    except Exception as e:
+        print(f"⚠️ SHAP précalculées illisibles : {e}")
+        precomputed = None
+
+    shap_payload = precomputed.get(sk_id) if precomputed is not None else None
+
+    out = await _explain_features(found["features"], top_n, shap_payload=shap_payload)
+    out["SK_ID_CURR"] = sk_id
+    out["shap_source"] = "online" if shap_payload is None else "precomputed"
+    return out
@@ -0,0 +1,208 @@
+"""
+Micro-batching des prédictions unitaires (/predict).
+
+Les requêtes concurrentes déposent leur ligne dans une file ; un thread les regroupe
+(jusqu'à max_batch_size lignes ou max_wait_ms après la première), fait UN appel
+predict_proba sur la matrice empilée et renvoie à chaque appelant sa probabilité
+via un concurrent.futures.Future (utilisable en sync : .result(), ou en async : asyncio.wrap_future).
+
+Histogrammes exposés : taille des lots et attente en file (ms).
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+BATCH_SIZE_EDGES = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+QUEUE_WAIT_EDGES_MS = [0.1, 0.5, 1, 2, 5, 10, 20, 50, 100]
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """
+    Histogramme à bornes fixes, bornes supérieures incluses (style Prometheus "le") :
+    counts[0] = valeurs <= edges[0], counts[i] = ]edges[i-1], edges[i]], counts[-1] = valeurs > edges[-1].
+    (FeatureSketch inclut au contraire la borne inférieure : [edges[i-1], edges[i]).)
+    """
+
+    def __init__(self, edges: Sequence[float]):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[int(np.searchsorted(self.edges, value, side="left"))] += 1
+        self.total += value
+
+    def to_dict(self) -> Dict[str, Any]:
+        n = int(self.counts.sum())
+        return {
+            "edges": self.edges.tolist(),
+            "counts": self.counts.tolist(),
+            "n": n,
+            "mean": self.total / n if n else None,
+        }
+
+
+class MicroBatcher:
+    """
+    Regroupe les lignes soumises en lots pour predict_fn (matrice (n, p) -> probabilités (n,)).
+    Si un lot échoue, chaque ligne est rejouée seule : une ligne invalide n'affecte pas les autres.
+    Les Futures annulés avant le traitement du lot (requête abandonnée) sont ignorés.
+    """
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray], max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.batch_sizes = Histogram(BATCH_SIZE_EDGES)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_EDGES_MS)
+        self.batches = 0
+        self.items = 0
+        self.fallbacks = 0
+        self.cancelled = 0
+
+    # ----------------------------
+    # Côté requête
+    # ----------------------------
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="predict-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, row: np.ndarray) -> Future:
+        """Dépose une ligne (p,) ; le Future reçoit sa probabilité (float) ou l'exception du modèle."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((np.asarray(row).reshape(-1), future, time.perf_counter()))
+        return future
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Traite les lignes en attente puis arrête le thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": True,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batches": self.batches,
+                "items": self.items,
+                "fallbacks": self.fallbacks,
+                "cancelled": self.cancelled,
+                "batch_size": self.batch_sizes.to_dict(),
+                "queue_wait_ms": self.queue_wait_ms.to_dict(),
+            }
+
+    # ----------------------------
+    # Thread de batching
+    # ----------------------------
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                self._process(batch)
+            except Exception as e:
+                # Un lot en erreur inattendue ne doit pas arrêter le thread (toutes les requêtes suivantes bloqueraient)
+                logger.exception("Micro-batcher : lot de %d lignes en échec", len(batch))
+                for _, future, _ in batch:
+                    _set_exception(future, e)
+            if stop:
+                return
+
+    def _process(self, batch: List[tuple]) -> None:
+        started = time.perf_counter()
+        with self._lock:
+            for _, _, enqueued_at in batch:
+                self.queue_wait_ms.observe((started - enqueued_at) * 1000.0)
+
+        # Requêtes annulées entre-temps (client déconnecté, timeout) : retirées du lot
+        live = [(row, future) for row, future, _ in batch if future.set_running_or_notify_cancel()]
+        with self._lock:
+            self.cancelled += len(batch) - len(live)
+        if not live:
+            return
+        rows = [row for row, _ in live]
+        futures = [future for _, future in live]
+
+        try:
+            probas = np.asarray(self.predict_fn(np.vstack(rows)), dtype=float).reshape(-1)
+            if probas.size != len(live):
+                raise ValueError(f"{probas.size} probabilités pour un lot de {len(live)} lignes")
+            error = None
+        except Exception as e:
+            probas, error = None, e
+
+        fallback = error is not None and len(live) > 1
+        if error is None:
+            for future, proba in zip(futures, probas.tolist()):
+                _set_result(future, proba)
+        elif not fallback:
+            _set_exception(futures[0], error)
+        else:
+            # Lot en échec : chaque ligne rejouée seule (erreur propre à la ligne)
+            for row, future in zip(rows, futures):
+                try:
+                    proba = float(np.asarray(self.predict_fn(row.reshape(1, -1))).reshape(-1)[0])
+                except Exception as row_error:
+                    _set_exception(future, row_error)
+                else:
+                    _set_result(future, proba)
+
+        with self._lock:
+            self.batches += 1
+            self.items += len(live)
+            self.fallbacks += int(fallback)
+            self.batch_sizes.observe(len(live))
+
+
+def _set_result(future: Future, value: Any) -> None:
+    # Le Future a pu être annulé pendant le calcul : InvalidStateError sinon
+    if not future.done():
+        future.set_result(value)
+
+
+def _set_exception(future: Future, error: BaseException) -> None:
+    if not future.done():
+        future.set_exception(error)
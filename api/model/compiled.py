@@ -0,0 +1,381 @@
+"""
+Inférence "compilée" : le Pipeline sklearn / imblearn réduit à des opérations NumPy.
+
+Pour une ligne, Pipeline.predict_proba passe l'essentiel de son temps en validations
+(check_array, noms de features, dispatch par étape) plutôt qu'en calcul. Au chargement :
+- preprocessing : SimpleImputer (valeurs d'imputation), StandardScaler, MinMaxScaler
+  -> np.where + opérations élément par élément ; samplers (fit_resample) et "passthrough" ignorés
+- estimator final (binaire) :
+  - LogisticRegression -> sigmoïde(X @ coef + intercept)
+  - arbres sklearn (DecisionTree, RandomForest, ExtraTrees, GradientBoosting,
+    HistGradientBoosting) et LightGBM -> tableaux de noeuds à plat, parcours vectorisé
+    sur tous les arbres à la fois (une itération par niveau de profondeur)
+Le modèle compilé n'est activé qu'après comparaison au Pipeline sur la population de
+référence (écart max des probabilités <= tolérance), sinon l'API garde le Pipeline.
+
+Benchmark (modèle local + données clients) :
+    python -m api.model.compiled --rows 2000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class NotCompilable(Exception):
+    """Étape ou estimator non supporté par l'inférence compilée."""
+
+
+def split_pipeline(model):
+    """
+    Sépare un Pipeline (sklearn / imblearn) en (étapes de preprocessing, estimator final).
+    Les samplers (fit_resample, ex: SMOTE) et les étapes "passthrough" sont ignorés :
+    ils n'interviennent pas au moment de la prédiction.
+    """
+    if not hasattr(model, "steps") or len(model.steps) == 0:
+        return [], model
+
+    transformers = []
+    for _, step in model.steps[:-1]:
+        if step is None or step == "passthrough" or hasattr(step, "fit_resample"):
+            continue
+        transformers.append(step)
+    return transformers, model.steps[-1][1]
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+# ----------------------------
+# Preprocessing
+# ----------------------------
+def _compile_step(step, n_features: int) -> Tuple[str, Tuple[np.ndarray, ...]]:
+    name = type(step).__name__
+
+    if name == "SimpleImputer":
+        if getattr(step, "add_indicator", False):
+            raise NotCompilable("SimpleImputer(add_indicator=True)")
+        missing = step.missing_values
+        if not (isinstance(missing, float) and np.isnan(missing)):
+            raise NotCompilable(f"SimpleImputer(missing_values={missing!r})")
+        fill = np.asarray(step.statistics_, dtype=np.float64)
+        if fill.shape != (n_features,) or np.isnan(fill).any():
+            # colonnes entièrement manquantes au fit : supprimées par l'imputer
+            raise NotCompilable("SimpleImputer supprimant des colonnes")
+        return "impute", (fill,)
+
+    if name == "StandardScaler":
+        mean = np.asarray(step.mean_, dtype=np.float64) if step.with_mean else np.zeros(n_features)
+        scale = np.asarray(step.scale_, dtype=np.float64) if step.with_std else np.ones(n_features)
+        return "standardize", (mean, scale)
+
+    if name == "MinMaxScaler":
+        if getattr(step, "clip", False):
+            raise NotCompilable("MinMaxScaler(clip=True)")
+        return "affine", (np.asarray(step.scale_, dtype=np.float64), np.asarray(step.min_, dtype=np.float64))
+
+    raise NotCompilable(f"étape {name}")
+
+
+# ----------------------------
+# Arbres
+# ----------------------------
+class TreeEnsemble:
+    """
+    Arbres à plat (tous les noeuds de tous les arbres dans les mêmes tableaux).
+    Feuille : left = right = elle-même, le parcours s'y arrête.
+    Noeud interne : x <= threshold -> left ; NaN -> nan_left ; zero_missing : 0 traité comme manquant (LightGBM).
+    """
+
+    def __init__(self, trees: List[Dict[str, np.ndarray]], float32_inputs: bool = False):
+        offsets = np.cumsum([0] + [len(t["feature"]) for t in trees[:-1]])
+        cat = lambda key: np.concatenate([t[key] for t in trees])  # noqa: E731
+
+        self.feature = cat("feature").astype(np.int64)
+        self.threshold = cat("threshold").astype(np.float64)
+        self.left = np.concatenate([t["left"] + o for t, o in zip(trees, offsets)]).astype(np.int64)
+        self.right = np.concatenate([t["right"] + o for t, o in zip(trees, offsets)]).astype(np.int64)
+        self.value = cat("value").astype(np.float64)
+        self.nan_left = cat("nan_left").astype(bool)
+        self.zero_missing = cat("zero_missing").astype(bool)
+        self.has_zero_missing = bool(self.zero_missing.any())
+        self.roots = offsets.astype(np.int64)
+        self.depth = max(int(t["depth"]) for t in trees)
+        self.float32_inputs = float32_inputs
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """Valeur de la feuille atteinte, shape (n, n_trees)."""
+        if self.float32_inputs:
+            # Les arbres sklearn comparent des float32 (seuils choisis entre valeurs float32)
+            X = X.astype(np.float32).astype(np.float64)
+        rows = np.arange(X.shape[0])[:, None]
+        idx = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        for _ in range(self.depth):
+            x = X[rows, self.feature[idx]]
+            missing = np.isnan(x)
+            if self.has_zero_missing:
+                missing |= self.zero_missing[idx] & (x == 0.0)
+            go_left = np.where(missing, self.nan_left[idx], x <= self.threshold[idx])
+            idx = np.where(go_left, self.left[idx], self.right[idx])
+        return self.value[idx]
+
+
+def _leaf_self_links(left: np.ndarray, right: np.ndarray, is_leaf: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    nodes = np.arange(len(left))
+    return np.where(is_leaf, nodes, left), np.where(is_leaf, nodes, right)
+
+
+def _depth(left: np.ndarray, right: np.ndarray, is_leaf: np.ndarray) -> int:
+    depth = np.zeros(len(left), dtype=np.int64)
+    # Les enfants ont toujours un indice supérieur au parent (sklearn, HistGradientBoosting, dump LightGBM)
+    for node in range(len(left)):
+        if not is_leaf[node]:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max()) if len(depth) else 0
+
+
+def _sklearn_tree(tree, value: np.ndarray) -> Dict[str, np.ndarray]:
+    is_leaf = tree.children_left == -1
+    left, right = _leaf_self_links(tree.children_left, tree.children_right, is_leaf)
+    missing_left = getattr(tree, "missing_go_to_left", None)
+    return {
+        "feature": np.where(is_leaf, 0, tree.feature),
+        "threshold": np.where(is_leaf, np.inf, tree.threshold),
+        "left": left,
+        "right": right,
+        "value": value,
+        "nan_left": np.ones(len(left), bool) if missing_left is None else np.asarray(missing_left, bool),
+        "zero_missing": np.zeros(len(left), bool),
+        "depth": _depth(left, right, is_leaf),
+    }
+
+
+def _hist_gb_tree(predictor) -> Dict[str, np.ndarray]:
+    nodes = predictor.nodes
+    if nodes["is_categorical"].any():
+        raise NotCompilable("HistGradientBoosting avec features catégorielles")
+    is_leaf = nodes["is_leaf"].astype(bool)
+    left, right = _leaf_self_links(nodes["left"].astype(np.int64), nodes["right"].astype(np.int64), is_leaf)
+    return {
+        "feature": np.where(is_leaf, 0, nodes["feature_idx"]),
+        "threshold": np.where(is_leaf, np.inf, nodes["num_threshold"]),
+        "left": left,
+        "right": right,
+        "value": nodes["value"],
+        "nan_left": nodes["missing_go_to_left"].astype(bool),
+        "zero_missing": np.zeros(len(nodes), bool),
+        "depth": _depth(left, right, is_leaf),
+    }
+
+
+def _lightgbm_tree(structure: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Arbre du dump LightGBM (dict imbriqué) -> tableaux de noeuds (parcours préfixe)."""
+    feature, threshold, left, right, value, nan_left, zero_missing, is_leaf = [], [], [], [], [], [], [], []
+
+    def visit(node) -> int:
+        i = len(feature)
+        for arr in (feature, threshold, left, right, value, nan_left, zero_missing, is_leaf):
+            arr.append(0)
+        if "leaf_value" in node:
+            threshold[i], value[i], is_leaf[i] = np.inf, node["leaf_value"], True
+            return i
+        if node.get("decision_type", "<=") != "<=":
+            raise NotCompilable(f"split LightGBM {node.get('decision_type')} (catégoriel)")
+        missing_type = node.get("missing_type", "None")
+        feature[i], threshold[i] = node["split_feature"], node["threshold"]
+        if missing_type == "None":
+            # NaN traité comme 0
+            nan_left[i] = 0.0 <= node["threshold"]
+        else:
+            nan_left[i] = bool(node.get("default_left", True))
+            zero_missing[i] = missing_type == "Zero"
+        left[i] = visit(node["left_child"])
+        right[i] = visit(node["right_child"])
+        return i
+
+    visit(structure)
+    is_leaf = np.asarray(is_leaf, bool)
+    left_a, right_a = _leaf_self_links(np.asarray(left), np.asarray(right), is_leaf)
+    return {
+        "feature": np.asarray(feature),
+        "threshold": np.asarray(threshold, dtype=np.float64),
+        "left": left_a,
+        "right": right_a,
+        "value": np.asarray(value, dtype=np.float64),
+        "nan_left": np.asarray(nan_left, bool),
+        "zero_missing": np.asarray(zero_missing, bool),
+        "depth": _depth(left_a, right_a, is_leaf),
+    }
+
+
+def _class1_fraction(tree) -> np.ndarray:
+    """Proportion de la classe 1 dans chaque noeud (value = effectifs ou fractions selon la version)."""
+    value = tree.value[:, 0, :]
+    total = value.sum(axis=1)
+    return value[:, 1] / np.where(total > 0, total, 1.0)
+
+
+def _raw_score(estimator, X: np.ndarray) -> np.ndarray:
+    """Score brut (logit) de l'estimator sklearn / LightGBM sur X déjà transformé."""
+    if hasattr(estimator, "booster_"):
+        return np.asarray(estimator.booster_.predict(X, raw_score=True), dtype=np.float64)
+    return np.asarray(estimator.decision_function(X), dtype=np.float64).reshape(-1)
+
+
+# ----------------------------
+# Modèle compilé
+# ----------------------------
+class CompiledModel:
+    """
+    Preprocessing + estimator réduits à du NumPy, sans validation par appel.
+    Même interface que le modèle pour l'API : predict_proba(X) -> (n, 2).
+    """
+
+    def __init__(self, ops, kind: str, params: Dict[str, Any], estimator_name: str):
+        self.ops = ops
+        self.kind = kind
+        self.params = params
+        self.estimator_name = estimator_name
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        for op, args in self.ops:
+            # Mêmes opérations (et même ordre d'arrondi) que sklearn : une valeur imputée peut
+            # tomber exactement sur un seuil d'arbre (médiane = milieu de deux valeurs)
+            if op == "impute":
+                X = np.where(np.isnan(X), args[0], X)
+            elif op == "standardize":
+                X = (X - args[0]) / args[1]
+            else:
+                X = X * args[0] + args[1]
+        return X
+
+    def proba1(self, X: np.ndarray) -> np.ndarray:
+        X = self.transform(np.atleast_2d(X))
+        p = self.params
+        if self.kind == "linear":
+            return _sigmoid(X @ p["coef"] + p["intercept"])
+        leaves = p["trees"].leaf_values(X)
+        if self.kind == "forest":
+            return leaves.mean(axis=1)
+        return _sigmoid(p["offset"] + p["scale"] * leaves.sum(axis=1))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        p1 = self.proba1(X)
+        return np.column_stack([1.0 - p1, p1])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return (self.proba1(X) >= 0.5).astype(int)
+
+
+def compile_model(model, n_features: int, X_fit: Optional[np.ndarray] = None) -> CompiledModel:
+    """
+    Compile le Pipeline (ou l'estimator seul). X_fit : quelques lignes brutes servant à recaler
+    le score initial des boostings (init_ / baseline, constant). NotCompilable si non supporté.
+    """
+    transformers, estimator = split_pipeline(model)
+    ops = [_compile_step(step, n_features) for step in transformers]
+
+    classes = getattr(estimator, "classes_", None)
+    if classes is None or len(classes) != 2:
+        raise NotCompilable(f"{type(estimator).__name__} n'est pas un classifieur binaire")
+
+    name = type(estimator).__name__
+    compiled = CompiledModel(ops, "", {}, name)
+
+    if name == "LogisticRegression":
+        compiled.kind = "linear"
+        compiled.params = {
+            "coef": np.asarray(estimator.coef_, dtype=np.float64).reshape(-1),
+            "intercept": float(np.asarray(estimator.intercept_).reshape(-1)[0]),
+        }
+        return compiled
+
+    if name in ("DecisionTreeClassifier", "RandomForestClassifier", "ExtraTreesClassifier"):
+        trees = [estimator] if name == "DecisionTreeClassifier" else estimator.estimators_
+        compiled.kind = "forest"
+        compiled.params = {
+            "trees": TreeEnsemble([_sklearn_tree(t.tree_, _class1_fraction(t.tree_)) for t in trees], float32_inputs=True)
+        }
+        return compiled
+
+    if name == "GradientBoostingClassifier":
+        trees = [_sklearn_tree(t.tree_, t.tree_.value[:, 0, 0]) for t in estimator.estimators_[:, 0]]
+        ensemble, scale, float32 = TreeEnsemble(trees, float32_inputs=True), float(estimator.learning_rate), True
+    elif name == "HistGradientBoostingClassifier":
+        trees = [_hist_gb_tree(predictors[0]) for predictors in estimator._predictors]
+        ensemble, scale, float32 = TreeEnsemble(trees), 1.0, False
+    elif hasattr(estimator, "booster_"):
+        dump = estimator.booster_.dump_model()
+        if dump.get("num_class", 1) != 1:
+            raise NotCompilable("LightGBM multiclasse")
+        trees = [_lightgbm_tree(t["tree_structure"]) for t in dump["tree_info"]]
+        ensemble, scale, float32 = TreeEnsemble(trees), 1.0, False
+    else:
+        raise NotCompilable(f"estimator {name}")
+
+    if X_fit is None or len(X_fit) == 0:
+        raise NotCompilable("lignes de référence nécessaires pour le score initial du boosting")
+
+    # Score initial (constant) = score brut de l'estimator - somme des arbres
+    compiled.kind = "boosting"
+    compiled.params = {"trees": ensemble, "scale": scale, "offset": 0.0}
+    Xt = compiled.transform(X_fit[:1])
+    Xt_model = Xt.astype(np.float32).astype(np.float64) if float32 else Xt
+    compiled.params["offset"] = float(
+        _raw_score(estimator, Xt_model)[0] - scale * ensemble.leaf_values(Xt).sum(axis=1)[0]
+    )
+    return compiled
+
+
+def validate_compiled(compiled: CompiledModel, model, X: np.ndarray, tolerance: float) -> Dict[str, Any]:
+    """Compare les probabilités compilées à celles du modèle d'origine sur X (lignes brutes)."""
+    reference = np.asarray(model.predict_proba(X), dtype=np.float64)[:, 1]
+    candidate = compiled.proba1(X)
+    diff = np.abs(reference - candidate)
+    max_diff = float(np.nanmax(diff)) if diff.size else 0.0
+    return {
+        "n_rows": int(len(X)),
+        "max_abs_diff": max_diff,
+        "tolerance": tolerance,
+        "ok": bool(diff.size and np.isfinite(candidate).all() and max_diff <= tolerance),
+    }
+
+
+def latency_ms(fn, X: np.ndarray) -> Dict[str, float]:
+    """p50 / p99 (ms) d'un appel fn sur chaque ligne de X prise seule."""
+    timings = []
+    for i in range(len(X)):
+        row = X[i:i + 1]
+        t0 = time.perf_counter()
+        fn(row)
+        timings.append((time.perf_counter() - t0) * 1000.0)
+    return {"p50_ms": float(np.percentile(timings, 50)), "p99_ms": float(np.percentile(timings, 99))}
+
+
+if __name__ == "__main__":
+    import api.main as main
+    from api.schemas.input_schema import FEATURE_ORDER
+
+    parser = argparse.ArgumentParser(description="Valide le modèle compilé et compare la latence unitaire.")
+    parser.add_argument("--rows", type=int, default=2000, help="Nombre de lignes de référence (latence)")
+    args = parser.parse_args()
+
+    model = main.get_model()
+    X = main.compiled_reference_rows()
+    compiled = compile_model(model, len(FEATURE_ORDER), X_fit=X)
+    report = validate_compiled(compiled, model, X, main.COMPILED_TOLERANCE)
+    print(f"✅ Validation sur {report['n_rows']} lignes : écart max {report['max_abs_diff']:.2e} (ok={report['ok']})")
+
+    sample = X[: args.rows]
+    for label, fn in (("pipeline", model.predict_proba), ("compilé ", compiled.predict_proba)):
+        lat = latency_ms(fn, sample)
+        print(f"⏱️ {label} : p50 {lat['p50_ms']:.3f} ms, p99 {lat['p99_ms']:.3f} ms")
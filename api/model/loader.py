@@ -1,3 +1,4 @@
+import hashlib
 import os
 import joblib
 import numpy as np
@@ -26,7 +27,35 @@ MODEL_URI = f"runs:/{RUN_ID}/model"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 LOCAL_MODEL_PATH = os.path.join(BASE_DIR, "model.pkl")
 
+# joblib.load(mmap_mode="r") : les tableaux numpy du modèle (ex: coefficients, arbres sklearn)
+# restent dans le fichier et sont partagés entre workers via le page cache.
+# Seulement pour un .pkl non compressé (joblib.dump(..., compress=0)) ; sans effet sur les
+# boosters LightGBM / XGBoost (modèle sérialisé en texte/bytes, pas en tableaux numpy).
+MODEL_MMAP = os.getenv("MODEL_MMAP", "0") == "1"
+
 model = None
+model_version = None
+
+
+def _file_digest(path: str) -> str:
+    """Empreinte courte (sha256) d'un fichier modèle."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def get_model_version() -> str:
+    """
+    Identité du modèle chargé (clé des caches / artefacts dérivés du modèle) :
+    - "dummy" en mode TESTING
+    - "mlflow:<run_id>" si chargé via MLflow
+    - "local:<sha256>" pour le .pkl local
+    """
+    if model_version is None:
+        load_model()
+    return model_version
 
 
 def load_model():
@@ -38,7 +67,7 @@ def load_model():
          → Sinon charge le modèle local .pkl
     """
 
-    global model
+    global model, model_version
 
     # Déjà chargé = pas besoin de recharger
     if model is not None:
@@ -52,12 +81,14 @@ def load_model():
 
         class DummyModel:
             def predict(self, X):
-                return [0]
+                return [0] * len(X)
 
             def predict_proba(self, X):
-                return np.array([[0.3, 0.7]])  # probabilité stable
+                # probabilité stable, une ligne par client
+                return np.tile([[0.3, 0.7]], (len(X), 1))
 
         model = DummyModel()
+        model_version = "dummy"
         return model
 
     # --------------------------------------------------
@@ -67,6 +98,7 @@ def load_model():
         try:
             print("🔄 Tentative de chargement via MLflow...")
             model = mlflow.sklearn.load_model(MODEL_URI)
+            model_version = f"mlflow:{RUN_ID}"
             print("✅ Modèle chargé depuis MLflow.")
             return model
         except Exception as e:
@@ -82,7 +114,8 @@ def load_model():
         if not os.path.exists(LOCAL_MODEL_PATH):
             raise FileNotFoundError(f"Modèle introuvable : {LOCAL_MODEL_PATH}")
 
-        model = joblib.load(LOCAL_MODEL_PATH)
+        model = joblib.load(LOCAL_MODEL_PATH, mmap_mode="r" if MODEL_MMAP else None)
+        model_version = f"local:{_file_digest(LOCAL_MODEL_PATH)}"
         print("✅ Modèle local chargé.")
         return model
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 class CustomerFeatures(BaseModel):
     EXT_SOURCE_3: Optional[float] = Field(None, description="Score externe 3 (float)")
@@ -27,3 +27,14 @@ FEATURE_ORDER = [
     "DAYS_BIRTH"
 ]
 
+
+class BatchFeatures(BaseModel):
+    """
+    Payload de scoring par lot. Deux formats acceptés (un seul à la fois) :
+    - records : liste d'enregistrements [{feature: valeur}, ...]
+    - columns : format colonnes {feature: [valeurs]}
+    Les lignes sont validées une par une (CustomerFeatures) pour ne pas
+    faire échouer tout le lot à cause d'une ligne invalide.
+    """
+    records: Optional[List[Any]] = Field(None, description="Liste d'enregistrements (un dict de features par client)")
+    columns: Optional[Dict[str, List[Any]]] = Field(None, description="Format colonnes : {feature: [valeurs]}")
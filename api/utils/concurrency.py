@@ -0,0 +1,259 @@
+"""
+Exécution du calcul hors de la boucle asyncio et limites de concurrence par endpoint.
+
+- executor "model" : threads dédiés à predict_proba (numpy / sklearn relâchent en grande
+  partie le GIL), séparés du threadpool Starlette qui sert les autres endpoints
+- executor "explain" : threads par défaut (partagent modèle, données et explainer du worker).
+  EXPLAIN_PROCESSES=N (opt-in) : process pool pour SHAP (CPU-bound, tient le GIL), mais
+  chaque process charge sa propre copie du modèle, des données clients et de l'explainer
+  (initializer) : ~200 Mo par process avec les données de référence, soit le coût d'un worker
+  sans pré-fork (cf. gunicorn.conf.py). 2 workers x 2 process = 6 copies au lieu d'une.
+- ConcurrencyLimiter : requêtes en cours + file d'attente bornées par endpoint ;
+  file pleine -> 429, attente trop longue -> 503 (avec Retry-After) au lieu d'une file sans fin
+
+Les executors sont créés à la première utilisation : dans les workers, jamais dans le master
+gunicorn (pré-fork).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+
+MODEL_THREADS = int(os.getenv("MODEL_THREADS", "4"))
+# Process SHAP (0 = threads, défaut) : à n'activer que si la mémoire le permet (cf. docstring)
+EXPLAIN_PROCESSES = int(os.getenv("EXPLAIN_PROCESSES", "0"))
+# "spawn" (défaut, sûr avec les threads du worker) ou "fork" (Linux : hérite du modèle déjà chargé)
+EXPLAIN_START_METHOD = os.getenv("EXPLAIN_START_METHOD", "spawn")
+
+RETRY_AFTER_SECONDS = 1
+
+logger = logging.getLogger(__name__)
+
+_executors: Dict[str, Executor] = {}
+_executors_lock = threading.Lock()
+
+
+# ----------------------------
+# Executors
+# ----------------------------
+def _init_explain_process() -> None:
+    """Initializer des process explain : modèle + explainer chargés une fois par process."""
+    import api.main as main
+    import api.explain.shap_explainer as shap_explainer
+
+    try:
+        main.get_model()
+        shap_explainer.get_explainer()
+    except Exception as e:
+        # Pas d'exception ici : elle casserait tout le pool ; l'erreur ressortira sur la tâche
+        logger.warning("Process explain %d : warm-up incomplet (%s)", os.getpid(), e)
+
+
+def shap_matrix_task(X: np.ndarray):
+    """Tâche exécutée dans l'executor explain : SHAP values d'un lot (cf. shap_explainer.shap_matrix)."""
+    import api.explain.shap_explainer as shap_explainer
+
+    return shap_explainer.shap_matrix(X)
+
+
+def _create(name: str) -> Executor:
+    if name == "model":
+        return ThreadPoolExecutor(max_workers=max(MODEL_THREADS, 1), thread_name_prefix="model")
+    if EXPLAIN_PROCESSES > 0:
+        return ProcessPoolExecutor(
+            max_workers=EXPLAIN_PROCESSES,
+            mp_context=multiprocessing.get_context(EXPLAIN_START_METHOD),
+            initializer=_init_explain_process,
+        )
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="explain")
+
+
+def get_executor(name: str) -> Executor:
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = _create(name)
+                _executors[name] = executor
+    return executor
+
+
+def _discard(name: str, executor: Executor) -> None:
+    """Retire un executor cassé (process mort) : le suivant sera recréé à la demande."""
+    with _executors_lock:
+        if _executors.get(name) is executor:
+            del _executors[name]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_model(fn: Callable, *args) -> Any:
+    """fn(*args) dans l'executor model (threads dédiés)."""
+    return await asyncio.wrap_future(get_executor("model").submit(fn, *args))
+
+
+async def run_explain(X: np.ndarray):
+    """
+    Calcul SHAP (values, base_values) dans l'executor explain, attendu sans bloquer de thread.
+    À passer en compute= de explain_one_async / explain_many_async (le cache reste dans le process API).
+    """
+    executor = get_executor("explain")
+    try:
+        return await asyncio.wrap_future(executor.submit(shap_matrix_task, np.asarray(X)))
+    except BrokenProcessPool:
+        _discard("explain", executor)
+        raise HTTPException(
+            status_code=503,
+            detail="Service d'explication indisponible (process SHAP arrêté), réessayer.",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+
+
+def start_explain_processes() -> None:
+    """Lance les process explain en arrière-plan (sans attendre leur warm-up)."""
+    if EXPLAIN_PROCESSES > 0:
+        executor = get_executor("explain")
+        for _ in range(EXPLAIN_PROCESSES):
+            executor.submit(os.getpid)
+
+
+def shutdown_executors() -> None:
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def executors_stats() -> Dict[str, Any]:
+    with _executors_lock:
+        started = sorted(_executors)
+    return {
+        "model_threads": MODEL_THREADS,
+        "explain": f"processes ({EXPLAIN_START_METHOD})" if EXPLAIN_PROCESSES > 0 else "threads",
+        "explain_workers": EXPLAIN_PROCESSES if EXPLAIN_PROCESSES > 0 else 2,
+        "started": started,
+    }
+
+
+# ----------------------------
+# Limites de concurrence
+# ----------------------------
+class ConcurrencyLimiter:
+    """
+    Au plus limit requêtes en cours pour un endpoint, au plus max_queue en attente d'une place :
+    - file pleine -> 429 (trop de requêtes, réessayer plus tard)
+    - attente > queue_timeout -> 503 (instance saturée)
+    limit <= 0 : pas de limite. S'utilise en `async with limiter:`.
+    Compteurs protégés par un verrou (pas de primitive asyncio liée à une boucle) :
+    une place libérée est transmise directement au plus ancien en attente.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int = 0, queue_timeout: float = 5.0):
+        self.name = name
+        self.limit = int(limit)
+        self.max_queue = max(int(max_queue), 0)
+        self.queue_timeout = float(queue_timeout)
+
+        self._lock = threading.Lock()
+        self._waiters: "deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]" = deque()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected_429 = 0
+        self.rejected_503 = 0
+
+    def _reject(self, status_code: int, detail: str) -> HTTPException:
+        with self._lock:
+            if status_code == 429:
+                self.rejected_429 += 1
+            else:
+                self.rejected_503 += 1
+        return HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.limit <= 0 or self.in_flight < self.limit:
+                self.in_flight += 1
+                return self
+            queue_full = len(self._waiters) >= self.max_queue
+            if not queue_full:
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+        if queue_full:
+            raise self._reject(429, f"Trop de requêtes {self.name} en cours, réessayer plus tard.")
+
+        try:
+            done, _ = await asyncio.wait({waiter[1]}, timeout=self.queue_timeout)
+        except BaseException:
+            # Requête annulée (client déconnecté) : rendre la place si elle venait d'être attribuée
+            if not self._leave_queue(waiter):
+                self._release()
+            raise
+        if not done and self._leave_queue(waiter):
+            raise self._reject(503, f"Instance saturée ({self.name}), réessayer plus tard.")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self._release()
+
+    def _leave_queue(self, waiter) -> bool:
+        """Retire waiter de la file ; False s'il avait déjà reçu une place."""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+                return True
+            except ValueError:
+                return False
+
+    def _release(self) -> None:
+        with self._lock:
+            self.completed += 1
+            while self._waiters:
+                # La place passe au plus ancien en attente (in_flight inchangé)
+                loop, future = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(_grant, future)
+                    return
+                except RuntimeError:
+                    continue  # boucle fermée entre-temps
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "max_queue": self.max_queue,
+                "queue_timeout_s": self.queue_timeout,
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "completed": self.completed,
+                "rejected_429": self.rejected_429,
+                "rejected_503": self.rejected_503,
+            }
+
+
+def _grant(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def limiter_from_env(name: str, prefix: str, limit: int, max_queue: int, queue_timeout: float = 5.0) -> ConcurrencyLimiter:
+    """Limiteur configurable par variables d'env <prefix>_MAX_CONCURRENCY / _MAX_QUEUE / _QUEUE_TIMEOUT."""
+    return ConcurrencyLimiter(
+        name,
+        limit=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", str(limit))),
+        max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", str(max_queue))),
+        queue_timeout=float(os.getenv(f"{prefix}_QUEUE_TIMEOUT", str(queue_timeout))),
+    )
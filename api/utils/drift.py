@@ -0,0 +1,263 @@
+"""
+Suivi incrémental du data drift sur le trafic réel.
+
+- FeatureSketch : histogramme à bornes fixes (+ débordements) et compteur de manquants,
+  mis à jour en O(taille du lot) ; quantiles approchés à partir de l'histogramme
+- profil de référence : mêmes sketches calculés une fois sur la population de référence
+- DriftTracker : branché comme sink du PredictionLogger, il met à jour les sketches
+  courants à chaque lot d'événements log_prediction et compare à la référence
+  (PSI, KS sur histogrammes, écart de taux de manquants) en temps constant
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from api.schemas.input_schema import FEATURE_ORDER
+
+
+DRIFT_REFERENCE_PATH = os.getenv("DRIFT_REFERENCE_PATH", "monitoring/reference_profile.json")
+N_BINS = 20
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+# Seuils de décision (conventions usuelles du PSI)
+PSI_THRESHOLD = float(os.getenv("DRIFT_PSI_THRESHOLD", "0.2"))
+DATASET_DRIFT_SHARE = float(os.getenv("DRIFT_DATASET_SHARE", "0.5"))
+PSI_EPS = 1e-4
+
+PROFILE_VERSION = 1
+
+
+def _finite_or_none(v: float) -> Optional[float]:
+    return float(v) if v is not None and math.isfinite(v) else None
+
+
+class FeatureSketch:
+    """
+    Histogramme à bornes fixes pour une feature.
+    counts[0] = valeurs < edges[0], counts[i] = [edges[i-1], edges[i]), counts[-1] = valeurs >= edges[-1].
+    """
+
+    def __init__(self, edges, counts=None, n_missing: int = 0):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = (
+            np.zeros(len(self.edges) + 1, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        )
+        self.n_missing = int(n_missing)
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, n_bins: int = N_BINS) -> "FeatureSketch":
+        """Bornes = quantiles de values (bins d'effectifs ~égaux), puis comptage."""
+        values = np.asarray(values, dtype=np.float64)
+        present = values[~np.isnan(values)]
+        if present.size:
+            edges = np.unique(np.quantile(present, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        else:
+            edges = np.empty(0)
+        sketch = cls(edges)
+        sketch.update(values)
+        return sketch
+
+    def copy_empty(self) -> "FeatureSketch":
+        return FeatureSketch(self.edges)
+
+    @property
+    def n(self) -> int:
+        """Nombre de valeurs présentes (non manquantes)."""
+        return int(self.counts.sum())
+
+    @property
+    def n_total(self) -> int:
+        return self.n + self.n_missing
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        missing = np.isnan(values)
+        self.n_missing += int(missing.sum())
+        idx = np.searchsorted(self.edges, values[~missing], side="right")
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+
+    def missing_rate(self) -> Optional[float]:
+        return self.n_missing / self.n_total if self.n_total else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile approché (interpolation linéaire dans le bin, bornes pour les débordements)."""
+        if self.n == 0 or len(self.edges) == 0:
+            return None
+        target = q * self.n
+        cum = np.cumsum(self.counts)
+        i = int(np.searchsorted(cum, target, side="left"))
+        if i == 0:
+            return float(self.edges[0])
+        if i >= len(self.edges):
+            return float(self.edges[-1])
+        lo, hi = self.edges[i - 1], self.edges[i]
+        before = cum[i - 1]
+        frac = (target - before) / self.counts[i] if self.counts[i] else 0.0
+        return float(lo + frac * (hi - lo))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "edges": self.edges.tolist(),
+            "counts": self.counts.tolist(),
+            "n_missing": self.n_missing,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "FeatureSketch":
+        return cls(d["edges"], d["counts"], d.get("n_missing", 0))
+
+
+def psi(reference: FeatureSketch, current: FeatureSketch) -> Optional[float]:
+    """Population Stability Index entre deux histogrammes de mêmes bornes."""
+    if reference.n == 0 or current.n == 0:
+        return None
+    p = np.clip(reference.counts / reference.n, PSI_EPS, None)
+    q = np.clip(current.counts / current.n, PSI_EPS, None)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def ks_binned(reference: FeatureSketch, current: FeatureSketch) -> Optional[float]:
+    """Statistique de Kolmogorov-Smirnov calculée sur les CDF des histogrammes."""
+    if reference.n == 0 or current.n == 0:
+        return None
+    cdf_ref = np.cumsum(reference.counts) / reference.n
+    cdf_cur = np.cumsum(current.counts) / current.n
+    return float(np.max(np.abs(cdf_ref - cdf_cur)))
+
+
+def compare_sketches(reference: FeatureSketch, current: FeatureSketch) -> Dict[str, Any]:
+    """Statistiques de drift d'une feature (format commun API / rapports monitoring)."""
+    value = psi(reference, current)
+    ref_missing, cur_missing = reference.missing_rate(), current.missing_rate()
+    return {
+        "psi": _finite_or_none(value),
+        "ks": _finite_or_none(ks_binned(reference, current)),
+        "missing_rate_reference": ref_missing,
+        "missing_rate_current": cur_missing,
+        "median_reference": reference.quantile(0.5),
+        "median_current": current.quantile(0.5),
+        "n_current": current.n_total,
+        "drift_detected": bool(value is not None and value > PSI_THRESHOLD),
+    }
+
+
+def summarize(reference: Dict[str, FeatureSketch], current: Dict[str, FeatureSketch]) -> Dict[str, Any]:
+    """Résumé du drift sur toutes les features (part de features driftées, drift global)."""
+    features = {name: compare_sketches(reference[name], current[name]) for name in reference}
+    return summarize_features(features)
+
+
+def summarize_features(features: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Agrège des statistiques par feature (sortie de compare_sketches) au format de summarize."""
+    n_drifted = sum(1 for f in features.values() if f["drift_detected"])
+    share = n_drifted / len(features) if features else 0.0
+    return {
+        "psi_threshold": PSI_THRESHOLD,
+        "n_features": len(features),
+        "n_drifted_features": n_drifted,
+        "share_drifted_features": share,
+        "dataset_drift": share >= DATASET_DRIFT_SHARE,
+        "features": features,
+    }
+
+
+# ----------------------------
+# Profil de référence
+# ----------------------------
+def build_reference_profile(df: pd.DataFrame, columns: List[str] = None, n_bins: int = N_BINS) -> Dict[str, Any]:
+    """Profil de référence (sketch par feature + quantiles) à partir d'un DataFrame."""
+    columns = columns or FEATURE_ORDER
+    features = {}
+    for name in columns:
+        values = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        sketch = FeatureSketch.from_values(values, n_bins=n_bins)
+        features[name] = {
+            **sketch.to_dict(),
+            "quantiles": {str(q): _finite_or_none(np.nanquantile(values, q)) if sketch.n else None for q in QUANTILES},
+            # Médiane exacte = valeur d'imputation des manquants
+            "median": _finite_or_none(np.nanmedian(values)) if sketch.n else None,
+            "missing_rate": sketch.missing_rate(),
+        }
+    return {
+        "version": PROFILE_VERSION,
+        "n_rows": int(len(df)),
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "features": features,
+    }
+
+
+def save_reference_profile(profile: Dict[str, Any], path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_reference_profile(path: str) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        profile = json.load(f)
+    if profile.get("version") != PROFILE_VERSION:
+        raise ValueError(f"Profil de référence non supporté : {path}")
+    return profile
+
+
+def sketches_from_profile(profile: Dict[str, Any], columns: List[str] = None) -> Dict[str, FeatureSketch]:
+    columns = columns or list(profile["features"])
+    return {name: FeatureSketch.from_dict(profile["features"][name]) for name in columns}
+
+
+# ----------------------------
+# Suivi en continu
+# ----------------------------
+class DriftTracker:
+    """
+    Sketches courants alimentés par les événements de prédiction.
+    S'utilise comme sink du PredictionLogger (méthodes write/close) :
+    la mise à jour se fait dans le thread writer, hors du chemin des requêtes.
+    """
+
+    def __init__(self, reference: Dict[str, FeatureSketch], source: str = None):
+        self.reference = reference
+        self.source = source
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.current = {name: sketch.copy_empty() for name, sketch in self.reference.items()}
+            self.window_started_at = datetime.datetime.utcnow().isoformat()
+
+    def update_matrix(self, X: np.ndarray) -> None:
+        """X : matrice (n, p) dans l'ordre des features de référence (NaN = manquant)."""
+        with self._lock:
+            for j, name in enumerate(self.reference):
+                self.current[name].update(X[:, j])
+
+    # Interface sink du PredictionLogger
+    def write(self, batch: list) -> None:
+        names = list(self.reference)
+        rows = []
+        for event in batch:
+            features = event.get("features") or {}
+            rows.append([np.nan if features.get(f) is None else features[f] for f in names])
+        if rows:
+            self.update_matrix(np.array(rows, dtype=np.float64))
+
+    def close(self) -> None:
+        pass
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            out = summarize(self.reference, self.current)
+            out["window_started_at"] = self.window_started_at
+        out["reference_source"] = self.source
+        return out
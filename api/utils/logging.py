@@ -1,14 +1,298 @@
+import atexit
 import json
 import datetime
 import os
+import queue
+import threading
+import time
 
 LOG_DIR = "logs"
-LOG_FILE = os.path.join(LOG_DIR, "predictions.jsonl")
+# Un fichier JSONL par process (workers gunicorn pré-forkés) : pas de rotation concurrente
+# du même fichier ni de lignes entrelacées entre workers
+LOG_FILE_PATTERN = os.path.join(LOG_DIR, "predictions-{pid}.jsonl")
+
+# Écriture asynchrone : les requêtes déposent les événements dans une file bornée,
+# un thread les écrit par lots (taille ou intervalle atteint) et fait la rotation.
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))  # secondes
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(100 * 1024 * 1024)))  # rotation par taille
+LOG_ROTATE_DAILY = os.getenv("LOG_ROTATE_DAILY", "1") == "1"  # rotation par date (UTC)
+# File pleine : "drop" (on jette l'événement) ou "block" (attente max LOG_BLOCK_TIMEOUT puis drop)
+LOG_QUEUE_POLICY = os.getenv("LOG_QUEUE_POLICY", "drop")
+LOG_BLOCK_TIMEOUT = float(os.getenv("LOG_BLOCK_TIMEOUT", "0.05"))
+# Format(s) de sortie : "jsonl" (défaut), "binary" (segments compacts, cf. api.utils.prediction_store) ou "both"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "jsonl").lower()
 
 os.makedirs(LOG_DIR, exist_ok=True)
 
+
+class _Flush:
+    """Marqueur déposé dans la file : le writer écrit son lot puis signale l'event."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class _Events(list):
+    """Lot d'événements déposé en un seul élément de file (cf. PredictionLogger.log_many)."""
+
+
+_STOP = object()
+
+
+def process_log_file(pattern: str = LOG_FILE_PATTERN) -> str:
+    """Fichier JSONL du process courant ; {pid} est résolu à l'écriture (le pid change après un fork)."""
+    return pattern.format(pid=os.getpid())
+
+
+class JsonlSink:
+    """
+    Sortie JSONL (un événement par ligne) avec rotation par taille et/ou par date.
+    Un path contenant {pid} (défaut LOG_FILE_PATTERN) donne à chaque process son propre fichier,
+    qu'il est seul à écrire et à faire tourner.
+    """
+
+    def __init__(self, path: str = LOG_FILE_PATTERN, max_bytes: int = LOG_MAX_BYTES, rotate_daily: bool = LOG_ROTATE_DAILY):
+        self._path = path
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.rotations = 0
+        self._file_date = None
+
+    @property
+    def path(self) -> str:
+        return process_log_file(self._path)
+
+    def write(self, batch: list) -> None:
+        data = "".join(json.dumps(event) + "\n" for event in batch)
+        path = self.path
+        self._rotate_if_needed(path, len(data))
+        with open(path, "a") as f:
+            f.write(data)
+
+    def close(self) -> None:
+        pass
+
+    def _rotate_if_needed(self, path: str, incoming: int) -> None:
+        now = datetime.datetime.utcnow()
+        if not os.path.exists(path):
+            self._file_date = now.date()
+            return
+
+        size = os.path.getsize(path)
+        if self._file_date is None:
+            self._file_date = datetime.datetime.utcfromtimestamp(os.path.getmtime(path)).date()
+
+        too_big = self.max_bytes > 0 and size > 0 and size + incoming > self.max_bytes
+        new_day = self.rotate_daily and self._file_date != now.date()
+        if not (too_big or new_day):
+            return
+
+        root, ext = os.path.splitext(path)
+        target = f"{root}.{now.strftime('%Y%m%dT%H%M%S')}{ext}"
+        suffix = 1
+        while os.path.exists(target):
+            target = f"{root}.{now.strftime('%Y%m%dT%H%M%S')}-{suffix}{ext}"
+            suffix += 1
+
+        os.replace(path, target)
+        self._file_date = now.date()
+        self.rotations += 1
+
+
+class PredictionLogger:
+    """
+    Logger de prédictions bufferisé :
+    - file bornée + thread writer (pas d'I/O disque dans le chemin de la requête)
+    - écriture par lots : flush sur taille (batch_size) ou intervalle (flush_interval)
+    - sorties (sinks) : JSONL par défaut (rotation par taille et/ou par date), segments binaires
+    - politique file pleine "drop" ou "block" (backpressure bornée), compteur d'événements perdus
+    - lots (log_many) : un seul élément de file, la capacité de la file compte en requêtes et non en lignes
+    """
+
+    def __init__(
+        self,
+        path: str = LOG_FILE_PATTERN,
+        queue_size: int = LOG_QUEUE_SIZE,
+        batch_size: int = LOG_BATCH_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+        max_bytes: int = LOG_MAX_BYTES,
+        rotate_daily: bool = LOG_ROTATE_DAILY,
+        policy: str = LOG_QUEUE_POLICY,
+        block_timeout: float = LOG_BLOCK_TIMEOUT,
+        sinks: list = None,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sinks = sinks if sinks is not None else [JsonlSink(path, max_bytes, rotate_daily)]
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+
+    # ----------------------------
+    # Côté requête
+    # ----------------------------
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="prediction-logger", daemon=True)
+                self._thread.start()
+
+    def log(self, event: dict) -> bool:
+        """Dépose un événement dans la file. Renvoie False s'il a été perdu (file pleine)."""
+        return self._put(event, 1)
+
+    def log_many(self, events: list) -> bool:
+        """
+        Dépose un lot d'événements comme UN élément de la file (le writer l'aplatit) :
+        un /predict/batch de 100k lignes ne sature pas la file et n'est pas perdu en partie.
+        Renvoie False si le lot entier a été perdu (file pleine).
+        """
+        if not events:
+            return True
+        return self._put(_Events(events), len(events))
+
+    def _put(self, item, n: int) -> bool:
+        self._ensure_started()
+        try:
+            if self.policy == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += n
+            return False
+
+        with self._lock:
+            self.enqueued += n
+        return True
+
+    def add_sink(self, sink) -> None:
+        """Ajoute une sortie (ex: DriftTracker) ; prise en compte dès le lot suivant."""
+        with self._lock:
+            self.sinks = self.sinks + [sink]
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attend que tous les événements déjà déposés soient écrits sur disque."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Écrit les événements en attente puis arrête le thread writer."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "queue_depth": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "rotations": sum(getattr(sink, "rotations", 0) for sink in self.sinks),
+                "write_errors": self.write_errors,
+            }
+
+    # ----------------------------
+    # Thread writer
+    # ----------------------------
+    def _run(self) -> None:
+        batch = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # intervalle écoulé
+
+            if item is _STOP:
+                self._write(batch)
+                for sink in self.sinks:
+                    sink.close()
+                return
+
+            if isinstance(item, _Flush):
+                self._write(batch)
+                batch, deadline = [], None
+                item.done.set()
+                continue
+
+            if isinstance(item, _Events):
+                batch.extend(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            elif item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if len(batch) >= self.batch_size or (item is None and batch):
+                self._write(batch)
+                batch, deadline = [], None
+
+    def _write(self, batch: list) -> None:
+        if not batch:
+            return
+
+        ok = True
+        for sink in self.sinks:
+            try:
+                sink.write(batch)
+            except Exception as e:
+                ok = False
+                print(f"⚠️ Écriture des logs de prédiction impossible ({type(sink).__name__}) : {e}")
+
+        with self._lock:
+            if ok:
+                self.written += len(batch)
+                self.batches += 1
+            else:
+                self.write_errors += 1
+
+
+def default_sinks() -> list:
+    """Sorties selon LOG_FORMAT (jsonl / binary / both)."""
+    sinks = []
+    if LOG_FORMAT in ("jsonl", "both"):
+        sinks.append(JsonlSink())
+    if LOG_FORMAT in ("binary", "both"):
+        from api.utils.prediction_store import BinarySegmentSink
+
+        sinks.append(BinarySegmentSink())
+    return sinks or [JsonlSink()]
+
+
+prediction_logger = PredictionLogger(sinks=default_sinks())
+atexit.register(prediction_logger.close)
+
+
 def log_prediction(input_features: dict, probability: float, prediction: int):
-    """Enregistre un événement de prédiction dans un fichier JSONL."""
+    """Enregistre un événement de prédiction (écriture JSONL asynchrone)."""
     event = {
         "timestamp": datetime.datetime.utcnow().isoformat(),
         "features": input_features,
@@ -16,5 +300,23 @@ def log_prediction(input_features: dict, probability: float, prediction: int):
         "prediction": prediction
     }
 
-    with open(LOG_FILE, "a") as f:
-        f.write(json.dumps(event) + "\n")
+    prediction_logger.log(event)
+
+
+def log_predictions(input_features: list, probabilities, predictions):
+    """Enregistre un lot de prédictions (une ligne JSONL par client, un seul dépôt dans la file)."""
+    timestamp = datetime.datetime.utcnow().isoformat()
+    prediction_logger.log_many([
+        {
+            "timestamp": timestamp,
+            "features": features,
+            "probability": float(probability),
+            "prediction": int(prediction)
+        }
+        for features, probability, prediction in zip(input_features, probabilities, predictions)
+    ])
+
+
+def flush_predictions(timeout: float = 5.0) -> bool:
+    """Force l'écriture des événements en attente (tests, arrêt du process)."""
+    return prediction_logger.flush(timeout)
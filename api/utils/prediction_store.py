@@ -0,0 +1,187 @@
+"""
+Log de prédictions binaire, à schéma fixe (alternative compacte au JSONL).
+
+Chaque segment logs/segments/predictions-<t0>.bin contient :
+- un en-tête : MAGIC + longueur (uint32) + JSON (version, features, dtype)
+- des enregistrements packés RECORD_DTYPE (53 octets, features en float32)
+  au lieu d'un objet JSON de ~450 octets répétant les noms de features
+
+Les segments tournent par taille ou par âge ; <t0> (plus petit timestamp en µs du
+premier lot) permet au lecteur d'ignorer les segments qui commencent après la fin de
+la plage demandée. Plusieurs workers écrivent dans le même répertoire : les segments
+se chevauchent dans le temps, le début de plage est donc filtré par enregistrement.
+La lecture est un np.fromfile par segment : pas de parsing ligne à ligne.
+"""
+from __future__ import annotations
+
+import datetime
+import glob
+import json
+import os
+import struct
+import time
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from api.schemas.input_schema import FEATURE_ORDER
+
+
+SEGMENT_DIR = os.getenv("LOG_SEGMENT_DIR", os.path.join("logs", "segments"))
+SEGMENT_MAX_BYTES = int(os.getenv("LOG_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+SEGMENT_MAX_SECONDS = float(os.getenv("LOG_SEGMENT_MAX_SECONDS", "3600"))
+
+MAGIC = b"OCP8PRED"
+FORMAT_VERSION = 1
+
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<i8"),  # µs depuis epoch (UTC)
+    ("features", "<f4", (len(FEATURE_ORDER),)),
+    ("probability", "<f4"),
+    ("prediction", "i1"),
+])
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+TimeLike = Union[str, datetime.datetime, pd.Timestamp, None]
+
+
+def _to_micros(t: TimeLike) -> Optional[int]:
+    """Convertit un instant (ISO, datetime naïf UTC, Timestamp) en µs depuis epoch."""
+    if t is None:
+        return None
+    ts = pd.Timestamp(t)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return int(ts.value // 1000)
+
+
+def _header_bytes() -> bytes:
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "features": FEATURE_ORDER,
+        "dtype": RECORD_DTYPE.descr,
+    }).encode("utf-8")
+    return MAGIC + struct.pack("<I", len(header)) + header
+
+
+def events_to_records(events: list) -> np.ndarray:
+    """Convertit des événements log_prediction (dicts) en tableau RECORD_DTYPE."""
+    records = np.zeros(len(events), dtype=RECORD_DTYPE)
+    for i, event in enumerate(events):
+        ts = datetime.datetime.fromisoformat(event["timestamp"])
+        features = event.get("features") or {}
+        records[i]["timestamp"] = (ts - _EPOCH) // datetime.timedelta(microseconds=1)
+        records[i]["features"] = [np.nan if features.get(f) is None else features[f] for f in FEATURE_ORDER]
+        records[i]["probability"] = event["probability"]
+        records[i]["prediction"] = event["prediction"]
+    return records
+
+
+class BinarySegmentSink:
+    """Sink du PredictionLogger : écrit des segments binaires tournants."""
+
+    def __init__(
+        self,
+        directory: str = SEGMENT_DIR,
+        max_bytes: int = SEGMENT_MAX_BYTES,
+        max_seconds: float = SEGMENT_MAX_SECONDS,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.rotations = 0
+        self._file = None
+        self._opened_at = None
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, batch: list) -> None:
+        records = events_to_records(batch)
+        if self._should_roll(records.nbytes):
+            self._roll(int(records["timestamp"].min()))
+        self._file.write(records.tobytes())
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _should_roll(self, incoming: int) -> bool:
+        if self._file is None:
+            return True
+        too_big = self.max_bytes > 0 and self._file.tell() + incoming > self.max_bytes
+        too_old = self.max_seconds > 0 and time.monotonic() - self._opened_at > self.max_seconds
+        return too_big or too_old
+
+    def _roll(self, first_ts: int) -> None:
+        if self._file is not None:
+            self.close()
+            self.rotations += 1
+
+        path = os.path.join(self.directory, f"predictions-{first_ts:020d}.bin")
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f"predictions-{first_ts:020d}-{suffix}.bin")
+            suffix += 1
+
+        self._file = open(path, "wb")
+        self._file.write(_header_bytes())
+        self._opened_at = time.monotonic()
+
+
+def read_segment(path: str) -> np.ndarray:
+    """Lit un segment (enregistrements complets uniquement, même s'il est en cours d'écriture)."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Segment invalide : {path}")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len))
+        if header["version"] != FORMAT_VERSION or header["features"] != FEATURE_ORDER:
+            raise ValueError(f"Segment incompatible (version/features) : {path}")
+
+        raw = f.read()
+
+    n = len(raw) // RECORD_DTYPE.itemsize
+    return np.frombuffer(raw, dtype=RECORD_DTYPE, count=n)
+
+
+def _segment_start(path: str) -> int:
+    return int(os.path.basename(path).split("-")[1].split(".")[0])
+
+
+def read_prediction_records(directory: str = SEGMENT_DIR, start: TimeLike = None, end: TimeLike = None) -> np.ndarray:
+    """Enregistrements bruts (RECORD_DTYPE) dont le timestamp est dans [start, end)."""
+    start_us, end_us = _to_micros(start), _to_micros(end)
+    paths = sorted(glob.glob(os.path.join(directory, "predictions-*.bin")), key=_segment_start)
+
+    parts = []
+    for path in paths:
+        # Les segments de plusieurs workers se chevauchent : seul <t0> >= end permet
+        # d'écarter un segment, la plage [start, end) est filtrée enregistrement par enregistrement
+        if end_us is not None and _segment_start(path) >= end_us:
+            break
+
+        records = read_segment(path)
+        mask = np.ones(len(records), dtype=bool)
+        if start_us is not None:
+            mask &= records["timestamp"] >= start_us
+        if end_us is not None:
+            mask &= records["timestamp"] < end_us
+        parts.append(records[mask])
+
+    return np.concatenate(parts) if parts else np.empty(0, dtype=RECORD_DTYPE)
+
+
+def read_predictions(directory: str = SEGMENT_DIR, start: TimeLike = None, end: TimeLike = None) -> pd.DataFrame:
+    """
+    Prédictions loggées dans [start, end) sous forme de DataFrame :
+    timestamp, FEATURE_ORDER (float32), probability, prediction.
+    """
+    records = read_prediction_records(directory, start, end)
+
+    df = pd.DataFrame(records["features"], columns=FEATURE_ORDER)
+    df.insert(0, "timestamp", pd.to_datetime(records["timestamp"], unit="us"))
+    df["probability"] = records["probability"]
+    df["prediction"] = records["prediction"]
+    return df
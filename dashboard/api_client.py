@@ -1,25 +1,202 @@
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Types renvoyés par l'API selon le format négocié (cf. api/data/formats.py)
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+ARROW_META_KEY = b"meta"
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def frame_from_response(r):
+    """
+    Décode une réponse tabulaire de l'API (records, columns, arrow ou parquet)
+    directement en DataFrame. Renvoie (df, métadonnées : n, seuil...).
+    """
+    media_type = r.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if media_type in (ARROW_MEDIA_TYPE, PARQUET_MEDIA_TYPE):
+        import pyarrow as pa
+
+        if media_type == ARROW_MEDIA_TYPE:
+            table = pa.ipc.open_stream(r.content).read_all()
+        else:
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(io.BytesIO(r.content))
+        raw = (table.schema.metadata or {}).get(ARROW_META_KEY)
+        return table.to_pandas(), (json.loads(raw) if raw else {})
+
+    payload = r.json()
+    columns = payload.pop("columns", None)
+    if "data" in payload:
+        return pd.DataFrame(payload.pop("data"), columns=columns), payload
+    return pd.DataFrame(payload.pop("rows", []), columns=columns), payload
+
+
+# Connexions HTTP : une Session (keep-alive, pool) par URL d'API pour tout le process Streamlit,
+# avec retries bornés + backoff exponentiel sur les erreurs transitoires (GET uniquement)
+POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+RETRY_TOTAL = int(os.getenv("API_RETRY_TOTAL", "3"))
+RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", "0.5"))  # 0.5s, 1s, 2s...
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Cache de réponses (process) pour les GET idempotents : metadata, population, client
+CACHE_TTL = float(os.getenv("API_CACHE_TTL", "300"))  # secondes
+CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "256"))
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# clé -> (expiration monotonic, Response)
+_response_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_session(base_url: str) -> requests.Session:
+    """Session partagée (pool de connexions keep-alive + retries) pour une URL d'API."""
+    with _sessions_lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            retry = Retry(
+                total=RETRY_TOTAL,
+                backoff_factor=RETRY_BACKOFF,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset(["GET", "HEAD"]),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[base_url] = session
+        return session
+
+
+def clear_cache() -> None:
+    """Vide le cache de réponses (ex: après changement de modèle côté API)."""
+    with _cache_lock:
+        _response_cache.clear()
+
 
 class ApiClient:
-    def __init__(self, base_url: str, timeout: float = 300):
+    def __init__(self, base_url: str, timeout: float = 300, cache_ttl: float = CACHE_TTL):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.session = get_session(self.base_url)
+
+    def _get(self, path: str, params: dict = None):
+        return self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+
+    def _post(self, path: str, params: dict = None, json_body=None):
+        return self.session.post(f"{self.base_url}{path}", params=params, json=json_body, timeout=self.timeout)
+
+    def _cached_get(self, path: str, params: dict = None):
+        """
+        GET mis en cache (process) pendant cache_ttl, seulement pour les réponses 200.
+        Entrée expirée avec ETag : revalidation If-None-Match (304 -> corps déjà en mémoire).
+        """
+        key = (self.base_url, path, tuple(sorted((params or {}).items())))
+        now = time.monotonic()
+        with _cache_lock:
+            entry = _response_cache.get(key)
+            if entry is not None:
+                _response_cache.move_to_end(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        headers = {}
+        etag = entry[1].headers.get("etag") if entry is not None else None
+        if etag:
+            headers["If-None-Match"] = etag
+
+        r = self.session.get(f"{self.base_url}{path}", params=params, headers=headers, timeout=self.timeout)
+        if r.status_code == 304 and entry is not None:
+            r = entry[1]
+        elif r.status_code != 200:
+            return r
+
+        with _cache_lock:
+            _response_cache[key] = (now + self.cache_ttl, r)
+            _response_cache.move_to_end(key)
+            while len(_response_cache) > CACHE_MAX_ENTRIES:
+                _response_cache.popitem(last=False)
+        return r
 
     def health(self):
-        return requests.get(f"{self.base_url}/health", timeout=self.timeout)
+        return self._get("/health")
 
     def metadata(self):
-        return requests.get(f"{self.base_url}/metadata", timeout=self.timeout)
+        return self._cached_get("/metadata")
 
     def get_client(self, sk_id: int):
-        return requests.get(f"{self.base_url}/client/{sk_id}", timeout=self.timeout)
+        return self._cached_get(f"/client/{sk_id}")
 
     def predict(self, features: dict):
-        return requests.post(f"{self.base_url}/predict", json=features, timeout=self.timeout)
+        return self._post("/predict", json_body=features)
+
+    def predict_batch(self, records: list, fmt: str = None):
+        params = {"format": fmt} if fmt else None
+        return self._post("/predict/batch", params=params, json_body={"records": records})
 
     def explain(self, features: dict, top_n: int = 10):
-        return requests.post(f"{self.base_url}/explain", params={"top_n": top_n}, json=features, timeout=self.timeout)
+        return self._post("/explain", params={"top_n": top_n}, json_body=features)
+
+    def population_sample(self, n: int = 2000, fmt: str = None):
+        params = {"n": n}
+        if fmt:
+            params["format"] = fmt
+        return self._cached_get("/population/sample", params=params)
+
+    def population_stats(self, feature: str, value: float = None, bins: int = 30, quantiles=(0.25, 0.5, 0.75)):
+        """Histogramme + quantiles exacts sur toute la population (+ percentile de value si fourni)."""
+        params = {"bins": bins, "quantiles": ",".join(str(q) for q in quantiles)}
+        if value is not None:
+            params["value"] = value
+        return self._cached_get(f"/population/stats/{feature}", params=params)
+
+    def population_percentile(self, feature: str, value: float):
+        return self._cached_get(f"/population/percentile/{feature}", params={"value": value})
+
+    def population_density(self, x: str, y: str, bins: int = 40, clip: float = 0.01):
+        """Grille de densité 2-D (toute la population) pour le couple (x, y)."""
+        return self._cached_get("/population/density", params={"x": x, "y": y, "bins": bins, "clip": clip})
+
+    def default_frame_format(self) -> str:
+        """Arrow si pyarrow est installé côté dashboard, sinon JSON orienté colonnes."""
+        return "arrow" if arrow_available() else "columns"
 
-    def population_sample(self, n: int = 2000):
-        return requests.get(f"{self.base_url}/population/sample", params={"n": n}, timeout=self.timeout)
+    def population_frame(self, n: int = 2000, fmt: str = None) -> pd.DataFrame:
+        """Échantillon population décodé en DataFrame (repli sur "columns" si l'API refuse Arrow : 406)."""
+        fmt = fmt or self.default_frame_format()
+        r = self.population_sample(n=n, fmt=fmt)
+        if r.status_code == 406 and fmt != "columns":
+            r = self.population_sample(n=n, fmt="columns")
+        r.raise_for_status()
+        return frame_from_response(r)[0]
 
+    def predict_batch_frame(self, records: list, fmt: str = None):
+        """Scoring par lot décodé en DataFrame (index, probability_default, prediction, error) + résumé."""
+        fmt = fmt or self.default_frame_format()
+        r = self.predict_batch(records, fmt=fmt)
+        if r.status_code == 406 and fmt != "columns":
+            r = self.predict_batch(records, fmt="columns")
+        r.raise_for_status()
+        return frame_from_response(r)
@@ -1,6 +1,7 @@
-import pandas as pd
+import numpy as np
 import streamlit as st
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 
 from dashboard.config import get_api_url
 from dashboard.api_client import ApiClient
@@ -23,17 +24,6 @@ if meta is None:
 
 features_list = [f["name"] for f in meta["features"]]
 
-# Population sample (cache)
-if "population_sample" not in st.session_state:
-    with st.spinner("Chargement d’un échantillon population..."):
-        r = api.population_sample(n=2000)
-        if r.status_code != 200:
-            st.error(f"Erreur population_sample: {r.status_code} {r.text}")
-            st.stop()
-        st.session_state["population_sample"] = r.json()
-
-df = pd.DataFrame(st.session_state["population_sample"]["rows"])
-
 client_id = st.session_state["current_client"]["SK_ID_CURR"]
 client_features = st.session_state["current_client"]["features"]
 
@@ -43,20 +33,35 @@ with colA:
 with colB:
     y_feat = st.selectbox("Variable Y", options=features_list, index=min(1, len(features_list)-1))
 
-# Séries population
-x_pop = pd.to_numeric(df[x_feat], errors="coerce")
-y_pop = pd.to_numeric(df[y_feat], errors="coerce")
+# Densité 2-D calculée côté API sur toute la population (grille de comptages)
+with st.spinner("Chargement de la densité population..."):
+    r = api.population_density(x_feat, y_feat, bins=40, clip=0.01)
+if r.status_code != 200:
+    st.error(f"Erreur population_density: {r.status_code} {r.text}")
+    st.stop()
+grid = r.json()
+
+x_edges = np.asarray(grid["x_edges"])
+y_edges = np.asarray(grid["y_edges"])
+counts = np.asarray(grid["counts"], dtype=float)
 
 # Valeurs client
 x_client = client_features.get(x_feat, None)
 y_client = client_features.get(y_feat, None)
 
-st.caption(f"Client : {client_id}. Population : {len(df)} clients (échantillon).")
+st.caption(
+    f"Client : {client_id}. Population : {grid['n']} clients (toute la base, "
+    f"1 % des valeurs extrêmes de chaque axe exclues)."
+)
 
 fig, ax = plt.subplots()
 
-# Scatter population (sans dépendre uniquement de la couleur)
-ax.scatter(x_pop, y_pop, s=10, alpha=0.5)
+# Densité population (échelle log : zones peu denses visibles) + barre de couleur légendée
+if counts.size and counts.max() > 0:
+    mesh = ax.pcolormesh(
+        x_edges, y_edges, np.ma.masked_equal(counts.T, 0), norm=LogNorm(vmin=1, vmax=counts.max()), cmap="Blues"
+    )
+    fig.colorbar(mesh, ax=ax, label="Nombre de clients")
 
 # Point client mis en évidence
 client_plotted = False
@@ -64,25 +69,37 @@ try:
     if x_client is not None and y_client is not None:
         xc = float(x_client)
         yc = float(y_client)
-        ax.scatter([xc], [yc], s=80, marker="X")
+        ax.scatter([xc], [yc], s=80, marker="X", color="red")
         client_plotted = True
 except Exception:
     client_plotted = False
 
 ax.set_xlabel(x_feat)
 ax.set_ylabel(y_feat)
-ax.set_title("Nuage de points (population) + client")
+ax.set_title("Densité (population) + client")
 
 st.pyplot(fig, clear_figure=True)
 
-# Résumé accessible (WCAG)
+# Résumé accessible (WCAG) : ne pas dépendre uniquement de la couleur
 if client_plotted:
+    # Dernière case fermée à droite (comme np.histogram2d) : valeur == dernier bord -> dernière case
+    i = np.searchsorted(x_edges, xc, side="right") - 1
+    j = np.searchsorted(y_edges, yc, side="right") - 1
+    if xc == x_edges[-1]:
+        i = len(x_edges) - 2
+    if yc == y_edges[-1]:
+        j = len(y_edges) - 2
+    if 0 <= i < counts.shape[0] and 0 <= j < counts.shape[1]:
+        share = 100.0 * counts[i, j] / grid["n"] if grid["n"] else 0.0
+        cell = f"Sa case de la grille regroupe **{int(counts[i, j])} clients** ({share:.2f} % de la population)."
+    else:
+        cell = "Il se situe en dehors de la zone représentée (valeurs extrêmes)."
     st.write(
-        f"Résumé : le client se situe au point **({x_feat}={xc:.3g}, {y_feat}={yc:.3g})**. "
-        "Le nuage de points représente l’ensemble des clients de l’échantillon."
+        f"Résumé : le client se situe au point **({x_feat}={xc:.3g}, {y_feat}={yc:.3g})**. {cell} "
+        "La couleur indique le nombre de clients par case sur l’ensemble de la base."
     )
 else:
     st.write(
         "Résumé : impossible d’afficher le point client (valeurs manquantes ou non numériques). "
-        "Le nuage de points représente l’ensemble des clients de l’échantillon."
+        "La couleur indique le nombre de clients par case sur l’ensemble de la base."
     )
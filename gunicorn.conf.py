@@ -0,0 +1,38 @@
+"""
+Configuration gunicorn en mode pré-fork :
+    gunicorn -c gunicorn.conf.py api.main:app
+
+- preload_app : api.main est importé une seule fois, dans le master
+- on_starting : warm-up synchrone dans le master (api.main.prefork_warmup) avant le fork :
+  modèle, DataFrame clients, ClientStore, stats population, background + explainer SHAP,
+  importance globale sont construits une fois et hérités par tous les workers
+  (pages partagées en copy-on-write, gc.freeze pour que le GC des workers ne les recopie pas)
+- SHARED_ARRAYS_DIR (ex: /dev/shm/credit-scoring-api) : les gros tableaux sont en plus publiés
+  en .npy memory-mappés (api.data.shared_arrays), ce qui couvre aussi uvicorn --workers
+  (workers lancés sans fork du master) et les redémarrages de workers
+- MODEL_MMAP=1 : tableaux numpy du modèle en memory-map (pkl non compressé uniquement)
+
+Mémoire privée mesurée par worker (smaps_rollup, 48 744 clients x 10 features, modèle factice
+TESTING=1, après warm-up + 200 /client + stats + sample) :
+- sans pré-fork (chaque worker fait son warm-up) : ~203 Mo privés par worker
+- pré-fork (preload + warm-up master)             : ~17 Mo privés par worker
+- uvicorn --workers + SHARED_ARRAYS_DIR : matrice features + valeurs triées des stats
+  (~8 Mo ici, n_clients x n_features x 16 octets) en une seule copie au lieu d'une par worker
+Le gain croît avec la taille du modèle et du fichier clients (les deux en une seule copie).
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+preload_app = True
+
+
+def on_starting(server):
+    # L'application est déjà importée (preload_app) : construction des artefacts avant le fork
+    import api.main
+
+    state = api.main.prefork_warmup()
+    server.log.info(f"Warm-up pré-fork : {state['status']} en {state['duration_s']}s")
@@ -0,0 +1,146 @@
+"""
+Lecture en streaming (par chunks) des CSV Home Credit, avec la même réparation
+des lignes compactées que l'ancienne lecture "tout en mémoire" :
+- ligne découpée par csv.reader ; si le nombre de colonnes est correct -> valide
+- sinon tentative de réparation brute line.split(",")
+- sinon ligne invalide (signalée au fil de l'eau)
+
+Seules les colonnes demandées sont conservées et converties en numérique chunk par chunk :
+la mémoire crête dépend de la taille du chunk, pas de la taille du fichier.
+Avec keep_text=True, les colonnes majoritairement non numériques (catégorielles Home Credit :
+NAME_CONTRACT_TYPE, CODE_GENDER...) restent des chaînes (manquants -> None) au lieu de NaN.
+"""
+import csv
+import json
+
+import pandas as pd
+
+
+CHUNK_LINES = 50_000
+
+# Valeurs traitées comme manquantes dans les colonnes texte (les colonnes numériques : tout non-nombre)
+MISSING_VALUES = frozenset({"", "NA", "N/A", "NaN", "nan", "null", "NULL", "None"})
+
+
+def split_line(line):
+    """
+    Découpe une ligne comme next(csv.reader([line])), puis tente la réparation split(",").
+    Renvoie (row, repair) ; repair vaut None si la ligne n'a pas de guillemets
+    (csv.reader et split donnent alors le même résultat).
+    """
+    if '"' not in line:
+        row = line.split(",") if line else []
+        return row, None
+    return next(csv.reader([line]), []), line.split(",")
+
+
+def _convert_column(values, keep_text):
+    """Colonne brute (chaînes) -> float64 ; ou chaînes si keep_text et majoritairement non numérique."""
+    numeric = pd.to_numeric(values, errors="coerce").astype("float64")
+    if keep_text:
+        present = ~values.isin(MISSING_VALUES)
+        not_numeric = int((numeric.isna() & present).sum())
+        if not_numeric and not_numeric * 2 > int(present.sum()):
+            return values.where(present, None)
+    return numeric
+
+
+def as_categories(values):
+    """
+    Colonne -> chaînes (manquants -> None). Pour aligner une colonne lue numérique sur un chunk
+    (ou un jeu) et catégorielle sur un autre : 10.0 -> "10", 0.5 -> "0.5".
+    """
+    if values.dtype == object:
+        return values.where(values.notna(), None)
+    return values.map(lambda v: None if pd.isna(v) else format(v, "g")).astype(object)
+
+
+def iter_robust_csv_chunks(path, expected_cols, columns=None, chunk_lines=CHUNK_LINES, on_invalid=None, keep_text=False):
+    """
+    Itère sur le CSV par blocs de chunk_lines lignes.
+    - 1ère ligne valide = en-tête
+    - columns : colonnes à conserver (toutes si None) ; erreur si l'une est absente
+    - on_invalid(report) : appelé pour chaque ligne irrécupérable
+    - keep_text : colonnes majoritairement non numériques conservées en chaînes (object)
+    Produit des DataFrames numériques (float64) restreints à columns (sauf colonnes texte).
+    """
+    header = None
+    keep = None
+    names = None
+    buffer = []
+    yielded = False
+
+    def flush(rows):
+        # "", "NA", "null"... -> NaN via la conversion numérique
+        chunk = pd.DataFrame(rows, columns=names)
+        return pd.DataFrame({name: _convert_column(chunk[name], keep_text) for name in names})
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for idx, line in enumerate(f):
+            line = line.rstrip("\r\n")
+            row, repair = split_line(line)
+
+            if len(row) != expected_cols:
+                # Tentative de réparation brute
+                if repair is not None and len(repair) == expected_cols:
+                    row = repair
+                else:
+                    # Ligne irrécupérable
+                    if on_invalid is not None:
+                        on_invalid({
+                            "line_number": idx,
+                            "raw_line": line,
+                            "reason": f"Ligne détectée avec {len(row)} colonnes",
+                        })
+                    continue
+
+            if header is None:
+                header = row
+                wanted = header if columns is None else columns
+                missing = [c for c in wanted if c not in header]
+                if missing:
+                    raise ValueError(f"Colonnes absentes de {path} : {missing}")
+                keep = [header.index(c) for c in wanted]
+                names = list(wanted)
+                continue
+
+            buffer.append([row[i] for i in keep])
+            if len(buffer) >= chunk_lines:
+                yield flush(buffer)
+                buffer, yielded = [], True
+
+    if header is None:
+        raise ValueError(f"Aucune ligne valide dans {path}")
+
+    if buffer or not yielded:
+        yield flush(buffer)
+
+
+def read_robust_csv(path, expected_cols, columns=None, chunk_lines=CHUNK_LINES, invalid_report_path=None, keep_text=False):
+    """
+    Lit tout le fichier via iter_robust_csv_chunks et concatène les chunks (déjà projetés/numériques).
+    keep_text : une colonne texte sur au moins un chunk est texte sur tout le fichier.
+    Les lignes invalides sont écrites au fil de l'eau dans invalid_report_path (JSONL) si fourni ;
+    renvoie (df, invalid_rows).
+    """
+    invalid_rows = []
+    report = open(invalid_report_path, "w", encoding="utf-8") if invalid_report_path else None
+
+    def on_invalid(item):
+        invalid_rows.append(item)
+        if report is not None:
+            report.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    try:
+        chunks = list(iter_robust_csv_chunks(path, expected_cols, columns, chunk_lines, on_invalid, keep_text))
+    finally:
+        if report is not None:
+            report.close()
+
+    text_columns = {name for chunk in chunks for name in chunk.columns if chunk[name].dtype == object}
+    for chunk in chunks:
+        for name in text_columns:
+            chunk[name] = as_categories(chunk[name])
+
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    return df, invalid_rows
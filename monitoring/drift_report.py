@@ -1,95 +1,91 @@
 ## Evidently 0.4.5 (0.3.x ?)
+import json
+
 import pandas as pd
-from evidently.report import Report
-from evidently.metric_preset import DataDriftPreset   # ton environnement interne
-from evidently import ColumnMapping
 
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from api.schemas.input_schema import FEATURE_ORDER
+from api.utils.drift import build_reference_profile, load_reference_profile, sketches_from_profile, summarize
+from monitoring.csv_stream import CHUNK_LINES, read_robust_csv
+from monitoring.parallel_drift import compute_parallel_drift
 
 REFERENCE_PATH = "monitoring/application_train.csv"
 CURRENT_PATH = "monitoring/application_test.csv"
 
 OUTPUT_REPORT = "monitoring/reports/data_drift_report.html"
 OUTPUT_JSON = "monitoring/reports/data_drift_summary.json"
+INVALID_ROWS_REFERENCE = "monitoring/reports/invalid_rows_reference.jsonl"
+INVALID_ROWS_CURRENT = "monitoring/reports/invalid_rows_current.jsonl"
 
-def robust_read_csv_path(path, expected_cols=121):
+def robust_read_csv_path(path, expected_cols=121, columns=None, invalid_report_path=None, keep_text=False):
     """
-    Lecture robuste d'un CSV Home Credit depuis un fichier :
+    Lecture robuste d'un CSV Home Credit depuis un fichier, en streaming :
     - détecte les lignes compactées
     - tente de les réparer
-    - renvoie df + invalid_rows
+    - ne garde que `columns` (converties en numérique chunk par chunk ; texte conservé si keep_text)
+    - renvoie df + invalid_rows (écrites aussi au fil de l'eau dans invalid_report_path)
     """
-    import csv
-
-    valid_rows = []
-    invalid_rows = []
-
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        raw_lines = f.read().splitlines()
-
-    for idx, line in enumerate(raw_lines):
-
-        row = next(csv.reader([line]))
-
-        # Ligne normale
-        if len(row) == expected_cols:
-            valid_rows.append(row)
-            continue
-
-        # Tentative de réparation brute
-        repair = line.split(",")
-
-        if len(repair) == expected_cols:
-            valid_rows.append(repair)
-            continue
-
-        # Ligne irrécupérable
-        invalid_rows.append({
-            "line_number": idx,
-            "raw_line": line,
-            "reason": f"Ligne détectée avec {len(row)} colonnes"
-        })
+    return read_robust_csv(
+        path,
+        expected_cols=expected_cols,
+        columns=columns,
+        chunk_lines=CHUNK_LINES,
+        invalid_report_path=invalid_report_path,
+        keep_text=keep_text,
+    )
 
-    if not valid_rows:
-        raise ValueError(f"Aucune ligne valide dans {path}")
 
-    df = pd.DataFrame(valid_rows[1:], columns=valid_rows[0])
-    return df, invalid_rows
+def load_current_from_logs(log_dir, start=None, end=None):
+    """
+    Données courantes = prédictions réellement servies par l'API sur [start, end),
+    lues depuis les segments binaires (LOG_FORMAT=binary|both) sans parsing JSON.
+    """
+    from api.utils.prediction_store import read_predictions
 
+    df = read_predictions(log_dir, start=start, end=end)
+    if df.empty:
+        raise ValueError(f"Aucune prédiction loggée dans {log_dir} sur la période demandée.")
+    return df[FEATURE_ORDER].astype("float64")
 
-def load_data():
 
+def read_raw(current=None, columns=FEATURE_ORDER, keep_text=False):
+    """
+    Référence + courant projetés sur columns (toutes les colonnes si None), sans imputation.
+    keep_text : colonnes catégorielles conservées en texte (drift par modalités).
+    """
     print("📥 Lecture robuste du dataset de référence...")
-    reference, bad_ref = robust_read_csv_path(REFERENCE_PATH, expected_cols=122)
+    reference, bad_ref = robust_read_csv_path(
+        REFERENCE_PATH, expected_cols=122, columns=columns, invalid_report_path=INVALID_ROWS_REFERENCE,
+        keep_text=keep_text,
+    )
 
-    print("📥 Lecture robuste du dataset courant...")
-    current, bad_cur = robust_read_csv_path(CURRENT_PATH, expected_cols=121)
+    if current is None:
+        print("📥 Lecture robuste du dataset courant...")
+        current, bad_cur = robust_read_csv_path(
+            CURRENT_PATH, expected_cols=121, columns=columns, invalid_report_path=INVALID_ROWS_CURRENT,
+            keep_text=keep_text,
+        )
+    else:
+        bad_cur = []
 
     print(f"⚠️ Lignes corrompues retirées — référence : {len(bad_ref)}")
     print(f"⚠️ Lignes corrompues retirées — courant   : {len(bad_cur)}")
+    return reference, current
+
+
+def load_data(current=None):
 
-    # Nettoyage NA
-    for df in (reference, current):
-        df.replace(["", " ", "NA", "N/A", "#N/A", "null", "NULL"], pd.NA, inplace=True)
+    reference, current = read_raw(current)
 
+    # Valeurs manquantes ("", "NA", "null"...) déjà converties en NaN à la lecture
     # Imputation cohérente
     median_ref = reference.median(numeric_only=True)
     reference = reference.fillna(median_ref)
     current = current.fillna(median_ref)
 
-    # Alignement strict
-    cols = reference.columns.intersection(current.columns)
-    reference = reference[cols]
-    current = current[cols]
-
-    # Convertir en numérique
-    reference = reference.apply(pd.to_numeric, errors="coerce")
-    current = current.apply(pd.to_numeric, errors="coerce")
-
-    # Ne garder que les features du modèle
+    # Ne garder que les features du modèle (alignement strict)
     reference = reference[FEATURE_ORDER]
     current   = current[FEATURE_ORDER]
 
@@ -100,7 +96,86 @@ def load_data():
     return reference, current
 
 
+def load_current(current=None):
+    """Données courantes seules (mode --reference-profile : pas de CSV de référence)."""
+    if current is None:
+        print("📥 Lecture robuste du dataset courant...")
+        current, bad_cur = robust_read_csv_path(
+            CURRENT_PATH, expected_cols=121, columns=FEATURE_ORDER, invalid_report_path=INVALID_ROWS_CURRENT
+        )
+        print(f"⚠️ Lignes corrompues retirées — courant   : {len(bad_cur)}")
+    return current[FEATURE_ORDER]
+
+
+def generate_profile_report(profile, current):
+    """
+    Rapport de drift à partir du profil de référence précalculé (monitoring/reference_profile.py) :
+    coût proportionnel aux données courantes uniquement.
+    Les manquants sont comptés à part (taux comparé à la référence), sans imputation.
+    """
+    reference_sketches = sketches_from_profile(profile, FEATURE_ORDER)
+    current_profile = build_reference_profile(current, FEATURE_ORDER)
+    current_sketches = {
+        name: sketch.copy_empty() for name, sketch in reference_sketches.items()
+    }
+    for name, sketch in current_sketches.items():
+        sketch.update(pd.to_numeric(current[name], errors="coerce").to_numpy(dtype="float64", na_value=float("nan")))
+
+    summary = summarize(reference_sketches, current_sketches)
+    summary["mode"] = "reference_profile"
+    summary["reference_rows"] = profile.get("n_rows")
+    summary["current_rows"] = int(len(current))
+    for name, stats in summary["features"].items():
+        stats["quantiles_reference"] = profile["features"][name].get("quantiles")
+        stats["quantiles_current"] = current_profile["features"][name]["quantiles"]
+
+    write_summary(summary, "Data drift (profil de référence)")
+    return summary
+
+
+def write_summary(summary, title):
+    """Résumé JSON (schéma summarize) + tableau HTML simple par feature."""
+    with open(OUTPUT_JSON, "w") as f:
+        json.dump(summary, f, indent=2)
+
+    table = pd.DataFrame.from_dict(summary["features"], orient="index")
+    table = table.drop(columns=["quantiles_reference", "quantiles_current"], errors="ignore")
+    with open(OUTPUT_REPORT, "w") as f:
+        f.write(f"<h1>{title}</h1>")
+        f.write(
+            f"<p>{summary['n_drifted_features']}/{summary['n_features']} features driftées "
+            f"(PSI &gt; {summary['psi_threshold']}) — drift global : {summary['dataset_drift']}</p>"
+        )
+        f.write(table.to_html())
+
+
+def generate_parallel_report(reference, current, workers=None):
+    """
+    Drift colonne par colonne réparti sur un pool de process (monitoring/parallel_drift.py).
+    Pensé pour élargir le suivi à toutes les colonnes Home Credit (--all-columns).
+    """
+    summary = compute_parallel_drift(reference, current, workers=workers, measure_speedup=True)
+    summary["mode"] = "parallel"
+    summary["reference_rows"] = int(len(reference))
+    summary["current_rows"] = int(len(current))
+
+    stats = summary["parallel"]
+    print(
+        f"⚡ {summary['n_features']} colonnes, {stats['workers']} workers ({stats['cpu_count']} cœurs) : "
+        f"{stats['wall_seconds']:.2f}s, colonnes {stats['columns_wall_seconds']:.2f}s "
+        f"vs {stats['serial_wall_seconds']:.2f}s en série (speedup x{stats['speedup']}, "
+        f"{stats['categorical_columns']} catégorielles)"
+    )
+    if stats["workers"] > 1 and (stats["cpu_count"] or 1) < 2:
+        print("⚠️ Un seul cœur disponible : le speedup mesuré ne peut pas dépasser 1")
+    write_summary(summary, "Data drift (calcul parallèle)")
+    return summary
+
+
 def generate_report(reference, current):
+    from evidently.report import Report
+    from evidently.metric_preset import DataDriftPreset   # ton environnement interne
+    from evidently import ColumnMapping
 
     report = Report(metrics=[DataDriftPreset()])
 
@@ -124,10 +199,38 @@ def generate_report(reference, current):
 
 
 if __name__ == "__main__":
+    import argparse
     import os
+
+    parser = argparse.ArgumentParser(description="Rapport de data drift (Evidently).")
+    parser.add_argument("--current-logs", help="Dossier de segments de prédictions (ex: logs/segments) "
+                                               "à utiliser comme données courantes à la place de CURRENT_PATH")
+    parser.add_argument("--start", help="Début de la fenêtre (ISO, UTC) pour --current-logs")
+    parser.add_argument("--end", help="Fin (exclue) de la fenêtre (ISO, UTC) pour --current-logs")
+    parser.add_argument("--reference-profile", help="Profil de référence précalculé (monitoring/reference_profile.py) : "
+                                                    "le CSV de référence n'est pas relu")
+    parser.add_argument("--workers", type=int, help="Drift par colonne réparti sur N process "
+                                                    "(statistiques PSI/KS maison au lieu d'Evidently)")
+    parser.add_argument("--all-columns", action="store_true", help="Avec --workers : toutes les colonnes "
+                                                                   "communes aux deux CSV, pas seulement FEATURE_ORDER")
+    args = parser.parse_args()
+
     os.makedirs("monitoring/reports", exist_ok=True)
 
-    reference, current = load_data()
-    generate_report(reference, current)
+    current = None
+    if args.current_logs:
+        print(f"📥 Lecture des prédictions loggées ({args.current_logs})...")
+        current = load_current_from_logs(args.current_logs, start=args.start, end=args.end)
+
+    if args.reference_profile:
+        profile = load_reference_profile(args.reference_profile)
+        generate_profile_report(profile, load_current(current))
+    elif args.workers:
+        columns = None if args.all_columns and current is None else FEATURE_ORDER
+        reference, current = read_raw(current, columns=columns, keep_text=columns is None)
+        generate_parallel_report(reference, current, workers=args.workers)
+    else:
+        reference, current = load_data(current)
+        generate_report(reference, current)
 
     print("\n🎉 Analyse de data drift terminée !")
@@ -0,0 +1,161 @@
+"""
+Drift par feature réparti sur un pool de process.
+
+Les matrices référence / courant sont écrites une fois en .npy (float64, NaN = manquant)
+dans un dossier temporaire ; chaque worker les ouvre en memory-map (mmap_mode="r") et ne lit
+que ses colonnes : pas de copie des DataFrames vers les workers, seuls les résultats
+(petits dicts de statistiques) reviennent au process principal.
+
+Les colonnes catégorielles (texte, cf. csv_stream keep_text) sont comparées dans le process
+principal : PSI sur les fréquences des modalités de la référence (modalités nouvelles regroupées),
+écart de taux de manquants ; "kind": "categorical" dans leurs statistiques.
+
+Le résumé produit a le même schéma que api.utils.drift.summarize (/drift, rapport par profil).
+Avec measure_speedup, les mêmes tâches sont aussi exécutées en série sur les mêmes .npy : le
+speedup rapporté est temps série / temps parallèle de cette étape, à lire avec cpu_count
+(sur une machine à un cœur, il ne peut pas dépasser 1).
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from api.utils.drift import N_BINS, PSI_EPS, PSI_THRESHOLD, FeatureSketch, compare_sketches, summarize_features
+from monitoring.csv_stream import as_categories
+
+
+# Colonnes non comparées quand on élargit à tout le dataset
+EXCLUDED_COLUMNS = ("SK_ID_CURR", "TARGET")
+
+# Nombre de tâches par worker (équilibrage : les colonnes n'ont pas toutes le même coût)
+TASKS_PER_WORKER = 4
+
+
+def drift_columns(reference, current, columns=None):
+    """Colonnes communes aux deux jeux (ordre de la référence), hors identifiant / cible."""
+    columns = columns or [c for c in reference.columns if c in current.columns]
+    return [c for c in columns if c not in EXCLUDED_COLUMNS]
+
+
+def is_categorical(reference, current, name):
+    """Colonne texte sur au moins un des deux jeux."""
+    return reference[name].dtype == object or current[name].dtype == object
+
+
+def categorical_drift(reference, current):
+    """
+    Drift d'une colonne catégorielle : PSI sur les fréquences des modalités de la référence,
+    les modalités absentes de la référence étant regroupées dans une modalité "autre".
+    """
+    reference, current = as_categories(reference), as_categories(current)
+    ref_counts = reference.value_counts()
+    cur_counts = current.value_counts()
+    categories = list(ref_counts.index)
+    unseen = int(cur_counts.drop(labels=categories, errors="ignore").sum())
+
+    n_ref, n_cur = int(ref_counts.sum()), int(cur_counts.sum())
+    value = None
+    if n_ref and n_cur:
+        p = np.append(ref_counts.to_numpy(dtype=np.float64), 0.0) / n_ref
+        q = np.append(cur_counts.reindex(categories, fill_value=0).to_numpy(dtype=np.float64), unseen) / n_cur
+        p, q = np.clip(p, PSI_EPS, None), np.clip(q, PSI_EPS, None)
+        value = float(np.sum((q - p) * np.log(q / p)))
+
+    return {
+        "kind": "categorical",
+        "psi": value,
+        "ks": None,
+        "missing_rate_reference": float(reference.isna().mean()) if len(reference) else None,
+        "missing_rate_current": float(current.isna().mean()) if len(current) else None,
+        "median_reference": None,
+        "median_current": None,
+        "n_current": int(len(current)),
+        "n_categories": len(categories),
+        "share_unseen_current": unseen / n_cur if n_cur else None,
+        "drift_detected": bool(value is not None and value > PSI_THRESHOLD),
+    }
+
+
+def _column_stats(reference_path, current_path, indices, names, n_bins):
+    """Tâche worker : statistiques de drift pour un groupe de colonnes (arrays memory-mappés)."""
+    reference = np.load(reference_path, mmap_mode="r")
+    current = np.load(current_path, mmap_mode="r")
+
+    results = {}
+    for j, name in zip(indices, names):
+        sketch = FeatureSketch.from_values(reference[:, j], n_bins=n_bins)
+        current_sketch = sketch.copy_empty()
+        current_sketch.update(current[:, j])
+        results[name] = compare_sketches(sketch, current_sketch)
+
+    return results
+
+
+def _run_serial(tasks):
+    return [_column_stats(*task) for task in tasks]
+
+
+def compute_parallel_drift(reference, current, columns=None, workers=None, n_bins=N_BINS, measure_speedup=False):
+    """
+    Drift de chaque colonne (PSI, KS sur histogrammes, taux de manquants), réparti sur `workers` process.
+    Colonnes catégorielles : categorical_drift, dans le process principal.
+    Renvoie le résumé au format summarize + une section "parallel" (temps, nombre de colonnes texte ;
+    avec measure_speedup, temps de la même étape en série et speedup).
+    """
+    all_columns = drift_columns(reference, current, columns)
+    categorical = [c for c in all_columns if is_categorical(reference, current, c)]
+    columns = [c for c in all_columns if c not in categorical]
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    wall_started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix="drift-") as tmp:
+        reference_path = os.path.join(tmp, "reference.npy")
+        current_path = os.path.join(tmp, "current.npy")
+        np.save(reference_path, reference[columns].to_numpy(dtype=np.float64, na_value=np.nan))
+        np.save(current_path, current[columns].to_numpy(dtype=np.float64, na_value=np.nan))
+
+        # Groupes de colonnes entrelacés (i, i+n, i+2n...) : coûts mieux répartis
+        n_tasks = min(len(columns), workers * TASKS_PER_WORKER) or 1
+        groups = [list(range(start, len(columns), n_tasks)) for start in range(n_tasks)]
+        tasks = [(reference_path, current_path, g, [columns[j] for j in g], n_bins) for g in groups if g]
+
+        # Étape mesurée : statistiques des colonnes numériques sur les .npy déjà écrits
+        stats_started = time.perf_counter()
+        if workers > 1 and tasks:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                outputs = list(pool.map(_column_stats, *zip(*tasks)))
+        else:
+            outputs = _run_serial(tasks)
+        stats_wall = time.perf_counter() - stats_started
+
+        # Référence séquentielle : mêmes tâches, mêmes colonnes memory-mappées, un seul process
+        serial_wall = stats_wall
+        if measure_speedup and workers > 1:
+            serial_started = time.perf_counter()
+            _run_serial(tasks)
+            serial_wall = time.perf_counter() - serial_started
+
+    features = {}
+    for results in outputs:
+        features.update(results)
+    for name in categorical:
+        features[name] = categorical_drift(reference[name], current[name])
+    # Ordre des colonnes conservé dans le JSON
+    summary = summarize_features({name: features[name] for name in all_columns})
+
+    wall = time.perf_counter() - wall_started
+    summary["parallel"] = {
+        "workers": workers,
+        "cpu_count": os.cpu_count(),
+        "tasks": len(tasks),
+        "wall_seconds": round(wall, 4),
+        "columns_wall_seconds": round(stats_wall, 4),
+        "categorical_columns": len(categorical),
+    }
+    if measure_speedup:
+        summary["parallel"]["serial_wall_seconds"] = round(serial_wall, 4)
+        summary["parallel"]["speedup"] = round(serial_wall / stats_wall, 2) if stats_wall > 0 else None
+    return summary
@@ -0,0 +1,49 @@
+"""
+Construction one-shot du profil de référence (à relancer seulement si la référence change).
+
+Lit application_train.csv en streaming (colonnes FEATURE_ORDER uniquement) et écrit un
+petit artefact JSON : par feature, histogramme à bornes fixes, quantiles, médiane
+(valeur d'imputation) et taux de manquants.
+
+Les rapports de drift (drift_report.py --reference-profile) et l'API (/drift) n'ont ensuite
+besoin que de cet artefact : plus besoin du CSV de référence sur l'hôte de monitoring.
+
+Usage :
+    python monitoring/reference_profile.py [--source monitoring/application_train.csv]
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from api.schemas.input_schema import FEATURE_ORDER
+from api.utils.drift import DRIFT_REFERENCE_PATH, N_BINS, build_reference_profile, save_reference_profile
+from monitoring.csv_stream import read_robust_csv
+
+REFERENCE_PATH = "monitoring/application_train.csv"
+REFERENCE_COLS = 122
+
+
+def build_profile(source=REFERENCE_PATH, out=DRIFT_REFERENCE_PATH, expected_cols=REFERENCE_COLS, n_bins=N_BINS):
+    print(f"📥 Lecture en streaming de {source}...")
+    reference, invalid_rows = read_robust_csv(source, expected_cols=expected_cols, columns=FEATURE_ORDER)
+    print(f"⚠️ Lignes corrompues ignorées : {len(invalid_rows)}")
+
+    profile = build_reference_profile(reference, FEATURE_ORDER, n_bins=n_bins)
+    profile["source"] = os.path.abspath(source)
+    profile["invalid_rows"] = len(invalid_rows)
+
+    save_reference_profile(profile, out)
+    print(f"✅ Profil de référence ({profile['n_rows']} lignes) écrit dans {out}")
+    return profile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construit le profil de référence pour le suivi de drift.")
+    parser.add_argument("--source", default=REFERENCE_PATH)
+    parser.add_argument("--out", default=DRIFT_REFERENCE_PATH)
+    parser.add_argument("--expected-cols", type=int, default=REFERENCE_COLS)
+    parser.add_argument("--bins", type=int, default=N_BINS)
+    args = parser.parse_args()
+
+    build_profile(args.source, args.out, args.expected_cols, args.bins)
@@ -1,2 +1,17 @@
 #!/bin/bash
+# Store colonnaire clients (projection + memory-map) : construit une fois si absent
+STORE_DIR=${CLIENT_STORE_DIR:-data/client_store}
+SOURCE=${CLIENT_DATA_PATH:-data/application_test.csv}
+if [ ! -f "$STORE_DIR/manifest.json" ] && [ -f "$SOURCE" ]; then
+    python -m api.data.columnar "$SOURCE" "$STORE_DIR"
+fi
+
+# Plusieurs workers : gunicorn pré-fork (modèle + données chargés une fois dans le master)
+# SHAP tourne par défaut dans des threads du worker. EXPLAIN_PROCESSES=N lance N process
+# SHAP par worker, chacun avec sa propre copie du modèle, des données clients et de
+# l'explainer (~200 Mo par process) : WEB_CONCURRENCY=2 + EXPLAIN_PROCESSES=2 = 6 copies.
+if [ "${WEB_CONCURRENCY:-1}" -gt 1 ]; then
+    exec gunicorn -c gunicorn.conf.py api.main:app
+fi
+
 uvicorn api.main:app --host 0.0.0.0 --port $PORT
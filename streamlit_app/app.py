@@ -1,134 +1,32 @@
+import os
+import sys
+
 import streamlit as st
-import requests
-import numpy as np
 import pandas as pd
 
-# 👉 URL de ton API FastAPI sur Render (avec /predict à la fin)
-#API_URL = "http://127.0.0.1:8000/predict" # Local
-API_URL = "https://oc-p7-4.onrender.com/predict" # Prod
-
-
-# Features attendues par l'API (schéma Pydantic)
-REQUIRED_FEATURES = [
-    "EXT_SOURCE_3",
-    "EXT_SOURCE_2",
-    "EXT_SOURCE_1",
-    "REG_CITY_NOT_WORK_CITY",
-    "DAYS_ID_PUBLISH",
-    "DAYS_LAST_PHONE_CHANGE",
-    "REGION_RATING_CLIENT",
-    "REGION_RATING_CLIENT_W_CITY",
-    "DAYS_EMPLOYED",
-    "DAYS_BIRTH",
-]
-
-INT_FEATURES = {
-    "REG_CITY_NOT_WORK_CITY",
-    "REGION_RATING_CLIENT",
-    "REGION_RATING_CLIENT_W_CITY",
-    "DAYS_ID_PUBLISH",
-    "DAYS_BIRTH",
-}
-
-
-def build_payload_from_row(row: pd.Series):
-    """
-    Construit un payload JSON propre pour l'API à partir d'une ligne de DataFrame.
-    - vérifie les colonnes obligatoires
-    - gère NaN
-    - convertit les types numpy → types natifs Python
-    - caste les features entières en int
-    """
-    payload = {}
-
-    for feat in REQUIRED_FEATURES:
-        if feat not in row.index:
-            return None, f"Colonne manquante dans le CSV : {feat}"
-
-        value = row[feat]
-
-        # NaN → None
-        if pd.isna(value):
-            value = None
-
-        # Si la valeur est None → on la laisse, l’imputeur de l’API s’en charge
-        if value is None:
-            payload[feat] = None
-            continue
-
-        # Si on a une vraie valeur → conversion selon type
-        if feat in INT_FEATURES:
-            try:
-                value = int(value)
-            except Exception:
-                return None, f"Impossible de convertir {feat} en int (valeur={value})"
-        else:
-            try:
-                value = float(value)
-            except Exception:
-                return None, f"Impossible de convertir {feat} en float (valeur={value})"
-
-        payload[feat] = value
-
-
-    return payload, None
-
-def clean_dataframe(df):
-    df = df.replace(["", " ", "NA", "N/A", "#N/A", "null"], np.nan)
-    df = df.apply(pd.to_numeric, errors="ignore")
-    return df
-
-def robust_read_csv(file_path_or_buffer):
-    """
-    Lecture robuste du CSV Home Credit :
-    - détecte les lignes "compactées" (toute la ligne dans une seule cellule)
-    - tente de les réparer
-    - sinon les marque comme invalides
-    - renvoie df propre + liste d'erreurs
-    """
-
-    import csv
-
-    valid_rows = []
-    invalid_rows = []
-
-    # Lecture brute ligne par ligne
-    raw_lines = file_path_or_buffer.read().decode("utf-8", errors="ignore").splitlines()
-
-    for idx, line in enumerate(raw_lines):
-
-        # Tentative de découpe CSV standard
-        row = next(csv.reader([line]))
-
-        # Ligne normale → 121 colonnes
-        if len(row) == 121:
-            valid_rows.append(row)
-            continue
-
-        # Tentative de réparation : splitter sur virgules
-        repair = line.split(",")
-
-        if len(repair) == 121:
-            valid_rows.append(repair)
-            continue
-
-        # Impossible de réparer
-        invalid_rows.append({
-            "line_number": idx,
-            "raw_line": line,
-            "reason": f"Ligne contient {len(row)} colonnes détectées"
-        })
-
-    # Construction du DataFrame propre
-    if not valid_rows:
-        raise ValueError("Aucune ligne valide trouvée dans le CSV.")
-
-    # Utilisation des en-têtes de la 1ère ligne valide
-    df = pd.DataFrame(valid_rows[1:], columns=valid_rows[0])
-
-    return df, invalid_rows
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from streamlit_app.scoring import (
+    API_URL,
+    REQUEST_TIMEOUT,
+    REQUIRED_FEATURES,
+    BatchEndpointUnavailable,
+    build_payload_from_row,
+    build_payloads,
+    clean_dataframe,
+    make_session,
+    robust_read_csv,
+    score_concurrently,
+    score_in_batches,
+)
 
 
+@st.cache_resource
+def get_session():
+    """Session HTTP partagée entre les reruns Streamlit."""
+    return make_session()
 
 
 # -------------------------------------------------------------------
@@ -187,7 +85,7 @@ if st.button("📥 Obtenir la prédiction"):
     else:
         with st.spinner("Envoi de la requête à l’API..."):
             try:
-                res = requests.post(API_URL, json=payload)
+                res = get_session().post(API_URL, json=payload, timeout=REQUEST_TIMEOUT)
                 if res.status_code == 200:
                     data = res.json()
 
@@ -244,52 +142,50 @@ if uploaded_file is not None:
         )
     else:
         if st.button("📥 Lancer les prédictions CSV"):
-            results = []
-            invalid_rows = []
-
-            with st.spinner("Prédictions en cours..."):
-                for idx, row in df.iterrows():
-                    payload, err = build_payload_from_row(row)
-
-                    # Si la ligne est invalide localement, on ne l’envoie pas à l’API
-                    if err:
-                        invalid_rows.append(
-                            {"index": idx, "SK_ID_CURR": row.get("SK_ID_CURR", None), "error": err}
-                        )
-                        results.append(
-                            {
-                                "index": idx,
-                                "SK_ID_CURR": row.get("SK_ID_CURR", None),
-                                "error": f"Validation locale : {err}",
-                            }
-                        )
-                        continue
-
-                    try:
-                        res = requests.post(API_URL, json=payload)
-                        if res.status_code == 200:
-                            data = res.json()
-                            data["index"] = idx
-                            data["SK_ID_CURR"] = row.get("SK_ID_CURR", None)
-                            results.append(data)
-                        else:
-                            results.append(
-                                {
-                                    "index": idx,
-                                    "SK_ID_CURR": row.get("SK_ID_CURR", None),
-                                    "error": f"API error {res.status_code}: {res.text}",
-                                }
-                            )
-                    except Exception as e:
-                        results.append(
-                            {
-                                "index": idx,
-                                "SK_ID_CURR": row.get("SK_ID_CURR", None),
-                                "error": f"Exception: {e}",
-                            }
-                        )
-
-            results_df = pd.DataFrame(results)
+            payloads, errors = build_payloads(df)
+            ids = df["SK_ID_CURR"].tolist() if "SK_ID_CURR" in df.columns else [None] * len(df)
+
+            # Lignes invalides localement : pas envoyées à l'API
+            invalid_rows = [
+                {"index": df.index[p], "SK_ID_CURR": ids[p], "error": err} for p, err in sorted(errors.items())
+            ]
+            results = [
+                {"position": p, "error": f"Validation locale : {err}"} for p, err in errors.items()
+            ]
+            positions = [p for p in range(len(df)) if p not in errors]
+
+            def to_frame(items):
+                if not items:
+                    return pd.DataFrame(columns=["index", "SK_ID_CURR"])
+                out = pd.DataFrame(items).sort_values("position", kind="stable")
+                out.insert(0, "index", df.index[out["position"].to_numpy()])
+                out.insert(1, "SK_ID_CURR", [ids[p] for p in out["position"]])
+                return out.drop(columns="position").reset_index(drop=True)
+
+            session = get_session()
+            progress = st.progress(0.0, text="Prédictions en cours...")
+            partial = st.empty()
+
+            def run(batches):
+                for chunk_results in batches:
+                    results.extend(chunk_results)
+                    sent = len(results) - len(errors)
+                    progress.progress(
+                        sent / max(len(positions), 1), text=f"Prédictions en cours... {sent}/{len(positions)}"
+                    )
+                    # Résultats partiels affichés au fil de l'eau
+                    partial.dataframe(to_frame(results).tail(20))
+
+            try:
+                run(score_in_batches(session, payloads, positions))
+            except BatchEndpointUnavailable:
+                # API sans /predict/batch : requêtes concurrentes bornées sur le pool de connexions
+                run(score_concurrently(session, payloads, positions))
+
+            progress.progress(1.0, text=f"Prédictions terminées : {len(positions)} lignes envoyées.")
+            partial.empty()
+
+            results_df = to_frame(results)
             st.success("🎉 Prédictions terminées !")
             st.dataframe(results_df)
 
@@ -0,0 +1,342 @@
+"""
+Fonctions de l'interface de scoring (streamlit_app/app.py) sans dépendance à Streamlit :
+lecture robuste du CSV, construction des payloads, envoi à l'API (/predict/batch, repli /predict).
+"""
+import csv as csv_module
+import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+import numpy as np
+import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 👉 URL de ton API FastAPI sur Render (avec /predict à la fin)
+#API_URL = "http://127.0.0.1:8000/predict" # Local
+API_URL = "https://oc-p7-4.onrender.com/predict" # Prod
+BATCH_API_URL = API_URL + "/batch"
+
+# Scoring CSV : lots envoyés à /predict/batch (ou requêtes /predict concurrentes en repli)
+BATCH_CHUNK_ROWS = 500
+MAX_WORKERS = 8
+REQUEST_TIMEOUT = 120
+
+
+# Features attendues par l'API (schéma Pydantic)
+REQUIRED_FEATURES = [
+    "EXT_SOURCE_3",
+    "EXT_SOURCE_2",
+    "EXT_SOURCE_1",
+    "REG_CITY_NOT_WORK_CITY",
+    "DAYS_ID_PUBLISH",
+    "DAYS_LAST_PHONE_CHANGE",
+    "REGION_RATING_CLIENT",
+    "REGION_RATING_CLIENT_W_CITY",
+    "DAYS_EMPLOYED",
+    "DAYS_BIRTH",
+]
+
+# Format du CSV client (application_test : 121 colonnes) et valeurs manquantes reconnues
+EXPECTED_COLUMNS = 121
+NA_TOKENS = ["", " ", "NA", "N/A", "#N/A", "null"]
+
+INT_FEATURES = {
+    "REG_CITY_NOT_WORK_CITY",
+    "REGION_RATING_CLIENT",
+    "REGION_RATING_CLIENT_W_CITY",
+    "DAYS_ID_PUBLISH",
+    "DAYS_BIRTH",
+}
+
+
+def build_payload_from_row(row: pd.Series):
+    """
+    Construit un payload JSON propre pour l'API à partir d'une ligne de DataFrame.
+    - vérifie les colonnes obligatoires
+    - gère NaN
+    - convertit les types numpy → types natifs Python
+    - caste les features entières en int
+    """
+    payload = {}
+
+    for feat in REQUIRED_FEATURES:
+        if feat not in row.index:
+            return None, f"Colonne manquante dans le CSV : {feat}"
+
+        value = row[feat]
+
+        # NaN → None
+        if pd.isna(value):
+            value = None
+
+        # Si la valeur est None → on la laisse, l’imputeur de l’API s’en charge
+        if value is None:
+            payload[feat] = None
+            continue
+
+        # Si on a une vraie valeur → conversion selon type
+        if feat in INT_FEATURES:
+            try:
+                value = int(value)
+            except Exception:
+                return None, f"Impossible de convertir {feat} en int (valeur={value})"
+        else:
+            try:
+                value = float(value)
+            except Exception:
+                return None, f"Impossible de convertir {feat} en float (valeur={value})"
+
+        payload[feat] = value
+
+
+    return payload, None
+
+def build_payloads(df: pd.DataFrame):
+    """
+    Version vectorisée de build_payload_from_row pour tout un DataFrame :
+    conversion colonne par colonne (pas de boucle sur les lignes).
+    Renvoie (payloads, errors) :
+    - payloads : liste de dicts (None pour les lignes invalides), dans l'ordre du DataFrame
+    - errors   : {position: message} (1ère feature en erreur, comme build_payload_from_row)
+    """
+    missing = [c for c in REQUIRED_FEATURES if c not in df.columns]
+    if missing:
+        message = f"Colonne manquante dans le CSV : {missing[0]}"
+        return [None] * len(df), {i: message for i in range(len(df))}
+
+    columns = {}
+    errors = {}
+    # Ordre inverse : la première feature en erreur écrase les suivantes
+    for feat in reversed(REQUIRED_FEATURES):
+        raw = df[feat]
+        # ±inf (ex: "inf" converti par clean_dataframe) -> manquant : Int64 refuse inf, le JSON aussi
+        values = pd.to_numeric(raw, errors="coerce")
+        infinite = np.isinf(values.to_numpy(dtype=float))
+        raw, values = raw.mask(infinite), values.mask(infinite)
+        bad = values.isna() & raw.notna()
+        if feat in INT_FEATURES and raw.dtype == object:
+            # int("2.5") échoue alors que int(2.5) tronque : texte accepté seulement si entier
+            is_text = raw.map(type) == str
+            bad |= is_text & ~raw.where(is_text, "0").str.fullmatch(r"\s*[+-]?\d+\s*")
+        kind = "int" if feat in INT_FEATURES else "float"
+        for pos in np.flatnonzero(bad.to_numpy()):
+            errors[int(pos)] = f"Impossible de convertir {feat} en {kind} (valeur={raw.iloc[pos]})"
+
+        if feat in INT_FEATURES:
+            # int(valeur) tronque, comme build_payload_from_row
+            values = pd.Series(np.trunc(values.to_numpy(dtype=float)), index=df.index).astype("Int64")
+        else:
+            values = values.astype(float)
+        columns[feat] = values
+
+    X = pd.DataFrame({feat: columns[feat] for feat in REQUIRED_FEATURES}).astype(object)
+    # NaN → None : l'imputeur de l'API s'en charge
+    payloads = X.where(X.notna(), None).to_dict(orient="records")
+    for pos in errors:
+        payloads[pos] = None
+    return payloads, errors
+
+
+class BatchEndpointUnavailable(Exception):
+    """L'API ne propose pas /predict/batch (404/405) : repli sur /predict ligne à ligne."""
+
+
+def make_session(pool_size: int = MAX_WORKERS) -> requests.Session:
+    """
+    Session HTTP (keep-alive, pool de connexions, retries sur erreurs transitoires).
+    Retries limités à GET/HEAD, comme dashboard/api_client.py : un POST /predict(/batch)
+    rejoué pourrait scorer (et logger) deux fois les mêmes lignes.
+    """
+    retry = Retry(
+        total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=frozenset({"GET", "HEAD"})
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def score_in_batches(session, payloads, positions, chunk_rows=BATCH_CHUNK_ROWS):
+    """
+    Envoie les lignes valides par lots sur /predict/batch.
+    Génère, après chaque lot, la liste des résultats {position, ...} de ce lot.
+    Lève BatchEndpointUnavailable si l'API ne propose pas l'endpoint batch (404/405).
+    """
+    for start in range(0, len(positions), chunk_rows):
+        chunk = positions[start:start + chunk_rows]
+        try:
+            res = session.post(BATCH_API_URL, json={"records": [payloads[p] for p in chunk]}, timeout=REQUEST_TIMEOUT)
+        except Exception as e:
+            yield [{"position": p, "error": f"Exception: {e}"} for p in chunk]
+            continue
+
+        if res.status_code in (404, 405) and start == 0:
+            raise BatchEndpointUnavailable("Endpoint /predict/batch indisponible")
+        if res.status_code != 200:
+            yield [{"position": p, "error": f"API error {res.status_code}: {res.text}"} for p in chunk]
+            continue
+
+        data = res.json()
+        common = {k: data[k] for k in ("threshold_used", "business_cost_FN", "business_cost_FP") if k in data}
+        out = []
+        for p, item in zip(chunk, data["results"]):
+            if "error" in item:
+                out.append({"position": p, "error": f"API error 422: {item['error']}"})
+            else:
+                out.append({
+                    "position": p,
+                    "probability_default": item["probability_default"],
+                    "prediction": item["prediction"],
+                    **common,
+                })
+        yield out
+
+
+def _score_one(session, position, payload):
+    try:
+        res = session.post(API_URL, json=payload, timeout=REQUEST_TIMEOUT)
+        if res.status_code == 200:
+            return {"position": position, **res.json()}
+        return {"position": position, "error": f"API error {res.status_code}: {res.text}"}
+    except Exception as e:
+        return {"position": position, "error": f"Exception: {e}"}
+
+
+def score_concurrently(session, payloads, positions, workers=MAX_WORKERS, chunk_rows=BATCH_CHUNK_ROWS):
+    """
+    Repli sans endpoint batch : un POST /predict par ligne, au plus `workers` requêtes simultanées
+    sur les connexions du pool. Génère les résultats par paquets de chunk_rows (ordre d'arrivée).
+    """
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_score_one, session, p, payloads[p]) for p in positions]
+        done = []
+        for future in as_completed(futures):
+            done.append(future.result())
+            if len(done) >= chunk_rows:
+                yield done
+                done = []
+        if done:
+            yield done
+
+
+def clean_dataframe(df):
+    """
+    Conversion numérique colonne par colonne (opérations vectorisées) :
+    une colonne texte devient numérique seulement si toutes ses valeurs renseignées sont convertibles
+    (même résultat que pd.to_numeric(errors="ignore"), sans l'avertissement de dépréciation).
+    """
+    text_columns = df.columns[df.dtypes == object]
+    df[text_columns] = df[text_columns].replace(NA_TOKENS, np.nan)
+    for col in text_columns:
+        converted = pd.to_numeric(df[col], errors="coerce")
+        if converted.notna().sum() == df[col].notna().sum():
+            df[col] = converted
+    return df
+
+
+def _classify_lines(raw_lines, expected_cols):
+    """
+    Sépare les lignes en :
+    - direct   : lignes à passer telles quelles au lecteur C de pandas (bon nombre de colonnes)
+    - repaired : (position, champs) des lignes réparées par split(",")
+    - invalid  : rapport des lignes irrécupérables (même format qu'avant)
+    Chemin rapide sans csv.reader pour les lignes sans guillemets (cas courant).
+    """
+    direct, repaired, invalid = [], [], []
+    for idx, line in enumerate(raw_lines):
+        if '"' not in line:
+            n_cols = line.count(",") + 1 if line else 0
+            if n_cols == expected_cols:
+                direct.append(idx)
+                continue
+            # Sans guillemets, split(",") donne le même découpage : pas de réparation possible
+            invalid.append({"line_number": idx, "raw_line": line, "reason": f"Ligne contient {n_cols} colonnes détectées"})
+            continue
+
+        # Ligne avec guillemets : découpe CSV standard ligne à ligne (rare)
+        row = next(csv_module.reader([line]), [])
+        if len(row) == expected_cols:
+            direct.append(idx)
+            continue
+
+        # Tentative de réparation : splitter sur virgules
+        repair = line.split(",")
+        if len(repair) == expected_cols:
+            repaired.append((idx, repair))
+            continue
+
+        # Impossible de réparer
+        invalid.append({"line_number": idx, "raw_line": line, "reason": f"Ligne contient {len(row)} colonnes détectées"})
+
+    return direct, repaired, invalid
+
+
+def _merge_repaired(df, direct, repaired, header):
+    """
+    Réinsère les lignes réparées (champs texte) à leur position d'origine.
+    Une colonne reste numérique si les champs réparés sont convertibles ; sinon elle repasse
+    entièrement en texte, comme lorsque tout le fichier était lu en chaînes.
+    """
+    fixed = pd.DataFrame([fields for _, fields in repaired], columns=header, index=[i for i, _ in repaired])
+    fixed = fixed.replace(NA_TOKENS, np.nan)
+    df.index = direct
+
+    for col in header:
+        if df[col].dtype == object:
+            continue
+        converted = pd.to_numeric(fixed[col], errors="coerce")
+        if converted.notna().sum() == fixed[col].notna().sum():
+            fixed[col] = converted
+        else:
+            df[col] = df[col].astype(str).where(df[col].notna(), np.nan)
+
+    return pd.concat([df, fixed]).sort_index()
+
+
+def robust_read_csv(file_path_or_buffer, expected_cols=EXPECTED_COLUMNS):
+    """
+    Lecture robuste du CSV Home Credit :
+    - détecte les lignes "compactées" (toute la ligne dans une seule cellule)
+    - tente de les réparer
+    - sinon les marque comme invalides
+    - renvoie df propre + liste d'erreurs
+
+    Les lignes correctes sont parsées en une fois par le lecteur C de pandas ;
+    seules les lignes réparées passent par des listes Python.
+    """
+    text = file_path_or_buffer.read().decode("utf-8", errors="ignore")
+    raw_lines = text.splitlines()
+
+    direct, repaired, invalid_rows = _classify_lines(raw_lines, expected_cols)
+
+    # Construction du DataFrame propre
+    if not direct and not repaired:
+        raise ValueError("Aucune ligne valide trouvée dans le CSV.")
+
+    # Utilisation des en-têtes de la 1ère ligne valide
+    first = min(direct[:1] + [idx for idx, _ in repaired[:1]])
+    if direct and direct[0] == first:
+        header = next(csv_module.reader([raw_lines[first]]))
+        direct = direct[1:]
+    else:
+        header = repaired[0][1]
+        repaired = repaired[1:]
+
+    read_options = dict(
+        header=None, names=header, keep_default_na=False, na_values=NA_TOKENS, low_memory=False,
+        float_precision="round_trip",
+    )
+    n_breaks = text.count("\n") + text.count("\r") - text.count("\r\n")
+    if len(direct) == len(raw_lines) - 1 and len(raw_lines) - n_breaks in (0, 1):
+        # Cas courant : fichier sain, le texte est lu tel quel (pas de copie ligne à ligne)
+        df = pd.read_csv(io.StringIO(text), skiprows=1, **read_options)
+    else:
+        body = "\n".join(raw_lines[i] for i in direct)
+        df = pd.read_csv(io.StringIO(body), **read_options) if body else pd.DataFrame(columns=header)
+
+    if repaired:
+        df = _merge_repaired(df, direct, repaired, header)
+
+    return df.reset_index(drop=True), invalid_rows
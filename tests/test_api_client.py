@@ -0,0 +1,50 @@
+import dashboard.api_client as api_client
+from dashboard.api_client import ApiClient
+
+
+class _FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def _client(monkeypatch, responses, ttl=300):
+    api_client.clear_cache()
+    client = ApiClient("http://api.test/", cache_ttl=ttl)
+    calls = []
+
+    def fake_get(url, params=None, headers=None, timeout=None):
+        calls.append((url, params, headers))
+        return responses.pop(0)
+
+    monkeypatch.setattr(client.session, "get", fake_get)
+    return client, calls
+
+
+def test_session_shared_and_pooled():
+    a = ApiClient("http://api.test")
+    b = ApiClient("http://api.test/")
+    assert a.session is b.session
+    adapter = a.session.get_adapter("https://api.test")
+    assert adapter.max_retries.total == api_client.RETRY_TOTAL
+    assert "POST" not in adapter.max_retries.allowed_methods
+
+
+def test_cached_get_only_caches_success(monkeypatch):
+    ok = _FakeResponse(200)
+    client, calls = _client(monkeypatch, [_FakeResponse(503), ok])
+
+    assert client.metadata().status_code == 503
+    assert client.metadata() is ok
+    assert client.metadata() is ok
+    assert len(calls) == 2
+
+
+def test_expired_entry_revalidated_with_etag(monkeypatch):
+    first = _FakeResponse(200, {"etag": '"abc"'})
+    client, calls = _client(monkeypatch, [first, _FakeResponse(304)], ttl=0)
+
+    assert client.population_sample(n=10) is first
+    assert client.population_sample(n=10) is first
+    assert calls[1][2] == {"If-None-Match": '"abc"'}
+    assert calls[1][1] == {"n": 10}
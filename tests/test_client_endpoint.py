@@ -39,3 +39,26 @@ def test_client_endpoint_404(monkeypatch):
 
     r = client.get("/client/999999")
     assert r.status_code == 404
+
+def test_client_endpoint_json_ready_values(monkeypatch):
+    df = pd.DataFrame({
+        "SK_ID_CURR": [30, 10, 20],
+        "EXT_SOURCE_1": [0.5, float("nan"), 0.7],
+        "DAYS_BIRTH": [-10000, -12000, -14000],
+        "CODE_GENDER": ["F", "M", None],
+    })
+    monkeypatch.setattr(main, "get_clients_df", lambda: df)
+
+    r = client.get("/client/10")
+    assert r.status_code == 200
+    data = r.json()
+
+    assert data["features"]["EXT_SOURCE_1"] is None
+    assert data["features"]["DAYS_BIRTH"] == -12000
+    assert data["features"]["EXT_SOURCE_2"] is None
+    assert data["profile"]["CODE_GENDER"] == "M"
+
+    r = client.get("/client/20")
+    assert r.json()["profile"]["CODE_GENDER"] is None
+
+    assert client.get("/client/15").status_code == 404
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from api.data.client_store import CLIENT_COLUMNS, DEFAULT_PROFILE_COLUMNS, ClientStore
+from api.data.columnar import build_columnar_store, load_columnar_store
+from api.schemas.input_schema import FEATURE_ORDER
+
+
+def test_columnar_store_roundtrip(tmp_path):
+    df = pd.DataFrame({
+        "SK_ID_CURR": [100002, 100003, 100004],
+        "EXT_SOURCE_1": [0.083, np.nan, 0.511],
+        "DAYS_BIRTH": [-9461, -16765, -19046],
+        "CODE_GENDER": ["M", "F", None],
+        "AMT_CREDIT": [406597.5, 1293502.5, 135000.0],
+        "FLAG_MOBIL": [1, 1, 1],  # colonne non utilisée par l'API
+    })
+    source = tmp_path / "clients.csv"
+    df.to_csv(source, index=False)
+
+    manifest = build_columnar_store(str(source), str(tmp_path / "store"), CLIENT_COLUMNS)
+    assert "FLAG_MOBIL" not in manifest["columns"]
+    assert manifest["columns"]["DAYS_BIRTH"]["dtype"] == "int16"
+    assert manifest["columns"]["AMT_CREDIT"]["dtype"] == "float32"
+
+    loaded = load_columnar_store(str(tmp_path / "store"), CLIENT_COLUMNS)
+    assert list(loaded.columns) == ["SK_ID_CURR", "EXT_SOURCE_1", "DAYS_BIRTH", "CODE_GENDER", "AMT_CREDIT"]
+    assert isinstance(loaded["DAYS_BIRTH"].to_numpy().base, np.memmap)
+
+    store = ClientStore.from_frame(loaded, FEATURE_ORDER, DEFAULT_PROFILE_COLUMNS)
+    found = store.get(100003)
+    assert found["features"]["EXT_SOURCE_1"] is None
+    assert found["features"]["DAYS_BIRTH"] == -16765
+    assert found["profile"] == {"SK_ID_CURR": 100003, "CODE_GENDER": "F", "AMT_CREDIT": 1293502.5}
+    assert store.get(100004)["profile"]["CODE_GENDER"] is None
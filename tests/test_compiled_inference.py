@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+import api.main as main
+from api.model.compiled import NotCompilable, compile_model, validate_compiled
+from api.schemas.input_schema import FEATURE_ORDER
+from tests.test_predict import VALID_SAMPLE
+
+
+def _data(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, len(FEATURE_ORDER))) * 10
+    y = (X[:, 0] + X[:, 1] * 0.5 + rng.normal(size=n) > 0).astype(int)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    return X, y
+
+
+def _pipeline(estimator):
+    X, y = _data()
+    return Pipeline([
+        ("imputer", SimpleImputer(strategy="median")),
+        ("scaler", StandardScaler()),
+        ("model", estimator),
+    ]).fit(X, y)
+
+
+@pytest.mark.parametrize("estimator", [
+    LogisticRegression(max_iter=1000),
+    RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0),
+    GradientBoostingClassifier(n_estimators=30, random_state=0),
+    HistGradientBoostingClassifier(max_iter=30, random_state=0),
+])
+def test_compiled_matches_pipeline(estimator):
+    pipe = _pipeline(estimator)
+    X_ref, _ = _data(n=300, seed=1)
+
+    compiled = compile_model(pipe, len(FEATURE_ORDER), X_fit=X_ref)
+    report = validate_compiled(compiled, pipe, X_ref, tolerance=1e-6)
+
+    assert report["ok"], report
+    np.testing.assert_allclose(compiled.predict_proba(X_ref[:1]), pipe.predict_proba(X_ref[:1]), atol=1e-6)
+
+
+def test_unsupported_estimator_is_not_compiled():
+    with pytest.raises(NotCompilable):
+        compile_model(_pipeline(SVC()), len(FEATURE_ORDER), X_fit=_data()[0])
+
+
+def _use_model(monkeypatch, model, X_ref, tolerance=1e-6):
+    monkeypatch.setattr(main, "COMPILED_INFERENCE", True)
+    monkeypatch.setattr(main, "COMPILED_TOLERANCE", tolerance)
+    monkeypatch.setattr(main, "get_model", lambda: model)
+    monkeypatch.setattr(main, "compiled_reference_rows", lambda: X_ref)
+    monkeypatch.setattr(main, "inference_info", {"mode": "pipeline", "enabled": True})
+    main.get_inference_model.cache_clear()
+
+
+def test_predict_uses_validated_compiled_model(monkeypatch):
+    pipe = _pipeline(LogisticRegression(max_iter=1000))
+    _use_model(monkeypatch, pipe, _data(n=200, seed=2)[0])
+    try:
+        client = TestClient(main.app)
+        r = client.post("/predict", json=VALID_SAMPLE)
+        assert r.status_code == 200
+
+        X = np.array([[VALID_SAMPLE.get(f) for f in FEATURE_ORDER]], dtype=float)
+        assert r.json()["probability_default"] == pytest.approx(pipe.predict_proba(X)[0, 1], abs=1e-6)
+
+        info = client.get("/stats").json()["inference"]
+        assert info["mode"] == "compiled" and info["validation"]["n_rows"] == 200
+    finally:
+        main.get_inference_model.cache_clear()
+
+
+def test_falls_back_to_pipeline_when_validation_fails(monkeypatch):
+    pipe = _pipeline(LogisticRegression(max_iter=1000))
+    _use_model(monkeypatch, pipe, _data(n=50, seed=3)[0], tolerance=-1.0)
+    try:
+        assert main.get_inference_model() is pipe
+        assert main.inference_info["mode"] == "pipeline"
+        assert main.inference_info["validation"]["ok"] is False
+    finally:
+        main.get_inference_model.cache_clear()
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import api.explain.shap_explainer as shap_explainer
+import api.main as main
+import api.utils.concurrency as concurrency
+from api.explain.shap_explainer import ExplanationCache
+from api.schemas.input_schema import FEATURE_ORDER
+from api.utils.concurrency import ConcurrencyLimiter
+from tests.test_predict import VALID_SAMPLE
+
+
+def test_limiter_rejects_when_queue_full_or_wait_too_long():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=1, queue_timeout=0.05)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter:
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+
+        # Une place en file : attente puis 503 (timeout)
+        with pytest.raises(HTTPException) as waited:
+            async with limiter:
+                pass
+        assert waited.value.status_code == 503
+
+        # File pleine : 429 immédiat
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as rejected:
+            async with limiter:
+                pass
+        assert rejected.value.status_code == 429
+        assert rejected.value.headers["Retry-After"] == "1"
+
+        release.set()
+        await asyncio.gather(holder, waiter)
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 0 and stats["completed"] == 2
+    assert stats["rejected_429"] == 1 and stats["rejected_503"] == 1
+
+
+def test_explain_limited_while_health_stays_responsive(monkeypatch):
+    started = threading.Event()
+    threads = []
+
+    def slow_shap(X):
+        threads.append(threading.current_thread().name)
+        started.set()
+        time.sleep(0.5)
+        return np.full((len(X), len(FEATURE_ORDER)), 0.1), np.zeros(len(X))
+
+    # Calcul SHAP attendu directement sur l'executor explain (cache vide : pas de hit)
+    monkeypatch.setattr(concurrency, "shap_matrix_task", slow_shap)
+    monkeypatch.setattr(shap_explainer, "explanation_cache", ExplanationCache())
+    monkeypatch.setattr(main, "get_global_importance", lambda top_n=20: [])
+    monkeypatch.setattr(main, "EXPLAIN_LIMITER", ConcurrencyLimiter("explain", limit=1, max_queue=0))
+    client = TestClient(main.app)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        first = pool.submit(client.post, "/explain", json=VALID_SAMPLE)
+        assert started.wait(5)
+
+        t0 = time.perf_counter()
+        assert client.get("/health").status_code == 200
+        assert time.perf_counter() - t0 < 0.3
+
+        second = client.post("/explain", json=VALID_SAMPLE)
+        assert second.status_code == 429
+        assert first.result().status_code == 200
+        assert first.result().json()["top_contributions"][0]["shap_value"] == 0.1
+
+    assert len(threads) == 1 and threads[0].startswith("explain")
+
+    assert client.get("/stats").json()["concurrency"]["explain"]["rejected_429"] == 1
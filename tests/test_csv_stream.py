@@ -0,0 +1,50 @@
+import json
+
+from monitoring.csv_stream import iter_robust_csv_chunks, read_robust_csv
+
+
+def _write_csv(tmp_path):
+    lines = [
+        "SK_ID_CURR,A,B,C",
+        "1,0.5,x,10",
+        '"2,0.6,y,20"',          # ligne compactée : réparée par split(",")
+        "3,NA,z,",               # valeurs manquantes
+        "4,0.8",                 # irrécupérable
+        '5,"0.9",w,50',          # guillemets valides
+    ]
+    path = tmp_path / "data.csv"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_read_robust_csv_repairs_projects_and_reports(tmp_path):
+    report = tmp_path / "invalid.jsonl"
+    df, invalid = read_robust_csv(
+        _write_csv(tmp_path), expected_cols=4, columns=["SK_ID_CURR", "A", "C"],
+        chunk_lines=2, invalid_report_path=str(report),
+    )
+
+    assert list(df.columns) == ["SK_ID_CURR", "A", "C"]
+    assert len(df) == 4
+    assert df["A"].tolist()[:2] == [0.5, 0.6]
+    assert df["A"].isna().tolist() == [False, False, True, False]
+    assert str(df["C"].dtype) == "float64"
+
+    assert [r["line_number"] for r in invalid] == [4]
+    assert json.loads(report.read_text())["raw_line"] == "4,0.8"
+
+
+def test_chunks_are_bounded(tmp_path):
+    chunks = list(iter_robust_csv_chunks(_write_csv(tmp_path), expected_cols=4, columns=["A"], chunk_lines=2))
+    assert [len(c) for c in chunks] == [2, 2]
+
+
+def test_keep_text_preserves_categorical_columns(tmp_path):
+    df, _ = read_robust_csv(_write_csv(tmp_path), expected_cols=4, columns=["A", "B"], chunk_lines=2, keep_text=True)
+
+    assert str(df["A"].dtype) == "float64"
+    assert df["B"].tolist() == ["x", "y", "z", "w"]
+
+    # Sans keep_text : comportement numérique inchangé
+    df, _ = read_robust_csv(_write_csv(tmp_path), expected_cols=4, columns=["B"], chunk_lines=2)
+    assert df["B"].isna().all()
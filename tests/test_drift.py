@@ -0,0 +1,118 @@
+import os
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import api.main as main
+from api.schemas.input_schema import FEATURE_ORDER
+from api.utils.drift import DriftTracker, FeatureSketch, build_reference_profile, sketches_from_profile
+from api.utils.logging import PredictionLogger
+
+client = TestClient(main.app)
+
+
+def _reference_df(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.normal(size=(n, len(FEATURE_ORDER))), columns=FEATURE_ORDER)
+
+
+def test_feature_sketch_quantiles_and_missing():
+    values = np.r_[np.linspace(0, 1, 1001), [np.nan] * 10]
+    sketch = FeatureSketch.from_values(values, n_bins=20)
+
+    assert sketch.n == 1001
+    assert sketch.missing_rate() == 10 / 1011
+    assert abs(sketch.quantile(0.5) - 0.5) < 0.01
+
+
+def test_drift_tracker_fed_by_prediction_logger(tmp_path):
+    profile = build_reference_profile(_reference_df())
+    tracker = DriftTracker(sketches_from_profile(profile, FEATURE_ORDER))
+    logger = PredictionLogger(path=str(tmp_path / "p.jsonl"), flush_interval=60)
+    logger.add_sink(tracker)
+
+    shifted = _reference_df(n=500, seed=1)
+    shifted["EXT_SOURCE_3"] += 3.0
+    shifted.loc[:99, "EXT_SOURCE_2"] = np.nan
+    for row in shifted.to_dict(orient="records"):
+        features = {k: (None if pd.isna(v) else v) for k, v in row.items()}
+        logger.log({"timestamp": "2026-01-01T00:00:00", "features": features, "probability": 0.5, "prediction": 1})
+    assert logger.flush()
+    logger.close()
+
+    summary = tracker.summary()
+    assert summary["features"]["EXT_SOURCE_3"]["drift_detected"] is True
+    assert summary["features"]["EXT_SOURCE_1"]["drift_detected"] is False
+    assert summary["features"]["EXT_SOURCE_2"]["missing_rate_current"] == 0.2
+    assert summary["features"]["EXT_SOURCE_3"]["n_current"] == 500
+
+
+def test_drift_endpoint(monkeypatch):
+    profile = build_reference_profile(_reference_df())
+    monkeypatch.setattr(main, "_drift_tracker", DriftTracker(sketches_from_profile(profile, FEATURE_ORDER)))
+
+    r = client.get("/drift")
+    assert r.status_code == 200
+    data = r.json()
+    assert data["n_features"] == len(FEATURE_ORDER)
+    assert data["features"]["DAYS_BIRTH"]["n_current"] == 0
+
+
+def test_profile_report_without_reference_csv(tmp_path, monkeypatch):
+    import monitoring.drift_report as drift_report
+    from api.utils.drift import load_reference_profile, save_reference_profile
+
+    path = str(tmp_path / "reference_profile.json")
+    save_reference_profile(build_reference_profile(_reference_df()), path)
+    profile = load_reference_profile(path)
+    assert profile["features"]["EXT_SOURCE_3"]["median"] is not None
+    assert profile["features"]["EXT_SOURCE_3"]["missing_rate"] == 0.0
+
+    monkeypatch.setattr(drift_report, "OUTPUT_JSON", str(tmp_path / "drift.json"))
+    monkeypatch.setattr(drift_report, "OUTPUT_REPORT", str(tmp_path / "drift.html"))
+    current = _reference_df(n=500, seed=1)
+    current["EXT_SOURCE_3"] += 3.0
+    summary = drift_report.generate_profile_report(profile, current)
+
+    assert summary["current_rows"] == 500
+    assert summary["features"]["EXT_SOURCE_3"]["drift_detected"]
+    assert not summary["features"]["EXT_SOURCE_2"]["drift_detected"]
+    assert (tmp_path / "drift.html").exists()
+
+
+def test_parallel_drift_matches_sequential():
+    from monitoring.parallel_drift import compute_parallel_drift
+
+    reference = _reference_df()
+    reference["TARGET"] = 0
+    current = _reference_df(n=500, seed=1)
+    current["EXT_SOURCE_3"] += 3.0
+
+    sequential = compute_parallel_drift(reference, current, workers=1)
+    parallel = compute_parallel_drift(reference, current, workers=2, measure_speedup=True)
+
+    assert list(parallel["features"]) == FEATURE_ORDER
+    assert parallel["features"] == sequential["features"]
+    assert parallel["features"]["EXT_SOURCE_3"]["drift_detected"]
+    stats = parallel["parallel"]
+    assert stats["workers"] == 2 and stats["cpu_count"] == os.cpu_count()
+    assert stats["serial_wall_seconds"] > 0 and stats["speedup"] > 0
+
+
+def test_parallel_drift_compares_categorical_columns():
+    from monitoring.parallel_drift import compute_parallel_drift
+
+    rng = np.random.default_rng(0)
+    reference = _reference_df()
+    reference["NAME_CONTRACT_TYPE"] = pd.Series(rng.choice(["Cash loans", "Revolving loans"], len(reference), p=[0.9, 0.1]), dtype=object)
+    current = _reference_df(n=500, seed=1)
+    current["NAME_CONTRACT_TYPE"] = pd.Series(rng.choice(["Cash loans", "Revolving loans", None], 500, p=[0.3, 0.6, 0.1]), dtype=object)
+
+    summary = compute_parallel_drift(reference, current, workers=1)
+    stats = summary["features"]["NAME_CONTRACT_TYPE"]
+
+    assert stats["kind"] == "categorical" and stats["n_categories"] == 2
+    assert stats["drift_detected"]
+    assert stats["missing_rate_reference"] == 0.0 and stats["missing_rate_current"] > 0
+    assert summary["parallel"]["categorical_columns"] == 1
+    assert "speedup" not in summary["parallel"]
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import api.main as main
+from api.explain.precomputed import PrecomputedShap, save_precomputed_shap
+from api.schemas.input_schema import FEATURE_ORDER
+
+client = TestClient(main.app)
+
+GLOBAL_IMPORTANCE = [{"feature": "EXT_SOURCE_3", "importance": 0.1}]
+
+
+def _clients_df():
+    row = {f: 0.5 for f in FEATURE_ORDER}
+    return pd.DataFrame([dict(row, SK_ID_CURR=1), dict(row, SK_ID_CURR=2)])
+
+
+def _fail_online(X, compute=None):
+    raise AssertionError("calcul en ligne inattendu")
+
+
+def test_precomputed_shap_roundtrip(tmp_path):
+    values = np.arange(20, dtype=float).reshape(2, 10)
+    save_precomputed_shap(str(tmp_path), "dummy", np.array([7, 3]), values, np.array([0.1, 0.1]))
+
+    pre = PrecomputedShap.load(str(tmp_path))
+    payload = pre.get(3)
+    assert payload["shap_values"] == list(range(10, 20))
+    assert payload["base_value"] == np.float32(0.1)
+    assert pre.get(99) is None
+
+
+def test_explain_client_uses_precomputed(monkeypatch, tmp_path):
+    values = np.tile(np.linspace(-1, 1, 10), (2, 1))
+    save_precomputed_shap(str(tmp_path), "dummy", np.array([1, 2]), values, np.array([0.2, 0.2]))
+
+    monkeypatch.setattr(main, "get_clients_df", _clients_df)
+    monkeypatch.setattr(main, "get_precomputed_shap", lambda: PrecomputedShap.load(str(tmp_path)))
+    monkeypatch.setattr(main, "get_global_importance", lambda top_n=20: GLOBAL_IMPORTANCE)
+    monkeypatch.setattr(main, "explain_one_async", _fail_online)
+
+    r = client.get("/explain/client/2", params={"top_n": 3})
+    assert r.status_code == 200
+    data = r.json()
+
+    assert data["shap_source"] == "precomputed"
+    assert len(data["top_contributions"]) == 3
+    assert data["top_contributions"][0]["feature"] in (FEATURE_ORDER[0], FEATURE_ORDER[-1])
+
+
+def test_explain_client_falls_back_online(monkeypatch):
+    monkeypatch.setattr(main, "get_clients_df", _clients_df)
+    monkeypatch.setattr(main, "get_precomputed_shap", lambda: None)
+    monkeypatch.setattr(main, "get_global_importance", lambda top_n=20: GLOBAL_IMPORTANCE)
+    async def online(X, compute):
+        return {"base_value": 0.0, "shap_values": [0.1] * 10, "feature_names": FEATURE_ORDER}
+
+    monkeypatch.setattr(main, "explain_one_async", online)
+
+    r = client.get("/explain/client/1")
+    assert r.status_code == 200
+    assert r.json()["shap_source"] == "online"
+
+    assert client.get("/explain/client/42").status_code == 404
+
+
+def test_precomputed_shap_keyed_by_population(monkeypatch, tmp_path):
+    import api.explain.precomputed as precomputed
+
+    monkeypatch.setattr(precomputed, "SHAP_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "get_clients_df", _clients_df)
+    ids = _clients_df()["SK_ID_CURR"].to_numpy()
+    path = precomputed.shap_store_dir("dummy", precomputed.data_fingerprint(ids))
+    manifest = save_precomputed_shap(path, "dummy", ids, np.zeros((2, 10)), np.zeros(2))
+
+    assert manifest["data_fingerprint"]["n_rows"] == 2
+    assert not [name for name in os.listdir(path) if name.endswith(".tmp")]
+
+    monkeypatch.setattr(precomputed, "get_model_version", lambda: "dummy")
+    precomputed.get_precomputed_shap.cache_clear()
+    try:
+        assert len(precomputed.get_precomputed_shap()) == 2
+
+        # Autre CSV clients, même modèle : les SHAP précalculées ne sont pas servies
+        monkeypatch.setattr(main, "get_clients_df", lambda: _clients_df().assign(SK_ID_CURR=[1, 3]))
+        precomputed.get_precomputed_shap.cache_clear()
+        assert precomputed.get_precomputed_shap() is None
+    finally:
+        precomputed.get_precomputed_shap.cache_clear()
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import api.explain.global_importance as gi
+import api.main as main
+from api.schemas.input_schema import FEATURE_ORDER
+
+client = TestClient(main.app)
+
+
+def _fail_compute():
+    raise AssertionError("recalcul inattendu")
+
+
+def test_global_importance_loaded_from_artifact(monkeypatch, tmp_path):
+    path = str(tmp_path / "global_importance.json")
+    monkeypatch.setattr(gi, "GLOBAL_IMPORTANCE_PATH", path)
+    monkeypatch.setattr(gi, "_rows", None)
+    gi.save_global_importance(np.arange(10, dtype=float))
+
+    monkeypatch.setattr(gi, "compute_global_importance_vector", _fail_compute)
+    top3 = gi.get_global_importance(top_n=3)
+    assert [r["feature"] for r in top3] == FEATURE_ORDER[::-1][:3]
+    assert len(gi.get_global_importance(top_n=20)) == len(FEATURE_ORDER)
+
+
+def test_global_importance_ignores_other_model(monkeypatch, tmp_path):
+    path = tmp_path / "global_importance.json"
+    path.write_text(json.dumps({
+        "model_version": "local:autre",
+        "feature_names": FEATURE_ORDER,
+        "mean_abs_shap": [1.0] * 10,
+    }))
+    monkeypatch.setattr(gi, "GLOBAL_IMPORTANCE_PATH", str(path))
+    monkeypatch.setattr(gi, "_rows", None)
+    monkeypatch.setattr(gi, "compute_global_importance_vector", lambda: np.linspace(1, 0, 10))
+
+    assert gi.get_global_importance(top_n=1)[0]["feature"] == FEATURE_ORDER[0]
+
+
+def test_admin_recompute_requires_token(monkeypatch, tmp_path):
+    monkeypatch.setattr(gi, "GLOBAL_IMPORTANCE_PATH", str(tmp_path / "global_importance.json"))
+    monkeypatch.setattr(gi, "_rows", None)
+    monkeypatch.setattr(gi, "compute_global_importance_vector", lambda: np.ones(10))
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+    assert client.post("/admin/global-importance/recompute").status_code == 403
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    assert client.post("/admin/global-importance/recompute", headers={"X-Admin-Token": "faux"}).status_code == 403
+
+    r = client.post("/admin/global-importance/recompute", headers={"X-Admin-Token": "secret"})
+    assert r.status_code == 200
+    assert r.json()["model_version"] == "dummy"
+    assert (tmp_path / "global_importance.json").exists()
@@ -1,6 +1,8 @@
 import os
 import json
-from api.utils.logging import log_prediction
+import pytest
+import multiprocessing
+from api.utils.logging import PredictionLogger, flush_predictions, log_prediction, process_log_file
 
 def test_log_prediction():
     test_features = {"a": 1}
@@ -8,13 +10,151 @@ def test_log_prediction():
     prediction = 1
 
     log_prediction(test_features, probability, prediction)
+    assert flush_predictions()
 
-    assert os.path.exists("logs/predictions.jsonl")
+    path = process_log_file()
+    assert path == os.path.join("logs", f"predictions-{os.getpid()}.jsonl")
+    assert os.path.exists(path)
 
-    with open("logs/predictions.jsonl", "r") as f:
+    with open(path, "r") as f:
         last = f.readlines()[-1]
         data = json.loads(last)
 
         assert data["features"] == test_features
         assert data["probability"] == probability
         assert data["prediction"] == prediction
+
+
+def test_prediction_logger_batches_and_rotates(tmp_path):
+    path = str(tmp_path / "predictions.jsonl")
+    logger = PredictionLogger(path=path, batch_size=3, flush_interval=60, max_bytes=20)
+
+    for i in range(7):
+        assert logger.log({"i": i})
+    assert logger.flush()
+
+    rotated = [p for p in os.listdir(tmp_path) if p != "predictions.jsonl"]
+    assert rotated
+    assert logger.stats()["written"] == 7
+    assert logger.stats()["rotations"] == len(rotated)
+
+    lines = []
+    for name in sorted(rotated) + ["predictions.jsonl"]:
+        with open(tmp_path / name) as f:
+            lines += [json.loads(line)["i"] for line in f]
+    assert sorted(lines) == list(range(7))
+    logger.close()
+
+
+
+def _log_in_worker(logger, worker, n):
+    for i in range(n):
+        logger.log({"worker": worker, "i": i, "pad": "x" * 50})
+    logger.close()
+
+
+def test_each_process_writes_and_rotates_its_own_file(tmp_path):
+    # Logger créé avant le fork (app préchargée puis workers gunicorn) : chaque worker en hérite
+    logger = PredictionLogger(path=str(tmp_path / "predictions-{pid}.jsonl"), batch_size=7, flush_interval=60, max_bytes=2000)
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_log_in_worker, args=(logger, w, 200)) for w in range(3)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(30)
+        assert p.exitcode == 0
+
+    names = os.listdir(tmp_path)
+    for p in workers:
+        assert f"predictions-{p.pid}.jsonl" in names
+        # Rotations propres au worker : predictions-<pid>.<horodatage>.jsonl
+        assert any(n.startswith(f"predictions-{p.pid}.") and n != f"predictions-{p.pid}.jsonl" for n in names)
+
+    seen = {w: [] for w in range(3)}
+    for name in names:
+        pid = int(name.split("-")[1].split(".")[0])
+        with open(tmp_path / name) as f:
+            events = [json.loads(line) for line in f]  # aucune ligne entrelacée
+        assert {e["worker"] for e in events} == {[p.pid for p in workers].index(pid)}
+        for e in events:
+            seen[e["worker"]].append(e["i"])
+    assert all(sorted(v) == list(range(200)) for v in seen.values())
+
+
+def test_prediction_logger_drops_when_queue_full(tmp_path):
+    logger = PredictionLogger(path=str(tmp_path / "p.jsonl"), queue_size=1, flush_interval=60)
+    # Writer non démarré : la file se remplit
+    logger._ensure_started = lambda: None
+
+    assert logger.log({"i": 0})
+    assert not logger.log({"i": 1})
+    assert logger.stats()["dropped"] == 1
+
+
+def test_batch_larger_than_queue_is_fully_logged(tmp_path):
+    path = tmp_path / "p.jsonl"
+    logger = PredictionLogger(path=str(path), queue_size=10, batch_size=500, flush_interval=60)
+
+    assert logger.log_many([{"i": i} for i in range(2500)])
+    assert logger.flush()
+    logger.close()
+
+    stats = logger.stats()
+    assert stats["dropped"] == 0 and stats["enqueued"] == stats["written"] == 2500
+    with open(path) as f:
+        assert [json.loads(line)["i"] for line in f] == list(range(2500))
+
+
+def test_binary_segments_roundtrip_with_time_range(tmp_path):
+    from api.schemas.input_schema import FEATURE_ORDER
+    from api.utils.prediction_store import BinarySegmentSink, RECORD_DTYPE, read_predictions
+
+    sink = BinarySegmentSink(directory=str(tmp_path), max_bytes=2 * RECORD_DTYPE.itemsize + 64, max_seconds=0)
+    logger = PredictionLogger(batch_size=2, flush_interval=60, sinks=[sink])
+
+    features = {f: 1.0 for f in FEATURE_ORDER}
+    features["EXT_SOURCE_1"] = None
+    for day in range(1, 7):
+        logger.log({
+            "timestamp": f"2026-01-0{day}T12:00:00",
+            "features": features,
+            "probability": day / 10,
+            "prediction": day % 2,
+        })
+    assert logger.flush()
+    logger.close()
+    assert sink.rotations >= 1
+
+    df = read_predictions(str(tmp_path), start="2026-01-02", end="2026-01-05")
+    assert list(df["timestamp"].dt.day) == [2, 3, 4]
+    assert df["EXT_SOURCE_1"].isna().all()
+    assert df["EXT_SOURCE_3"].tolist() == [1.0, 1.0, 1.0]
+    assert df["prediction"].tolist() == [0, 1, 0]
+    assert len(read_predictions(str(tmp_path))) == 6
+
+
+def test_read_predictions_with_interleaved_segments(tmp_path):
+    """Deux workers écrivent des segments qui se chevauchent dans le même répertoire."""
+    from api.schemas.input_schema import FEATURE_ORDER
+    from api.utils.prediction_store import BinarySegmentSink, read_predictions
+
+    features = {f: 1.0 for f in FEATURE_ORDER}
+
+    def event(day, hour, proba):
+        return {"timestamp": f"2026-01-0{day}T{hour:02d}:00:00", "features": features,
+                "probability": proba, "prediction": 0}
+
+    # Worker A : segment débuté le 1er, écrit jusqu'au 4 ; worker B : segment débuté le 2
+    worker_a = BinarySegmentSink(directory=str(tmp_path), max_seconds=0)
+    worker_b = BinarySegmentSink(directory=str(tmp_path), max_seconds=0)
+    worker_a.write([event(1, 12, 0.1)])
+    worker_b.write([event(2, 12, 0.2)])
+    worker_a.write([event(3, 12, 0.3), event(4, 12, 0.4)])
+    worker_b.write([event(3, 18, 0.35)])
+    worker_a.close()
+    worker_b.close()
+    assert len(os.listdir(tmp_path)) == 2
+
+    df = read_predictions(str(tmp_path), start="2026-01-03", end="2026-01-05")
+    assert sorted(df["probability"].tolist()) == pytest.approx([0.3, 0.35, 0.4])
+    assert len(read_predictions(str(tmp_path), end="2026-01-02")) == 1
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+import pandas as pd
+from fastapi.testclient import TestClient
+
+import api.main as main
+from api.schemas.input_schema import FEATURE_ORDER
+
+client = TestClient(main.app)
+
+
+def _clients_df(n=50):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(n, len(FEATURE_ORDER))), columns=FEATURE_ORDER)
+    df.insert(0, "SK_ID_CURR", np.arange(100000, 100000 + n))
+    df.loc[0, "EXT_SOURCE_1"] = np.nan
+    return df
+
+
+def test_population_sample_cached_with_etag(monkeypatch):
+    df = _clients_df()
+    monkeypatch.setattr(main, "get_clients_df", lambda: df)
+
+    r = client.get("/population/sample?n=10")
+    assert r.status_code == 200
+    data = r.json()
+    assert data["n"] == 10
+    assert data["columns"][0] == "SK_ID_CURR"
+    assert len(data["rows"]) == 10
+
+    # Même échantillon qu'avant (seed fixe)
+    expected = df.sample(n=10, random_state=42)["SK_ID_CURR"].tolist()
+    assert [row["SK_ID_CURR"] for row in data["rows"]] == expected
+
+    again = client.get("/population/sample?n=10")
+    assert again.content == r.content
+    assert again.headers["etag"] == r.headers["etag"]
+
+    r304 = client.get("/population/sample?n=10", headers={"If-None-Match": r.headers["etag"]})
+    assert r304.status_code == 304
+    assert r304.content == b""
+
+    other = client.get("/population/sample?n=5", headers={"If-None-Match": r.headers["etag"]})
+    assert other.status_code == 200
+    assert other.headers["etag"] != r.headers["etag"]
+
+
+def test_population_sample_nan_to_null(monkeypatch):
+    df = _clients_df(n=3)
+    monkeypatch.setattr(main, "get_clients_df", lambda: df)
+
+    rows = client.get("/population/sample?n=10").json()["rows"]
+    assert len(rows) == 3
+    first = next(row for row in rows if row["SK_ID_CURR"] == 100000)
+    assert first["EXT_SOURCE_1"] is None
+
+
+def test_population_sample_column_formats(monkeypatch):
+    pytest.importorskip("pyarrow")
+    from dashboard.api_client import frame_from_response
+
+    df = _clients_df()
+    monkeypatch.setattr(main, "get_clients_df", lambda: df)
+    records, _ = frame_from_response(client.get("/population/sample?n=10"))
+
+    r = client.get("/population/sample?n=10&format=columns")
+    assert r.status_code == 200
+    assert set(r.json()["data"]) == set(records.columns)
+    columns, meta = frame_from_response(r)
+    assert meta["n"] == 10
+    pd.testing.assert_frame_equal(columns, records)
+
+    arrow = client.get("/population/sample?n=10", headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert arrow.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    assert arrow.headers["etag"] != r.headers["etag"]
+    decoded, meta = frame_from_response(arrow)
+    assert meta["n"] == 10
+    pd.testing.assert_frame_equal(decoded, records, check_dtype=False)
+
+    parquet, _ = frame_from_response(client.get("/population/sample?n=10&format=parquet"))
+    pd.testing.assert_frame_equal(parquet, records, check_dtype=False)
+
+
+def test_population_sample_unknown_or_unavailable_format(monkeypatch):
+    monkeypatch.setattr(main, "get_clients_df", lambda: _clients_df())
+    assert client.get("/population/sample?format=xml").status_code == 422
+
+    monkeypatch.setattr(main, "arrow_available", lambda: False)
+    assert client.get("/population/sample?format=arrow").status_code == 406
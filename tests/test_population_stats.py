@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main as main
+from api.data.population_stats import FeatureDistribution
+from api.schemas.input_schema import FEATURE_ORDER
+
+client = TestClient(main.app)
+
+
+def _clients_df(n=1000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(n, len(FEATURE_ORDER))), columns=FEATURE_ORDER)
+    df.insert(0, "SK_ID_CURR", np.arange(100000, 100000 + n))
+    df.loc[:9, "EXT_SOURCE_1"] = np.nan
+    df["CODE_GENDER"] = "F"
+    return df
+
+
+def test_feature_distribution_matches_numpy():
+    values = np.r_[np.random.default_rng(1).normal(size=501), [np.nan] * 5]
+    dist = FeatureDistribution(values)
+
+    assert dist.n == 501 and dist.n_missing == 5
+    for q in (0.0, 0.1, 0.25, 0.5, 0.9, 1.0):
+        assert dist.quantile(q) == pytest.approx(np.nanquantile(values, q))
+
+    counts, edges = np.histogram(values[~np.isnan(values)], bins=30)
+    hist = dist.histogram(30)
+    assert hist["counts"] == counts.tolist()
+    assert np.allclose(hist["edges"], edges)
+
+    x = 0.3
+    rank = dist.percentile_rank(x)
+    assert rank["percentile"] == pytest.approx(100 * np.mean(values[~np.isnan(values)] < x))
+
+
+def test_population_stats_endpoint(monkeypatch):
+    df = _clients_df()
+    monkeypatch.setattr(main, "get_clients_df", lambda: df)
+
+    r = client.get("/population/stats/EXT_SOURCE_1?bins=10&quantiles=0.25,0.5,0.75&value=0")
+    assert r.status_code == 200
+    data = r.json()
+    s = df["EXT_SOURCE_1"]
+    assert data["n"] == 990 and data["n_missing"] == 10
+    assert sum(data["histogram"]["counts"]) == 990
+    assert data["quantiles"]["0.5"] == pytest.approx(float(np.nanmedian(s)))
+    assert data["client"]["percentile"] == pytest.approx(100 * float((s.dropna() < 0).mean()))
+
+    r = client.get("/population/percentile/EXT_SOURCE_1?value=0")
+    assert r.json()["percentile"] == data["client"]["percentile"]
+
+
+def test_population_stats_errors(monkeypatch):
+    monkeypatch.setattr(main, "get_clients_df", lambda: _clients_df())
+
+    assert client.get("/population/stats/INCONNUE").status_code == 404
+    assert client.get("/population/stats/CODE_GENDER").status_code == 404
+    assert client.get("/population/stats/EXT_SOURCE_1?quantiles=2").status_code == 422
+    assert client.get("/population/stats/EXT_SOURCE_1?bins=0").status_code == 422
+    for value in ("nan", "inf", "-inf"):
+        assert client.get(f"/population/percentile/EXT_SOURCE_1?value={value}").status_code == 422
+        assert client.get(f"/population/stats/EXT_SOURCE_1?value={value}").status_code == 422
+
+
+def test_population_density_matches_histogram2d(monkeypatch):
+    df = _clients_df()
+    monkeypatch.setattr(main, "get_clients_df", lambda: df)
+
+    r = client.get("/population/density?x=EXT_SOURCE_1&y=EXT_SOURCE_2&bins=8&bins_y=5")
+    assert r.status_code == 200
+    grid = r.json()
+
+    both = df[["EXT_SOURCE_1", "EXT_SOURCE_2"]].dropna()
+    expected, _, _ = np.histogram2d(both["EXT_SOURCE_1"], both["EXT_SOURCE_2"], bins=[8, 5])
+    assert np.array_equal(np.array(grid["counts"]), expected)
+    assert grid["n"] == len(both) and grid["n_missing"] == 10 and grid["n_outside"] == 0
+    assert len(grid["x_edges"]) == 9 and len(grid["y_edges"]) == 6
+
+    # Même clé -> même objet en cache
+    assert main.get_density_grid("EXT_SOURCE_1", "EXT_SOURCE_2", 8, 5) is main.get_density_grid(
+        "EXT_SOURCE_1", "EXT_SOURCE_2", 8, 5
+    )
+
+    clipped = client.get("/population/density?x=EXT_SOURCE_1&y=EXT_SOURCE_2&bins=8&clip=0.05").json()
+    assert clipped["n_outside"] > 0
+    assert clipped["n"] + clipped["n_outside"] + clipped["n_missing"] == len(df)
+
+    assert client.get("/population/density?x=AMT_CREDIT&y=EXT_SOURCE_2").status_code == 404
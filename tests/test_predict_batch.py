@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from api.main import app
+
+from tests.test_predict import VALID_SAMPLE
+
+client = TestClient(app)
+
+
+def test_predict_batch_records_keeps_order_and_reports_errors():
+    bad = dict(VALID_SAMPLE, EXT_SOURCE_3="pas un nombre")
+    response = client.post("/predict/batch", json={"records": [VALID_SAMPLE, bad, VALID_SAMPLE]})
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["n"] == 3
+    assert data["n_scored"] == 2
+    assert data["n_errors"] == 1
+    assert [r["index"] for r in data["results"]] == [0, 1, 2]
+
+    assert "probability_default" in data["results"][0]
+    assert "prediction" in data["results"][0]
+    assert "error" in data["results"][1]
+    assert data["results"][1]["error"][0]["loc"] == ["EXT_SOURCE_3"]
+
+
+def test_predict_batch_columns():
+    columns = {k: [v, v] for k, v in VALID_SAMPLE.items()}
+    response = client.post("/predict/batch", json={"columns": columns})
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["n"] == 2
+    assert data["n_scored"] == 2
+    assert all("probability_default" in r for r in data["results"])
+
+
+def test_predict_batch_rejects_ambiguous_payload():
+    response = client.post("/predict/batch", json={})
+    assert response.status_code == 422
+
+    response = client.post("/predict/batch", json={"columns": {"EXT_SOURCE_3": [0.1], "EXT_SOURCE_2": []}})
+    assert response.status_code == 422
+
+
+def test_predict_batch_columnar_formats():
+    pytest.importorskip("pyarrow")
+    from dashboard.api_client import frame_from_response
+
+    records = [VALID_SAMPLE, dict(VALID_SAMPLE, EXT_SOURCE_1="pas un nombre")]
+    for fmt in ("columns", "arrow"):
+        r = client.post(f"/predict/batch?format={fmt}", json={"records": records})
+        assert r.status_code == 200
+        frame, meta = frame_from_response(r)
+        assert meta["n"] == 2 and meta["n_errors"] == 1
+        assert list(frame["index"]) == [0, 1]
+        assert frame["probability_default"].iloc[0] == pytest.approx(0.7)
+        assert pd.isna(frame["prediction"].iloc[1])
+        assert frame["error"].iloc[0] is None and "EXT_SOURCE_1" in frame["error"].iloc[1]
@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main as main
+from api.model.batching import MicroBatcher
+from tests.test_predict import VALID_SAMPLE
+
+
+def test_concurrent_rows_are_batched_and_fanned_out():
+    calls = []
+
+    def predict_fn(X):
+        calls.append(len(X))
+        return X[:, 0] * 2
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=50)
+    start = threading.Barrier(20)
+
+    def one(i):
+        start.wait()
+        return batcher.submit(np.array([i, 0.0])).result(timeout=5)
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(one, range(20)))
+    batcher.close()
+
+    assert results == [2.0 * i for i in range(20)]
+    assert sum(calls) == 20
+    assert len(calls) < 20 and max(calls) <= 8
+
+    stats = batcher.stats()
+    assert stats["items"] == 20 and stats["batches"] == len(calls)
+    assert stats["batch_size"]["n"] == len(calls)
+    assert stats["queue_wait_ms"]["n"] == 20
+
+
+def test_failed_batch_is_replayed_row_by_row():
+    def predict_fn(X):
+        if np.isnan(X).any():
+            raise ValueError("NaN interdit")
+        return X[:, 0]
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=100)
+    good = batcher.submit(np.array([0.3]))
+    bad = batcher.submit(np.array([np.nan]))
+
+    assert good.result(timeout=5) == 0.3
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+    batcher.close()
+    assert batcher.stats()["fallbacks"] == 1
+
+
+def test_cancelled_waiter_does_not_break_the_batch():
+    batcher = MicroBatcher(lambda X: X[:, 0], max_batch_size=8, max_wait_ms=200)
+    first = batcher.submit(np.array([0.1]))
+    abandoned = batcher.submit(np.array([0.2]))
+    last = batcher.submit(np.array([0.3]))
+    assert abandoned.cancel()
+
+    assert first.result(timeout=5) == 0.1
+    assert last.result(timeout=5) == 0.3
+    # Le thread de batching est toujours actif
+    assert batcher.submit(np.array([0.4])).result(timeout=5) == 0.4
+    batcher.close()
+
+    stats = batcher.stats()
+    assert stats["cancelled"] == 1 and stats["items"] == 3
+
+
+def test_predict_endpoint_with_batching(monkeypatch):
+    monkeypatch.setattr(main, "PREDICT_BATCHING", True)
+    monkeypatch.setattr(main, "_predict_batcher", None)
+    client = TestClient(main.app)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda _: client.post("/predict", json=VALID_SAMPLE), range(16)))
+
+    assert all(r.status_code == 200 for r in responses)
+    assert {r.json()["probability_default"] for r in responses} == {0.7}
+
+    stats = client.get("/stats").json()["predict_batching"]
+    assert stats["items"] == 16
+    main._predict_batcher.close()
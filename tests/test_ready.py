@@ -0,0 +1,43 @@
+from fastapi.testclient import TestClient
+
+import api.main as main
+
+client = TestClient(main.app)
+
+
+def _missing_clients():
+    raise FileNotFoundError("Fichier clients introuvable")
+
+
+def test_ready_after_warmup(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "warmup_steps", lambda: [
+        ("model", lambda: calls.append("model")),
+        ("clients", _missing_clients),
+    ])
+
+    main.start_warmup("sync")
+    r = client.get("/ready")
+    assert r.status_code == 200
+
+    data = r.json()
+    assert data["status"] == "ready"
+    assert data["steps"]["model"]["ok"] is True
+    assert data["steps"]["clients"]["ok"] is False
+    assert calls == ["model"]
+
+    main.start_warmup("off")
+
+
+def test_not_ready_when_model_fails(monkeypatch):
+    monkeypatch.setattr(main, "warmup_steps", lambda: [("model", _missing_clients)])
+
+    main.start_warmup("sync")
+    r = client.get("/ready")
+    assert r.status_code == 503
+    assert r.json()["status"] == "failed"
+
+    # Liveness indépendante de la readiness
+    assert client.get("/health").status_code == 200
+
+    main.start_warmup("off")
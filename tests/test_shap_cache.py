@@ -0,0 +1,72 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+import api.explain.shap_explainer as se
+from api.main import app
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_feature_key_is_canonical():
+    a = np.array([[None, 0.0, 1.5]], dtype=object)
+    b = np.array([[np.nan, -0.0, 1.5]])
+    assert se.feature_key(a, "v1") == se.feature_key(b, "v1")
+    assert se.feature_key(a, "v1") != se.feature_key(a, "v2")
+
+
+def test_explanation_cache_lru_and_ttl():
+    clock = FakeClock()
+    cache = se.ExplanationCache(maxsize=2, ttl=10, clock=clock)
+
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}   # "a" devient le plus récent
+    cache.put("c", {"v": 3})            # évince "b"
+    assert cache.get("b") is None
+
+    clock.now = 11
+    assert cache.get("a") is None       # expiré
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+
+
+def test_explain_one_served_from_cache(monkeypatch):
+    calls = []
+
+    class FakeExplanation:
+        values = np.arange(10, dtype=float).reshape(1, -1)
+        base_values = np.array([0.5])
+
+    def fake_explainer(X):
+        calls.append(X)
+        return FakeExplanation()
+
+    monkeypatch.setattr(se, "get_explainer", lambda: fake_explainer)
+    monkeypatch.setattr(se, "explanation_cache", se.ExplanationCache(maxsize=8, ttl=0))
+
+    X = np.arange(10, dtype=float).reshape(1, -1) + 0.25
+    first = se.explain_one(X)
+    second = se.explain_one(X.copy())
+
+    assert len(calls) == 1
+    assert first == second
+    assert second["shap_values"] == list(range(10))
+    assert se.explanation_cache.stats()["hits"] == 1
+
+
+def test_stats_endpoint_exposes_cache_counters():
+    r = client.get("/stats")
+    assert r.status_code == 200
+    assert {"hits", "misses", "size"} <= set(r.json()["shap_cache"])
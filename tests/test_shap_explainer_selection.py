@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+import api.main as main
+import api.explain.shap_explainer as se
+from api.schemas.input_schema import FEATURE_ORDER
+
+client = TestClient(main.app)
+
+
+class FakeSampler:
+    """Étape type imblearn (fit_resample) : ignorée à la prédiction."""
+
+    def fit_resample(self, X, y):
+        return X, y
+
+
+def _data(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, len(FEATURE_ORDER))) * 10 + 5
+    y = (X[:, 0] + X[:, 1] > 10).astype(int)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X, y
+
+
+def _pipeline(estimator):
+    X, y = _data()
+    pipe = Pipeline([("imputer", SimpleImputer(strategy="median")), ("scaler", StandardScaler()), ("model", estimator)])
+    return pipe.fit(X, y)
+
+
+@pytest.fixture
+def use_model(monkeypatch):
+    def _use(model, n_background=120):
+        X, _ = _data(n=n_background, seed=1)
+        monkeypatch.setattr(main, "get_model", lambda: model)
+        monkeypatch.setattr(se, "get_background", lambda: X)
+        monkeypatch.setattr(se, "explanation_cache", se.ExplanationCache(maxsize=64, ttl=0))
+        monkeypatch.setattr(se, "explainer_info", None)
+        se.get_explainer.cache_clear()
+        return se.get_explainer()
+
+    yield _use
+    se.get_explainer.cache_clear()
+
+
+@pytest.mark.parametrize("estimator", [RandomForestClassifier(n_estimators=20, random_state=0),
+                                       GradientBoostingClassifier(n_estimators=20, random_state=0),
+                                       HistGradientBoostingClassifier(max_iter=20, random_state=0)])
+def test_tree_ensembles_in_pipeline_use_treeshap(use_model, estimator):
+    model = _pipeline(estimator)
+    explainer = use_model(model)
+
+    assert isinstance(explainer, se.TreeModelExplainer)
+    assert se.explainer_info["kind"] == "tree"
+    assert se.explainer_info["preprocessing_steps"] == ["SimpleImputer", "StandardScaler"]
+
+    X, _ = _data(n=5, seed=2)
+    payloads = se.explain_many(X)
+    # Additivité en probabilité (mêmes unités que l'explainer générique), y compris pour GB
+    assert se.explainer_info["output_space"] == "probability"
+    expected = model.predict_proba(X)[:, 1]
+    totals = [p["base_value"] + sum(p["shap_values"]) for p in payloads]
+    assert np.allclose(totals, expected, atol=1e-6)
+
+    # explain_one sert les lignes déjà calculées par explain_many
+    assert se.explain_one(X[2:3]) == payloads[2]
+    assert se.explanation_cache.stats()["hits"] == 1
+
+    assert client.get("/stats").json()["shap_explainer"]["kind"] == "tree"
+
+
+def test_tree_path_dependent_boosting_reports_log_odds(use_model, monkeypatch):
+    monkeypatch.setattr(se, "SHAP_TREE_MODE", "tree_path_dependent")
+    model = _pipeline(GradientBoostingClassifier(n_estimators=20, random_state=0))
+    use_model(model)
+
+    assert se.explainer_info["output_space"] == "log_odds"
+    X, _ = _data(n=5, seed=2)
+    X_t = se.apply_transformers(se.split_pipeline(model)[0], X)
+    totals = [p["base_value"] + sum(p["shap_values"]) for p in se.explain_many(X)]
+    assert np.allclose(totals, model[-1].decision_function(X_t), atol=1e-6)
+
+
+def test_samplers_are_skipped():
+    pipe = Pipeline([("imputer", SimpleImputer()), ("smote", FakeSampler()), ("model", LogisticRegression())])
+    transformers, estimator = se.split_pipeline(pipe)
+    assert [type(t) for t in transformers] == [SimpleImputer]
+    assert isinstance(estimator, LogisticRegression)
+
+
+def test_non_tree_model_falls_back_to_generic_explainer(use_model):
+    explainer = use_model(_pipeline(LogisticRegression()), n_background=10)
+
+    assert not isinstance(explainer, se.TreeModelExplainer)
+    assert se.explainer_info["kind"] != "tree"
+    assert "TreeSHAP indisponible" in se.explainer_info["reason"]
+    assert se.explainer_info["output_space"] == "probability"
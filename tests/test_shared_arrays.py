@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+import api.main as main
+import api.data.shared_arrays as shared_arrays
+from api.data.population_stats import PopulationStats
+from api.schemas.input_schema import FEATURE_ORDER
+
+
+def test_shared_array_published_once_then_attached(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_arrays, "SHARED_ARRAYS_DIR", str(tmp_path))
+    calls = []
+
+    def build():
+        calls.append(1)
+        return np.arange(12, dtype=np.float64).reshape(3, 4)
+
+    first = shared_arrays.shared_array("matrix", {"source": "a"}, build)
+    second = shared_arrays.shared_array("matrix", {"source": "a"}, build)
+    assert len(calls) == 1
+    assert isinstance(second, np.memmap) and not second.flags.writeable
+    np.testing.assert_array_equal(first, second)
+    assert shared_arrays.stats()["arrays"]["matrix"]["origin"] == "attached"
+
+    # Source modifiée : nouvelle publication, l'ancienne version est supprimée
+    shared_arrays.shared_array("matrix", {"source": "b"}, build)
+    assert len(calls) == 2
+    assert len(list(tmp_path.glob("matrix-*.npy"))) == 1
+
+
+def test_shared_array_disabled_or_unknown_source(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_arrays, "SHARED_ARRAYS_DIR", "")
+    out = shared_arrays.shared_array("local", {"source": "a"}, lambda: np.ones(3))
+    assert not isinstance(out, np.memmap)
+
+    monkeypatch.setattr(shared_arrays, "SHARED_ARRAYS_DIR", str(tmp_path))
+    out = shared_arrays.shared_array("local", None, lambda: np.ones(3))
+    assert not isinstance(out, np.memmap)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_population_stats_packed_roundtrip():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"A": rng.normal(size=50), "B": rng.integers(0, 5, 50).astype(float), "C": ["x"] * 50})
+    df.loc[::7, "A"] = np.nan
+    stats = PopulationStats.from_frame(df, ["A", "B", "C"])
+
+    counts = {name: (d.n, d.n_missing) for name, d in stats.distributions.items()}
+    restored = PopulationStats.from_packed(stats.packed(), counts, len(df))
+    assert restored.features == ["A", "B"]
+    for name in restored.features:
+        assert restored.summary(name, value=0.5) == stats.summary(name, value=0.5)
+
+
+def test_client_store_and_population_stats_use_shared_arrays(tmp_path, monkeypatch):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({"SK_ID_CURR": np.arange(100001, 100021)})
+    for name in FEATURE_ORDER:
+        df[name] = rng.normal(size=20)
+    source = tmp_path / "clients.csv"
+    df.to_csv(source, index=False)
+
+    monkeypatch.setattr(main, "CLIENT_DATA_PATH", str(source))
+    monkeypatch.setattr(main, "CLIENT_STORE_DIR", str(tmp_path / "absent"))
+    monkeypatch.setattr(shared_arrays, "SHARED_ARRAYS_DIR", str(tmp_path / "shm"))
+    main.get_clients_df.cache_clear()
+    monkeypatch.setattr(main, "_client_store", None)
+    monkeypatch.setattr(main, "_population_stats", None)
+    try:
+        store = main.get_client_store()
+        assert isinstance(store.features, np.memmap)
+        assert store.get(100005)["features"][FEATURE_ORDER[0]] == main.get_clients_df().loc[4, FEATURE_ORDER[0]]
+
+        stats = main.get_population_stats()
+        local = PopulationStats.from_frame(main.get_clients_df(), FEATURE_ORDER)
+        assert stats.summary(FEATURE_ORDER[0]) == local.summary(FEATURE_ORDER[0])
+        assert {"client_features", "population_sorted"} <= set(shared_arrays.stats()["arrays"])
+    finally:
+        main.get_clients_df.cache_clear()
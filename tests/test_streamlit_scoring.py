@@ -0,0 +1,189 @@
+import csv
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import streamlit_app.scoring as scoring
+from streamlit_app.scoring import (
+    REQUIRED_FEATURES,
+    BatchEndpointUnavailable,
+    build_payload_from_row,
+    _classify_lines,
+    build_payloads,
+    clean_dataframe,
+    make_session,
+    robust_read_csv,
+    score_concurrently,
+    score_in_batches,
+)
+
+
+def _frame():
+    rng = np.random.default_rng(0)
+    n = 12
+    df = pd.DataFrame({feat: rng.normal(size=n) * 100 for feat in REQUIRED_FEATURES})
+    df["REG_CITY_NOT_WORK_CITY"] = rng.integers(0, 2, n)           # int64
+    df["REGION_RATING_CLIENT"] = rng.integers(1, 4, n).astype(float)  # entier stocké en float
+    df["DAYS_BIRTH"] = -rng.integers(8000, 20000, n)
+    df.loc[[1, 5], "EXT_SOURCE_1"] = np.nan
+    df.loc[3, "REGION_RATING_CLIENT"] = np.nan
+    df.loc[7, "DAYS_ID_PUBLISH"] = 12.7                            # tronqué en 12
+    df["SK_ID_CURR"] = np.arange(100, 100 + n)
+    return df
+
+
+def _row_by_row(df):
+    payloads, errors = [], {}
+    for pos, (_, row) in enumerate(df.iterrows()):
+        payload, err = build_payload_from_row(row)
+        payloads.append(payload)
+        if err:
+            errors[pos] = err
+    return payloads, errors
+
+
+def test_build_payloads_matches_row_by_row():
+    df = _frame()
+    # Colonne texte (CSV lu en chaînes) avec une valeur invalide
+    df["DAYS_EMPLOYED"] = df["DAYS_EMPLOYED"].astype(object)
+    df.loc[4, "DAYS_EMPLOYED"] = "abc"
+
+    expected, expected_errors = _row_by_row(df)
+    payloads, errors = build_payloads(df)
+
+    assert errors == expected_errors
+    assert payloads == expected
+    assert payloads[1]["EXT_SOURCE_1"] is None and payloads[7]["DAYS_ID_PUBLISH"] == 12
+
+
+def test_build_payloads_treats_infinity_as_missing():
+    df = _frame()
+    df.loc[2, "REGION_RATING_CLIENT"] = np.inf
+    df.loc[6, "EXT_SOURCE_2"] = -np.inf
+
+    payloads, errors = build_payloads(df)
+
+    assert not errors
+    assert payloads[2]["REGION_RATING_CLIENT"] is None and payloads[6]["EXT_SOURCE_2"] is None
+
+
+def test_session_does_not_retry_posts():
+    retry = make_session().get_adapter("https://api.test").max_retries
+    assert retry.total == 3
+    assert "POST" not in retry.allowed_methods
+
+
+class _FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data
+        self.text = "" if data is None else str(data)
+
+    def json(self):
+        return self._data
+
+
+class _FakeSession:
+    """POST /predict/batch -> 404 ; POST /predict -> proba = EXT_SOURCE_3 (ou 422 si None)."""
+
+    def __init__(self):
+        self.calls = []
+
+    def post(self, url, json=None, timeout=None):
+        self.calls.append(url)
+        if url == scoring.BATCH_API_URL:
+            return _FakeResponse(404)
+        if json["EXT_SOURCE_3"] is None:
+            return _FakeResponse(422, {"detail": "EXT_SOURCE_3"})
+        return _FakeResponse(200, {"probability_default": json["EXT_SOURCE_3"], "prediction": 0})
+
+
+def test_missing_batch_endpoint_falls_back_to_concurrent_predict():
+    df = _frame()
+    df.loc[8, "EXT_SOURCE_3"] = np.nan
+    payloads, _ = build_payloads(df)
+    positions = list(range(len(df)))
+    session = _FakeSession()
+
+    with pytest.raises(BatchEndpointUnavailable):
+        list(score_in_batches(session, payloads, positions, chunk_rows=5))
+    assert session.calls == [scoring.BATCH_API_URL]
+
+    chunks = list(score_concurrently(session, payloads, positions, workers=4, chunk_rows=5))
+    results = sorted((r for chunk in chunks for r in chunk), key=lambda r: r["position"])
+
+    assert [len(c) for c in chunks] == [5, 5, 2]
+    assert [r["position"] for r in results] == positions
+    assert results[8]["error"].startswith("API error 422")
+    assert results[0]["probability_default"] == df.loc[0, "EXT_SOURCE_3"]
+
+
+# ----------------------------
+# Lecture robuste du CSV
+# ----------------------------
+def _line_by_line_read(text, expected_cols):
+    """Ancienne lecture (csv.reader ligne à ligne, DataFrame de chaînes) : référence des tests."""
+    valid_rows, invalid_rows = [], []
+    for idx, line in enumerate(text.splitlines()):
+        row = next(csv.reader([line]), [])
+        if len(row) == expected_cols:
+            valid_rows.append(row)
+            continue
+        repair = line.split(",")
+        if len(repair) == expected_cols:
+            valid_rows.append(repair)
+            continue
+        invalid_rows.append({"line_number": idx, "raw_line": line, "reason": f"Ligne contient {len(row)} colonnes détectées"})
+    return pd.DataFrame(valid_rows[1:], columns=valid_rows[0]), invalid_rows
+
+
+def _read_both(lines, expected_cols=5):
+    text = "\n".join(lines) + "\n"
+    old_df, old_invalid = _line_by_line_read(text, expected_cols)
+    new_df, new_invalid = robust_read_csv(io.BytesIO(text.encode()), expected_cols=expected_cols)
+    return clean_dataframe(old_df), old_invalid, clean_dataframe(new_df), new_invalid
+
+
+def test_robust_read_csv_matches_line_by_line_reader():
+    lines = [
+        "SK_ID_CURR,A,B,C,D",
+        "1,0.5,x,10,NA",
+        '2,0.25,"y,z",20,1.5',        # séparateur entre guillemets : ligne valide
+        '"3,0.75,w,30,2.5"',          # ligne compactée : réparée par split(",")
+        "4,0.1,v,40,3.5,99",          # champ en trop : invalide
+        "5,0.2",                      # champs manquants : invalide
+        "6,,u,,null",                 # manquants
+        '7,"0.9",t,70,4.5',
+    ]
+    old_df, old_invalid, new_df, new_invalid = _read_both(lines)
+
+    pd.testing.assert_frame_equal(new_df, old_df)
+    assert new_invalid == old_invalid
+    assert [r["line_number"] for r in new_invalid] == [4, 5]
+    assert new_df["B"].tolist() == ["x", "y,z", "w", "u", "t"]
+    assert str(new_df["C"].dtype) == "float64" and new_df["C"].tolist()[:3] == [10.0, 20.0, 30.0]
+
+
+def test_repaired_text_field_turns_column_into_text_like_before():
+    lines = [
+        "SK_ID_CURR,A,B,C,D",
+        "1,0.5,x,10,1",
+        '"2,abc,y,20,2"',             # réparée, A non numérique : A redevient texte
+        "3,0.7,z,30,3",
+    ]
+    old_df, old_invalid, new_df, new_invalid = _read_both(lines)
+
+    pd.testing.assert_frame_equal(new_df, old_df)
+    assert new_df["A"].tolist() == ["0.5", "abc", "0.7"]
+    assert not new_invalid and not old_invalid
+
+
+def test_classify_lines_fast_path_and_repairs():
+    lines = ["a,b,c", "1,2,3", '"4,5,6"', '7,"8,9",10', "1,2", '"1,2"']
+    direct, repaired, invalid = _classify_lines(lines, expected_cols=3)
+
+    assert direct == [0, 1, 3]
+    assert repaired == [(2, ['"4', "5", '6"'])]
+    assert [r["line_number"] for r in invalid] == [4, 5]